@@ -1,11 +1,107 @@
 """
 Webhook handler para Telegram Bot - Red Soluciones ISP
 Integra Carlos (el agente empresarial) con Telegram
+
+Los comandos de datos (estadísticas, clientes, buscar) se responden desde
+el índice en memoria del servicio de Sheets; los textos de estadísticas y
+clientes se generan una vez por versión de datos.
 """
-from typing import Any, Dict
+from typing import Any, Dict, Optional, Tuple
+
+# Comando -> (versión del índice, texto)
+_RENDERED: Dict[str, Tuple[int, str]] = {}
+
+SEARCH_LIMIT = 5
+
+def _money(value: float) -> str:
+    return f"${value:,.0f}"
+
+def _render_estadisticas(kpis: Dict[str, Any]) -> str:
+    text = f"""📊 **Estadísticas Red Soluciones ISP**
+
+👥 **Clientes:** {kpis['activos']} activos de {kpis['total']}
+📍 **Zonas:** {kpis['zonas_cubiertas']} cubiertas
+💰 **Ingresos:** {_money(kpis['ingresos_mensuales'])}/mes
+🎫 **Ticket promedio:** {_money(kpis['ticket_promedio'])}
+✅ **Pagados:** {kpis['pagados']} | ⏳ **Pendientes:** {kpis['pendientes']}"""
+    if kpis['zonas_top']:
+        zona, clientes = kpis['zonas_top'][0]
+        text += f"\n\n🏆 **Zona líder:** {zona} ({clientes} clientes)"
+    if kpis['plan_popular']:
+        monto, clientes = kpis['plan_popular']
+        text += f"\n⭐ **Plan popular:** {_money(monto)}/mes ({clientes} clientes)"
+    return text
+
+def _render_clientes(kpis: Dict[str, Any]) -> str:
+    text = f"""👥 **Resumen de Clientes**
+
+📊 **Total:** {kpis['total']} clientes registrados
+🟢 **Activos:** {kpis['activos']} clientes
+🔴 **Inactivos:** {kpis['inactivos']} clientes"""
+    if kpis['zonas_top']:
+        text += "\n\n📍 **Por zonas:**"
+        for zona, clientes in kpis['zonas_top']:
+            text += f"\n• {zona}: {clientes} clientes"
+        otras = kpis['activos'] - sum(clientes for _, clientes in kpis['zonas_top'])
+        if otras > 0:
+            text += f"\n• Otras zonas: {otras} clientes"
+    return text
+
+def _render_busqueda(index, term: str) -> str:
+    if len(term) < 2:
+        return "🔍 Escribe al menos 2 caracteres: `buscar Juan`"
+    
+    positions = index.match(term)
+    if not positions:
+        return f"🔍 **Búsqueda: '{term}'**\n\n❌ Sin resultados en {index.kpis['total']} clientes."
+    
+    text = f"🔍 **Búsqueda: '{term}'** ({len(positions)} resultados)\n"
+    for position in positions[:SEARCH_LIMIT]:
+        client = index.rows[position]
+        estado = "🟢" if str(client.get('Activo (SI/NO)', 'SI')).strip().lower() in ('si', 'sí') else "🔴"
+        text += f"\n{estado} **{client.get('Nombre', 'N/A')}** — {client.get('Zona', 'N/A')}"
+        if client.get('Teléfono'):
+            text += f" — 📱 {client.get('Teléfono')}"
+    if len(positions) > SEARCH_LIMIT:
+        text += f"\n\n… y {len(positions) - SEARCH_LIMIT} más. Usa un término más específico."
+    return text
 
-def handle_telegram_webhook(update: Dict[str, Any]) -> Dict[str, Any]:
-    """Procesa un update de Telegram y devuelve la acción a tomar"""
+def _data_reply(command: str, sheets_service, term: str = '') -> Optional[str]:
+    """Texto de un comando de datos desde el índice en memoria (None si no hay datos)"""
+    if sheets_service is None:
+        return None
+    try:
+        index = sheets_service.get_client_index()
+    except Exception:
+        return None
+    
+    if command == 'buscar':
+        return _render_busqueda(index, term)
+    
+    cached = _RENDERED.get(command)
+    if cached and cached[0] == index.version:
+        return cached[1]
+    text = _render_estadisticas(index.kpis) if command == 'estadisticas' else _render_clientes(index.kpis)
+    _RENDERED[command] = (index.version, text)
+    return text
+
+def _data_response(chat_id: Any, command: str, sheets_service, term: str = '') -> Dict[str, Any]:
+    response_text = _data_reply(command, sheets_service, term)
+    if response_text is None:
+        response_text = "⚠️ Datos no disponibles en este momento. Intenta de nuevo en unos minutos."
+    return {
+        "method": "sendMessage",
+        "chat_id": chat_id,
+        "text": response_text,
+        "parse_mode": "Markdown",
+        "source": "index"
+    }
+
+def handle_telegram_webhook(update: Dict[str, Any], sheets_service=None) -> Dict[str, Any]:
+    """
+    Procesa un update de Telegram y devuelve la acción a tomar.
+    Las respuestas de datos llevan "source": "index" (no requieren al agente).
+    """
     # Obtener chat_id y mensaje de texto
     message = update.get('message') or update.get('edited_message') or {}
     chat = message.get('chat', {})
@@ -46,34 +142,14 @@ def handle_telegram_webhook(update: Dict[str, Any]) -> Dict[str, Any]:
     elif text.lower().startswith('prospecto:'):
         response_text = f"🎯 **Prospecto registrado**\n\n📝 Datos: {text[10:].strip()}\n📅 Seguimiento programado\n📊 Estado: Pendiente contacto\n\n¡Lo contactaremos pronto!"
         
-    elif text.lower() in ['estadísticas', 'estadisticas', 'stats']:
-        response_text = """📊 **Estadísticas Red Soluciones ISP**
-
-👥 **Clientes:** 560 activos
-📍 **Zonas:** 8 cubiertas  
-💰 **Ingresos:** $280,000/mes
-📈 **Crecimiento:** +12% este mes
-
-🏆 **Zona líder:** SALAMANCA (258 clientes)
-⭐ **Plan popular:** Premium ($500/mes)"""
+    elif text.lower() in ['estadísticas', 'estadisticas', 'stats', '/stats']:
+        return _data_response(chat_id, 'estadisticas', sheets_service)
         
-    elif text.lower() in ['clientes', 'listar', 'mostrar']:
-        response_text = """👥 **Resumen de Clientes**
-
-📊 **Total:** 560 clientes registrados
-🟢 **Activos:** 534 clientes
-🟡 **Prospectos:** 26 en seguimiento
-
-📍 **Por zonas:**
-• SALAMANCA: 258 clientes
-• CERRO/BLANCO: 32 clientes  
-• TAMBOR: 24 clientes
-• RESERVA: 12 clientes
-• Otras zonas: 234 clientes"""
+    elif text.lower() in ['clientes', 'listar', 'mostrar', '/clientes']:
+        return _data_response(chat_id, 'clientes', sheets_service)
         
     elif text.lower().startswith('buscar'):
-        term = text[6:].strip()
-        response_text = f"🔍 **Búsqueda: '{term}'**\n\n📋 Resultados encontrados:\n• Consultando base de datos...\n• Analizando 560 registros...\n\n💡 Usa comandos más específicos para mejores resultados."
+        return _data_response(chat_id, 'buscar', sheets_service, text[6:].strip())
         
     elif text.lower().startswith('reportar'):
         problema = text[8:].strip()
@@ -0,0 +1,219 @@
+"""
+Compresión de respuestas - Red Soluciones ISP
+
+- CompressionMiddleware: Brotli o GZip para respuestas de texto/JSON por
+  encima de un umbral; deja pasar streams SSE y respuestas ya codificadas.
+- PrecompressedStaticFiles: StaticFiles que sirve variantes .br/.gz
+  generadas al arranque (en un directorio de cache, no en frontend/) y
+  agrega cabeceras de cache.
+"""
+
+import gzip
+import logging
+import mimetypes
+import os
+from pathlib import Path
+from typing import Any, Dict, List, MutableMapping, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    brotli = None
+    BROTLI_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIBLE_TYPES = (
+    'text/',
+    'application/json',
+    'application/javascript',
+    'application/xml',
+    'image/svg+xml'
+)
+
+# Extensiones de frontend/ que vale la pena precomprimir
+COMPRESSIBLE_EXTENSIONS = {'.html', '.css', '.js', '.json', '.svg', '.txt', '.xml', '.map'}
+
+def _is_compressible(content_type: str) -> bool:
+    return content_type.startswith(COMPRESSIBLE_TYPES) and not content_type.startswith('text/event-stream')
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """'br' o 'gzip' según Accept-Encoding (Brotli solo si el módulo está instalado)"""
+    accepted = set()
+    for item in accept_encoding.lower().split(','):
+        coding, _, params = item.strip().partition(';')
+        if params.strip().replace(' ', '') in ('q=0', 'q=0.0'):
+            continue
+        accepted.add(coding.strip())
+    if BROTLI_AVAILABLE and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted:
+        return 'gzip'
+    return None
+
+def compress(body: bytes, encoding: str, gzip_level: int = 6, brotli_quality: int = 5) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(body, quality=brotli_quality)
+    return gzip.compress(body, compresslevel=gzip_level, mtime=0)
+
+def _add_vary(headers: MutableHeaders):
+    vary = headers.get('vary', '')
+    if 'accept-encoding' not in vary.lower():
+        headers['vary'] = f"{vary}, Accept-Encoding" if vary else "Accept-Encoding"
+
+class CompressionMiddleware:
+    """
+    Middleware ASGI: comprime el cuerpo completo de respuestas compresibles
+    con tamaño >= minimum_size. Las respuestas con Content-Encoding (p. ej.
+    estáticos precomprimidos) y los streams SSE se envían sin tocar.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 5):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get('accept-encoding', ''))
+        if not encoding:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[Dict[str, Any]] = None
+        passthrough = False
+        chunks: List[bytes] = []
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+
+            if message['type'] == 'http.response.start':
+                headers = Headers(raw=message['headers'])
+                if 'content-encoding' in headers or not _is_compressible(headers.get('content-type', '')):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start_message = message
+                return
+
+            if message['type'] != 'http.response.body' or passthrough:
+                await send(message)
+                return
+
+            chunks.append(message.get('body', b''))
+            if message.get('more_body', False):
+                return
+
+            body = b''.join(chunks)
+            headers = MutableHeaders(raw=start_message['headers'])
+            if len(body) >= self.minimum_size:
+                body = compress(body, encoding, self.gzip_level, self.brotli_quality)
+                headers['content-encoding'] = encoding
+                headers['content-length'] = str(len(body))
+                _add_vary(headers)
+            await send(start_message)
+            await send({'type': 'http.response.body', 'body': body})
+
+        await self.app(scope, receive, send_wrapper)
+
+class PrecompressedStaticFiles(StaticFiles):
+    """
+    StaticFiles con variantes .br/.gz precomprimidas y cabeceras de cache.
+
+    precompress() genera las variantes en cache_dir (reflejando las rutas de
+    `directory`) para los archivos compresibles >= minimum_size; se
+    regeneran cuando el original es más reciente.
+    """
+
+    def __init__(
+        self,
+        *args,
+        cache_dir: Optional[Path] = None,
+        minimum_size: int = 1024,
+        max_age: int = 3600,
+        **kwargs
+    ):
+        super().__init__(*args, **kwargs)
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.minimum_size = minimum_size
+        self.max_age = max_age
+        # ruta original -> {encoding: ruta comprimida}
+        self._variants: Dict[str, Dict[str, str]] = {}
+
+    def precompress(self) -> Dict[str, Any]:
+        """Genera las variantes comprimidas (pensado para ejecutarse al arranque, en un hilo)"""
+        if not self.cache_dir or not self.directory:
+            return {'files': 0}
+
+        root = Path(self.directory).resolve()
+        encodings = ['gzip'] + (['br'] if BROTLI_AVAILABLE else [])
+        suffix = {'gzip': '.gz', 'br': '.br'}
+        variants: Dict[str, Dict[str, str]] = {}
+        written = saved = 0
+
+        for path in root.rglob('*'):
+            if not path.is_file() or path.suffix.lower() not in COMPRESSIBLE_EXTENSIONS:
+                continue
+            stat = path.stat()
+            if stat.st_size < self.minimum_size:
+                continue
+
+            body = None
+            for encoding in encodings:
+                target = self.cache_dir / (str(path.relative_to(root)) + suffix[encoding])
+                if not target.exists() or target.stat().st_mtime < stat.st_mtime:
+                    body = body if body is not None else path.read_bytes()
+                    compressed = compress(body, encoding, gzip_level=9, brotli_quality=11)
+                    if len(compressed) >= stat.st_size:
+                        continue
+                    target.parent.mkdir(parents=True, exist_ok=True)
+                    tmp = target.with_name(target.name + '.tmp')
+                    tmp.write_bytes(compressed)
+                    os.replace(tmp, target)
+                    written += 1
+                variants.setdefault(str(path), {})[encoding] = str(target)
+                saved += stat.st_size - target.stat().st_size
+
+        self._variants = variants
+        logger.info(f"🗜️ Estáticos precomprimidos: {len(variants)} archivos ({written} generados, {saved // 1024} KB menos)")
+        return {'files': len(variants), 'generated': written, 'saved_bytes': saved}
+
+    def _cache_control(self, full_path: str) -> str:
+        if full_path.endswith('.html'):
+            # El HTML se revalida siempre (ETag) para tomar nuevas versiones
+            return "no-cache"
+        return f"public, max-age={self.max_age}"
+
+    def file_response(self, full_path, stat_result, scope: MutableMapping[str, Any], status_code: int = 200) -> Response:
+        full_path = str(full_path)
+        variants = self._variants.get(full_path)
+        encoding = choose_encoding(Headers(scope=scope).get('accept-encoding', '')) if variants else None
+
+        if encoding and encoding in variants:
+            variant_path = variants[encoding]
+            response = FileResponse(
+                variant_path,
+                status_code=status_code,
+                stat_result=os.stat(variant_path),
+                media_type=mimetypes.guess_type(full_path)[0] or 'text/plain'
+            )
+            response.headers['content-encoding'] = encoding
+            request_headers = Headers(scope=scope)
+            if self.is_not_modified(response.headers, request_headers):
+                response = NotModifiedResponse(response.headers)
+        else:
+            response = super().file_response(full_path, stat_result, scope, status_code)
+
+        response.headers['cache-control'] = self._cache_control(full_path)
+        if variants:
+            _add_vary(response.headers)
+        return response
@@ -50,6 +50,50 @@ class Settings:
         """Directorio del frontend"""
         return self.BASE_DIR / "frontend"
     
+    @property
+    def DATA_DIR(self) -> Path:
+        """Directorio de datos locales (snapshots, históricos). En Vercel solo /tmp es escribible"""
+        data_dir = os.getenv("DATA_DIR")
+        if data_dir:
+            return Path(data_dir)
+        if os.getenv("VERCEL"):
+            return Path("/tmp/redsoluciones")
+        return self.BASE_DIR / "data"
+    
+    @property
+    def CONTEXT_SNAPSHOT_PATH(self) -> Path:
+        """Snapshot del motor de contexto para arranque rápido"""
+        return Path(os.getenv("CONTEXT_SNAPSHOT_PATH", str(self.DATA_DIR / "context_snapshot.sqlite3")))
+    
+    @property
+    def METRICS_HISTORY_PATH(self) -> Path:
+        """Serie histórica de KPIs registrada en cada sincronización"""
+        return Path(os.getenv("METRICS_HISTORY_PATH", str(self.DATA_DIR / "metrics_history.sqlite3")))
+    
+    @property
+    def CONVERSATION_STORE_PATH(self) -> Optional[Path]:
+        """Persistencia de conversaciones del chat; vacío u 'off' la desactiva"""
+        value = os.getenv("CONVERSATION_STORE_PATH", str(self.DATA_DIR / "conversations.sqlite3"))
+        if value.strip().lower() in ("", "off", "none", "false"):
+            return None
+        return Path(value)
+    
+    @property
+    def STATIC_CACHE_DIR(self) -> Path:
+        """Variantes .br/.gz precomprimidas del frontend"""
+        return Path(os.getenv("STATIC_CACHE_DIR", str(self.DATA_DIR / "static")))
+    
+    # === COMPRESIÓN Y CACHE HTTP ===
+    # Tamaño mínimo (bytes) para comprimir respuestas y precomprimir estáticos
+    COMPRESSION_MIN_SIZE: int = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+    # Cache-Control max-age de CSS/JS/imágenes (el HTML siempre se revalida)
+    STATIC_MAX_AGE: int = int(os.getenv("STATIC_MAX_AGE", "3600"))
+    
+    # === EVENTOS EN VIVO (/api/stream) ===
+    # Cada cuánto se revisa la versión de datos y cada cuánto se envía un heartbeat
+    STREAM_CHECK_INTERVAL: float = float(os.getenv("STREAM_CHECK_INTERVAL", "2"))
+    STREAM_HEARTBEAT: float = float(os.getenv("STREAM_HEARTBEAT", "15"))
+    
     # === GOOGLE SHEETS ===
     @property
     def GOOGLE_CREDENTIALS_PATH(self) -> Path:
@@ -99,6 +143,34 @@ class Settings:
             return ""
         return token
     
+    # Workers que procesan updates de Telegram en paralelo
+    TELEGRAM_WORKERS: int = int(os.getenv("TELEGRAM_WORKERS", "4"))
+    
+    # Ingesta de updates: "webhook" (por defecto) o "polling" (sin URL pública)
+    TELEGRAM_MODE: str = os.getenv("TELEGRAM_MODE", "webhook").strip().lower()
+    
+    @property
+    def TELEGRAM_INLINE_UPDATES(self) -> bool:
+        """
+        Procesar cada update dentro de la petición del webhook en vez de encolarlo.
+        Por defecto en Vercel: el trabajo posterior a la respuesta no está garantizado.
+        """
+        default = "true" if os.getenv("VERCEL") else "false"
+        return os.getenv("TELEGRAM_INLINE_UPDATES", default).strip().lower() in ("1", "true", "yes")
+    
+    # Base de la Bot API (permite apuntar a un servidor local de pruebas)
+    TELEGRAM_API_URL: str = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org")
+    
+    @property
+    def TELEGRAM_WEBHOOK_URL(self) -> str:
+        """URL pública del webhook; vacío = se deriva de la petición a /api/telegram/setup"""
+        return os.getenv("TELEGRAM_WEBHOOK_URL", "")
+    
+    @property
+    def TELEGRAM_OFFSET_PATH(self) -> Path:
+        """Último offset confirmado en modo polling"""
+        return Path(os.getenv("TELEGRAM_OFFSET_PATH", str(self.DATA_DIR / "telegram_offset.json")))
+    
     # === SEGURIDAD ===
     SECRET_KEY: str = os.getenv("SECRET_KEY", secrets.token_urlsafe(32))
     
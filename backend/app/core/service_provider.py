@@ -0,0 +1,87 @@
+"""
+Inicialización diferida de servicios - Red Soluciones ISP
+
+- LazyProvider: construye un servicio (o un grupo de servicios) una sola
+  vez, en el primer uso o desde una tarea de arranque en segundo plano.
+- ServiceInitMiddleware: garantiza que los servicios estén listos antes de
+  atender rutas de la API, también donde no corren los eventos de startup
+  (p. ej. funciones serverless de Vercel).
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Generic, Optional, Tuple, TypeVar
+
+T = TypeVar('T')
+
+logger = logging.getLogger(__name__)
+
+class LazyProvider(Generic[T]):
+    """Resultado de `factory`, calculado una sola vez y compartido entre hilos"""
+
+    def __init__(self, factory: Callable[[], T], name: str):
+        self.factory = factory
+        self.name = name
+        self._value: Optional[T] = None
+        self._ready = False
+        self._lock = threading.Lock()
+        self.init_ms: Optional[float] = None
+        self.error: Optional[str] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._ready
+
+    def get(self) -> Optional[T]:
+        """Construye en la primera llamada; si falla, queda en None (como el arranque clásico)"""
+        if self._ready:
+            return self._value
+
+        with self._lock:
+            if not self._ready:
+                start = time.perf_counter()
+                try:
+                    self._value = self.factory()
+                except Exception as e:
+                    self.error = str(e)
+                    logger.error(f"❌ Error inicializando {self.name}: {e}")
+                self.init_ms = round((time.perf_counter() - start) * 1000, 1)
+                self._ready = True
+                logger.info(f"⚙️ {self.name} inicializado en {self.init_ms} ms")
+        return self._value
+
+    async def aget(self) -> Optional[T]:
+        """get() sin bloquear el event loop mientras se construye"""
+        if self._ready:
+            return self._value
+        return await asyncio.to_thread(self.get)
+
+    def stats(self) -> Dict[str, Any]:
+        return {'ready': self._ready, 'init_ms': self.init_ms, 'error': self.error}
+
+class ServiceInitMiddleware:
+    """
+    Middleware ASGI: espera `initialize()` antes de las rutas con los prefijos
+    dados, salvo las de `exclude` (health checks, webhooks que solo encolan)
+    """
+
+    def __init__(
+        self,
+        app,
+        initialize: Callable[[], Awaitable[Any]],
+        prefixes: Tuple[str, ...] = ('/api',),
+        exclude: Tuple[str, ...] = ()
+    ):
+        self.app = app
+        self.initialize = initialize
+        self.prefixes = prefixes
+        self.exclude = exclude
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http':
+            path = scope['path']
+            if path.startswith(self.prefixes) and path not in self.exclude:
+                await self.initialize()
+        await self.app(scope, receive, send)
@@ -21,20 +21,27 @@ except ImportError:
 
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, RedirectResponse, JSONResponse, HTMLResponse
+from fastapi.responses import FileResponse, RedirectResponse, JSONResponse, HTMLResponse, StreamingResponse
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from pydantic import BaseModel
 from pathlib import Path
 from typing import Optional, Dict, List, Any
+import asyncio
+import json
 import logging
 import traceback
+import time
 from datetime import datetime
 
 from backend.app.services.sheets.service import SheetsServiceV2 as SheetsService
 from backend.app.services.consolidated_agent import ConsolidatedISPAgent
 from backend.app.services.context_engine import ContextEngine
+from backend.app.services.event_stream import DashboardEventHub
+from backend.app.services.telegram_bot import TelegramBot, TelegramClient, TelegramPoller
+from backend.app.utils.json_response import EncodedPayloadCache, FastJSONResponse, dumps, encoded_response, merge_encoded
 from backend.app.utils.logger import get_logger
+from backend.app.core.compression import CompressionMiddleware, PrecompressedStaticFiles
+from backend.app.core.service_provider import LazyProvider, ServiceInitMiddleware
 from backend.app.core.config_unified import settings
 from backend.app.core.user_auth import user_auth
 
@@ -43,9 +50,13 @@ app = FastAPI(
     title=settings.PROJECT_NAME,
     description="Sistema completo de gestión ISP con IA integrada - Unificado",
     version=settings.VERSION,
-    debug=settings.DEBUG
+    debug=settings.DEBUG,
+    default_response_class=FastJSONResponse
 )
 
+# Respuestas grandes ya serializadas, por (endpoint, parámetros) y versión de datos
+encoded_payloads = EncodedPayloadCache(max_entries=512)
+
 # CORS configuration - SEGURA
 allowed_origins = [
     "http://localhost:3000",
@@ -67,6 +78,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compresión Brotli/GZip de JSON y HTML por encima del umbral (los streams SSE no se tocan)
+app.add_middleware(CompressionMiddleware, minimum_size=settings.COMPRESSION_MIN_SIZE)
+
 # Exception handlers
 @app.exception_handler(StarletteHTTPException)
 async def http_exception_handler(request: Request, exc: StarletteHTTPException):
@@ -91,59 +105,187 @@ async def general_exception_handler(request: Request, exc: Exception):
 # para evitar que capture las rutas de API antes de que se definan.
 
 # === CONFIGURACIÓN DE SERVICIOS UNIFICADA ===
-# Inicializar variables globales
+# Los servicios se construyen en la tarea de arranque o con el primer request
+# a /api (ServiceInitMiddleware), no al importar el módulo: autenticar con
+# Google y abrir la hoja ya no forman parte del arranque en frío.
 sheets_service = None
 context_engine = None
+consolidated_agent = None
 enhanced_agent = None
 super_agent = None
 logger = get_logger(__name__)
 
-try:
-    # Instantiate services con configuración centralizada y manejo robusto
-    logger.info("🔧 Inicializando servicios del sistema...")
-    sheets_service = SheetsService()
-    logger.info("✅ SheetsService inicializado")
-    context_engine = ContextEngine(sheets_service)
+def _build_services() -> bool:
+    """Instancia Sheets, ContextEngine y el agente y los conecta con el bot y /api/stream"""
+    global sheets_service, context_engine, consolidated_agent, enhanced_agent, super_agent
+    
     try:
-        consolidated_agent = ConsolidatedISPAgent(sheets_service, context_engine)
-        # Compatibilidad
-        enhanced_agent = consolidated_agent
-        super_agent = consolidated_agent
-        logger.info(f"✅ {settings.PROJECT_NAME} v{settings.VERSION} - Sistema inicializado correctamente")
-    except Exception as agent_error:
-        logger.error(f"❌ Error en inicialización del agente IA: {agent_error}")
+        # Instantiate services con configuración centralizada y manejo robusto
+        logger.info("🔧 Inicializando servicios del sistema...")
+        sheets_service = SheetsService()
+        logger.info("✅ SheetsService inicializado")
+        context_engine = ContextEngine(
+            sheets_service,
+            snapshot_path=settings.CONTEXT_SNAPSHOT_PATH,
+            history_path=settings.METRICS_HISTORY_PATH
+        )
+        try:
+            consolidated_agent = ConsolidatedISPAgent(
+                sheets_service,
+                context_engine,
+                conversation_path=settings.CONVERSATION_STORE_PATH
+            )
+            # Compatibilidad
+            enhanced_agent = consolidated_agent
+            super_agent = consolidated_agent
+            logger.info(f"✅ {settings.PROJECT_NAME} v{settings.VERSION} - Sistema inicializado correctamente")
+        except Exception as agent_error:
+            logger.error(f"❌ Error en inicialización del agente IA: {agent_error}")
+            consolidated_agent = None
+            enhanced_agent = None
+            super_agent = None
+            logger.warning("⚠️ Sistema iniciado sin agente IA, pero con acceso a Google Sheets")
+    except Exception as e:
+        logger.error(f"❌ Error crítico en inicialización de servicios: {e}")
+        sheets_service = None
+        context_engine = None
         consolidated_agent = None
         enhanced_agent = None
         super_agent = None
-        logger.warning("⚠️ Sistema iniciado sin agente IA, pero con acceso a Google Sheets")
-except Exception as e:
-    logger.error(f"❌ Error crítico en inicialización de servicios: {e}")
-    sheets_service = None
-    context_engine = None
-    consolidated_agent = None
-    enhanced_agent = None
-    super_agent = None
-    enhanced_agent = None
-    super_agent = None
-    logger.warning("⚠️ Sistema iniciado en modo seguro sin servicios externos")
+        logger.warning("⚠️ Sistema iniciado en modo seguro sin servicios externos")
+    
+    telegram_bot.agent = consolidated_agent
+    event_hub.sheets_service = sheets_service
+    event_hub.context_engine = context_engine
+    return sheets_service is not None
+
+services = LazyProvider(_build_services, "Servicios del sistema")
+
+async def ensure_services():
+    """Servicios listos; la primera vez se construyen en un hilo sin bloquear el event loop"""
+    await services.aget()
+
+# El health check y el webhook de Telegram (solo encola; los workers esperan
+# a los servicios) responden sin esperar la construcción en frío
+app.add_middleware(
+    ServiceInitMiddleware,
+    initialize=ensure_services,
+    exclude=('/api/health', '/api/telegram/webhook')
+)
+
+# === TELEGRAM BOT ===
+# Handler de comandos importado una sola vez (vive en api/telegram_webhook.py)
+try:
+    import sys
+    sys.path.insert(0, str(Path(__file__).parents[2] / "api"))
+    from telegram_webhook import handle_telegram_webhook
+except ImportError:
+    logger.warning("⚠️ telegram_webhook module not found, using simplified handler")
+    # Función básica de fallback
+    def handle_telegram_webhook(update_data, sheets_service=None):
+        return {"success": False, "message": "Telegram handler not available"}
+
+telegram_bot = TelegramBot(
+    TelegramClient(settings.TELEGRAM_BOT_TOKEN, base_url=settings.TELEGRAM_API_URL),
+    # Estadísticas, clientes y búsqueda desde el índice en memoria del servicio de Sheets
+    lambda update: handle_telegram_webhook(update, sheets_service),
+    consolidated_agent,
+    workers=settings.TELEGRAM_WORKERS,
+    prepare=ensure_services,
+    logger=logger
+)
+# Modo polling (TELEGRAM_MODE=polling): se arranca en startup
+telegram_poller: Optional[TelegramPoller] = None
+
+# === EVENTOS EN VIVO ===
+# Cambios de KPIs/clientes empujados por /api/stream en lugar de polling del frontend
+event_hub = DashboardEventHub(
+    sheets_service,
+    context_engine,
+    interval=settings.STREAM_CHECK_INTERVAL,
+    logger=logger
+)
 
 # === STARTUP EVENT ===
+# Referencias a tareas en segundo plano (evita que el GC las cancele)
+background_tasks = set()
+
+def _run_in_background(coro):
+    """Lanza una corrutina en segundo plano conservando su referencia"""
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
+async def _initialize_context_engine():
+    """Carga completa desde Google Sheets (y actualiza el snapshot)"""
+    try:
+        logger.info("🚀 Inicializando sistema homologado...")
+        result = await context_engine.initialize_system()
+        
+        if result.get('success'):
+            logger.info(f"✅ Sistema homologado inicializado: {result.get('entities_loaded', 0)} entidades cargadas")
+        else:
+            logger.error(f"❌ Error inicializando sistema: {result.get('error')}")
+    except Exception as e:
+        logger.error(f"❌ Error en startup: {e}")
+
 @app.on_event("startup")
 async def startup_event():
-    """Inicializar sistema completo al arranque"""
-    global context_engine, enhanced_agent
+    """Inicializar sistema completo al arranque, en segundo plano (el servidor atiende de inmediato)"""
+    _run_in_background(_warm_up())
+    _run_in_background(_precompress_static_files())
+
+async def _warm_up():
+    """Servicios, modelo de IA, polling de Telegram y contexto (snapshot local o carga desde Sheets)"""
+    await ensure_services()
+    start_telegram_polling()
+    _run_in_background(_preload_ai_model())
     
     if context_engine and enhanced_agent:
-        try:
-            logger.info("🚀 Inicializando sistema homologado...")
-            result = await context_engine.initialize_system()
-            
-            if result.get('success'):
-                logger.info(f"✅ Sistema homologado inicializado: {result.get('entities_loaded', 0)} entidades cargadas")
-            else:
-                logger.error(f"❌ Error inicializando sistema: {result.get('error')}")
-        except Exception as e:
-            logger.error(f"❌ Error en startup: {e}")
+        # Arranque instantáneo desde el snapshot local; reconciliar con Sheets después
+        if await context_engine.load_snapshot():
+            logger.info("⚡ Contexto restaurado desde snapshot, reconciliando con Google Sheets en segundo plano")
+        await _initialize_context_engine()
+
+async def _preload_ai_model():
+    """Importa google.generativeai y crea el modelo en un hilo, antes del primer chat"""
+    if consolidated_agent is None:
+        return
+    try:
+        await asyncio.to_thread(lambda: consolidated_agent.ai_model)
+    except Exception as e:
+        logger.warning(f"⚠️ No se pudo precargar el modelo de IA: {e}")
+
+async def _precompress_static_files():
+    """Genera variantes .br/.gz del frontend sin bloquear el arranque"""
+    try:
+        await asyncio.to_thread(static_files.precompress)
+    except Exception as e:
+        logger.warning(f"⚠️ No se pudieron precomprimir los estáticos: {e}")
+
+def start_telegram_polling() -> Optional[asyncio.Task]:
+    """Lanza el long polling de Telegram si TELEGRAM_MODE=polling"""
+    global telegram_poller
+    
+    if settings.TELEGRAM_MODE != "polling" or telegram_poller is not None:
+        return None
+    if not telegram_bot.client.token:
+        logger.warning("⚠️ TELEGRAM_MODE=polling sin TELEGRAM_BOT_TOKEN, polling deshabilitado")
+        return None
+    
+    telegram_poller = TelegramPoller(telegram_bot, offset_path=settings.TELEGRAM_OFFSET_PATH, logger=logger)
+    return _run_in_background(telegram_poller.run())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Detener workers de Telegram y cerrar conexiones HTTP"""
+    if telegram_poller:
+        telegram_poller.stop()
+    for task in list(background_tasks):
+        task.cancel()
+    await event_hub.stop()
+    await telegram_bot.stop()
 
 class ClientData(BaseModel):
     nombre: str
@@ -175,6 +317,126 @@ class ChatMessage(BaseModel):
     user_name: Optional[str] = None
     session_id: Optional[str] = None
 
+class ChatBatch(BaseModel):
+    messages: List[str]
+    user_id: Optional[str] = None
+    user_name: Optional[str] = None
+    session_id: Optional[str] = None
+
+def _build_chat_user_context(msg: ChatMessage) -> Optional[Dict[str, Any]]:
+    """Contexto de usuario del chat a partir de la sesión (si existe)"""
+    user_context = None
+    if msg.user_id:
+        try:
+            # Validar sesión si existe session_id
+            if msg.session_id:
+                session = user_auth.validate_session(msg.session_id)
+                if session:
+                    user_context = {
+                        "user_id": msg.user_id,
+                        "session_id": msg.session_id,
+                        "username": session.get("username", "Unknown"),
+                        "name": session.get("name", "Unknown"),
+                        "role": session.get("role", "user")
+                    }
+                    logger.info(f"💬 Chat - Usuario autenticado: {user_context['name']} ({user_context['username']})")
+                else:
+                    # Sesión inválida o expirada
+                    user_context = {"user_id": msg.user_id, "session_id": msg.session_id}
+                    logger.info(f"💬 Chat - Sesión inválida: {msg.user_id}")
+            else:
+                # Sin sesión, usuario básico
+                user_context = {"user_id": msg.user_id}
+                logger.info(f"💬 Chat - Usuario básico: {msg.user_id}")
+        except Exception as e:
+            logger.warning(f"⚠️ Error validando usuario: {e}")
+            user_context = {"user_id": msg.user_id}
+    return user_context
+
+def _sse_event(event: str, payload: Dict[str, Any]) -> str:
+    """Formatea un evento Server-Sent Events"""
+    return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False, default=str)}\n\n"
+
+def _sse_response(events) -> StreamingResponse:
+    """Respuesta SSE sin buffering en proxies"""
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def _stream_agent_events(message: str, user_context: Optional[Dict[str, Any]], build_done):
+    """Traduce los eventos del agente a SSE; build_done da forma al payload final"""
+    try:
+        async for item in consolidated_agent.stream_query(message, user_context):
+            if item['event'] == 'delta':
+                yield _sse_event("delta", {"text": item['text']})
+            else:
+                yield _sse_event("done", build_done(item['response']))
+    except Exception as e:
+        logger.error(f"Error in chat stream: {e}")
+        yield _sse_event("error", {"message": "Error procesando mensaje", "detail": str(e)})
+
+def _parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """Convierte 'Nombre,Zona' en la lista de campos a proyectar"""
+    if not fields:
+        return None
+    return [f.strip() for f in fields.split(',') if f.strip()]
+
+def _summarize_active_clients(clients: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Clientes activos, ingresos mensuales, clientes premium (pago >= 400) y zonas"""
+    active_clients = [
+        c for c in clients
+        if str(c.get('Activo (SI/NO)', '')).strip().lower() in ['si', 'sí', 'yes', '1', 'true', 'activo']
+    ]
+    monthly_revenue = 0.0
+    premium_clients = 0
+    zones = set()
+    for client in active_clients:
+        pago_str = str(client.get('Pago', '0')).replace('$', '').replace(',', '').strip()
+        try:
+            pago = float(pago_str) if pago_str else 0.0
+            monthly_revenue += pago
+            if pago >= 400:  # Umbral premium
+                premium_clients += 1
+        except ValueError:
+            pass
+        zona = str(client.get('Zona', '')).strip()
+        if zona:
+            zones.add(zona)
+    return {
+        "active": len(active_clients),
+        "monthly_revenue": monthly_revenue,
+        "premium_clients": premium_clients,
+        "zones": len(zones)
+    }
+
+def _kpis_from_clients(clients: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Payload de /api/dashboard/kpis"""
+    summary = _summarize_active_clients(clients)
+    return {
+        "total_clients": summary["active"],
+        "monthly_revenue": summary["monthly_revenue"],
+        "active_zones": summary["zones"],
+        "premium_percentage": (summary["premium_clients"] / max(summary["active"], 1)) * 100,
+        "total_registered": len(clients)
+    }
+
+def _dashboard_from_clients(clients: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Payload de /api/dashboard"""
+    summary = _summarize_active_clients(clients)
+    total_clients = summary["active"]
+    # Satisfacción aproximada como porcentaje de clientes premium
+    satisfaction = (summary["premium_clients"] / total_clients * 100) if total_clients else 0.0
+    return {
+        "total_clients": total_clients,
+        "active_users": total_clients,
+        "monthly_revenue": summary["monthly_revenue"],
+        "satisfaction": round(satisfaction, 2),
+        "zones_active": summary["zones"],
+        "premium_clients": summary["premium_clients"]
+    }
+
 # === RUTAS PRINCIPALES ===
 
 # Health check endpoint
@@ -426,6 +688,7 @@ async def health_check():
         "version": "2.0.0",
         "port": 8004,
         "services": {
+            "initialized": services.ready,
             "google_sheets": sheets_service is not None,
             "google_sheets_connected": sheets_status.get("status") == "connected" if sheets_status else False,
             "super_agent": super_agent is not None
@@ -460,32 +723,7 @@ async def chat(msg: ChatMessage):
     """Process chat message with intelligent AI agent and user context"""
     try:
         # Crear contexto de usuario simple
-        user_context = None
-        if msg.user_id:
-            try:
-                # Validar sesión si existe session_id
-                if msg.session_id:
-                    session = user_auth.validate_session(msg.session_id)
-                    if session:
-                        user_context = {
-                            "user_id": msg.user_id,
-                            "session_id": msg.session_id,
-                            "username": session.get("username", "Unknown"),
-                            "name": session.get("name", "Unknown"),
-                            "role": session.get("role", "user")
-                        }
-                        logger.info(f"💬 Chat - Usuario autenticado: {user_context['name']} ({user_context['username']})")
-                    else:
-                        # Sesión inválida o expirada
-                        user_context = {"user_id": msg.user_id, "session_id": msg.session_id}
-                        logger.info(f"💬 Chat - Sesión inválida: {msg.user_id}")
-                else:
-                    # Sin sesión, usuario básico
-                    user_context = {"user_id": msg.user_id}
-                    logger.info(f"💬 Chat - Usuario básico: {msg.user_id}")
-            except Exception as e:
-                logger.warning(f"⚠️ Error validando usuario: {e}")
-                user_context = {"user_id": msg.user_id}
+        user_context = _build_chat_user_context(msg)
         
         if consolidated_agent:
             # Usar el agente consolidado con contexto
@@ -499,6 +737,7 @@ async def chat(msg: ChatMessage):
                 "type": response.action_type.value,
                 "data": response.data,
                 "execution_time": response.execution_time,
+                "stage_timings": response.stage_timings,
                 "user_context": user_context if user_context else None
             }
             
@@ -519,6 +758,64 @@ async def chat(msg: ChatMessage):
             "user_context": user_context if 'user_context' in locals() else None
         }
 
+@app.post("/api/chat/stream")
+async def chat_stream(msg: ChatMessage):
+    """Chat en streaming (SSE): los primeros fragmentos llegan mientras la IA genera"""
+    user_context = _build_chat_user_context(msg)
+    
+    if not consolidated_agent:
+        async def unavailable():
+            yield _sse_event("done", {
+                "response": "Agente no disponible temporalmente.",
+                "suggestions": ["Reiniciar sistema", "Contactar soporte"],
+                "confidence": 0.0,
+                "user_context": user_context
+            })
+        return _sse_response(unavailable())
+    
+    def build_done(response):
+        return {
+            "response": response.message,
+            "suggestions": response.suggestions,
+            "confidence": response.confidence,
+            "type": response.action_type.value,
+            "data": response.data,
+            "execution_time": response.execution_time,
+            "stage_timings": response.stage_timings,
+            "user_context": user_context
+        }
+    
+    return _sse_response(_stream_agent_events(msg.message, user_context, build_done))
+
+@app.post("/api/chat/batch")
+async def chat_batch(batch: ChatBatch):
+    """Procesa varias consultas del agente en una sola petición (resultados en orden)"""
+    if not consolidated_agent:
+        raise HTTPException(status_code=503, detail="Agente no disponible")
+    if not batch.messages:
+        raise HTTPException(status_code=400, detail="Lista de mensajes vacía")
+    
+    user_context = _build_chat_user_context(
+        ChatMessage(message="", user_id=batch.user_id, user_name=batch.user_name, session_id=batch.session_id)
+    )
+    if batch.user_name:
+        user_context = {**(user_context or {}), "propietario": batch.user_name}
+    
+    start_time = time.perf_counter()
+    try:
+        results = await consolidated_agent.process_batch(batch.messages, user_context)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return {
+        "success": True,
+        "results": results,
+        "count": len(results),
+        "unique": sum(1 for r in results if "duplicate_of" not in r),
+        "execution_time": round(time.perf_counter() - start_time, 4),
+        "timestamp": datetime.now().isoformat()
+    }
+
 @app.get("/api/chat/suggestions")
 async def get_chat_suggestions(q: str = ""):
     """Get smart suggestions for chat input"""
@@ -631,10 +928,45 @@ async def logout_user(session_data: dict):
 # === DATOS DE NEGOCIO Y GESTIÓN DE CLIENTES ===
 
 @app.get("/api/clients")
-async def get_all_clients(owner: Optional[str] = None):
-    """Obtener todos los clientes con filtro opcional por propietario"""
+async def get_all_clients(
+    owner: Optional[str] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    zona: Optional[str] = None,
+    activo: Optional[str] = None,
+    pagado: Optional[str] = None,
+    sort: Optional[str] = None,
+    q: Optional[str] = None,
+    search: Optional[str] = None
+):
+    """
+    Clientes con filtros, orden y paginación resueltos en el servidor.
+    Sin parámetros devuelve la lista completa; con `limit` devuelve una
+    página y `next_cursor` para pedir la siguiente. `search` es alias de `q`.
+    """
     try:
-        if sheets_service:
+        if sheets_service and hasattr(sheets_service, 'query_clients'):
+            # Índice de clientes por versión de datos; cada página se codifica una vez por versión
+            index = await asyncio.to_thread(sheets_service.get_client_index)
+            params = {
+                "limit": limit,
+                "cursor": cursor,
+                "zona": zona,
+                "activo": activo,
+                "pagado": pagado,
+                "owner": (owner or '').strip() or None,
+                "sort": sort,
+                "q": (q or search or '').strip() or None
+            }
+            
+            key = tuple(sorted(params.items()))
+            body = encoded_payloads.get('clients', key, index.version)
+            if body is None:
+                # Se consulta el mismo índice cuya versión forma la clave, fuera del event loop
+                page = await asyncio.to_thread(sheets_service.query_clients, index=index, **params)
+                body = encoded_payloads.put('clients', key, index.version, {"success": True, **page})
+            return encoded_response(body)
+        elif sheets_service:
             # Si se especifica propietario y el servicio soporta filtrado
             if owner and hasattr(sheets_service, 'get_clients_by_owner'):
                 clients = sheets_service.get_clients_by_owner(owner, include_inactive=True)
@@ -659,6 +991,8 @@ async def get_all_clients(owner: Optional[str] = None):
                 "message": "Servicio de Google Sheets no disponible",
                 "data": []
             }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error getting clients: {e}")
         return {
@@ -870,36 +1204,7 @@ async def get_dashboard_kpis():
         if sheets_service:
             # Obtener datos reales desde Google Sheets
             clients = sheets_service.get_all_clients(include_inactive=True)
-            active_clients = [c for c in clients if str(c.get('Activo (SI/NO)', '')).strip().lower() in ['si', 'sí', 'yes', '1', 'true', 'activo']]
-            
-            # Calcular ingresos
-            total_revenue = 0
-            premium_count = 0
-            zones = set()
-            
-            for client in active_clients:
-                pago_str = str(client.get('Pago', '0')).replace('$', '').replace(',', '').strip()
-                try:
-                    pago = float(pago_str) if pago_str else 0
-                    total_revenue += pago
-                    if pago >= 400:  # Umbral premium
-                        premium_count += 1
-                except:
-                    pass
-                
-                zona = client.get('Zona', '').strip()
-                if zona:
-                    zones.add(zona)
-            
-            premium_percentage = (premium_count / max(len(active_clients), 1)) * 100
-            
-            return {
-                "total_clients": len(active_clients),
-                "monthly_revenue": total_revenue,
-                "active_zones": len(zones),
-                "premium_percentage": premium_percentage,
-                "total_registered": len(clients)
-            }
+            return _kpis_from_clients(clients)
         
         # Si no hay servicio de sheets, usar agente consolidado
         if consolidated_agent:
@@ -930,40 +1235,8 @@ async def dashboard_data():
     """Datos principales del dashboard - Compatibilidad con frontend"""
     try:
         if sheets_service:
-            # Obtener datos básicos de clientes activos
             clients = sheets_service.get_all_clients(include_inactive=True)
-            active_clients = [
-                c for c in clients
-                if str(c.get('Activo (SI/NO)', '')).strip().lower() in ['si', 'sí', 'yes', '1', 'true', 'activo']
-            ]
-            total_clients = len(active_clients)
-            # Calcular ingresos mensuales y clientes premium
-            monthly_revenue = 0.0
-            premium_clients = 0
-            zones = set()
-            for client in active_clients:
-                pago_str = str(client.get('Pago', '0')).replace('$', '').replace(',', '').strip()
-                try:
-                    pago = float(pago_str) if pago_str else 0.0
-                    monthly_revenue += pago
-                    if pago >= 400:
-                        premium_clients += 1
-                except:
-                    pass
-                zona = client.get('Zona', '').strip()
-                if zona:
-                    zones.add(zona)
-            zones_active = len(zones)
-            # Satisfacción aproximada como porcentaje de clientes premium
-            satisfaction = (premium_clients / total_clients * 100) if total_clients else 0.0
-            return {
-                "total_clients": total_clients,
-                "active_users": total_clients,
-                "monthly_revenue": monthly_revenue,
-                "satisfaction": round(satisfaction, 2),
-                "zones_active": zones_active,
-                "premium_clients": premium_clients
-            }
+            return _dashboard_from_clients(clients)
         # Fallback con datos mock
         return {
             "total_clients": 0,
@@ -985,6 +1258,94 @@ async def dashboard_data():
             "premium_clients": 312
         }
 
+# === BOOTSTRAP DEL FRONTEND ===
+
+# Evita que varias cargas simultáneas de la página repitan las lecturas a Sheets
+bootstrap_lock = asyncio.Lock()
+
+# Registros más recientes que se incluyen por sección (la tabla de actividad reciente)
+BOOTSTRAP_RECENT = {"clients": 5, "prospects": 3, "incidents": 3}
+
+def _bootstrap_section(result: Any, recent: int) -> Dict[str, Any]:
+    """Total de registros y los `recent` más nuevos (las hojas agregan al final)"""
+    if isinstance(result, Exception):
+        return {"success": False, "message": f"Error: {str(result)}", "count": 0, "recent": []}
+    return {"success": True, "count": len(result), "recent": list(reversed(result[-recent:])) if recent else []}
+
+@app.get("/api/bootstrap")
+async def bootstrap(owner: Optional[str] = None):
+    """
+    Carga inicial del frontend en una sola petición: totales y registros
+    recientes de clientes, prospectos e incidentes, estado de Sheets,
+    dashboard y KPIs (del propietario si se indica), todo de la misma versión
+    de datos. Las lecturas se hacen en paralelo y el cuerpo JSON se guarda
+    hasta la siguiente escritura; la salud del sistema se calcula en cada
+    petición y se agrega fuera de los bytes guardados.
+    """
+    if not sheets_service or not hasattr(sheets_service, 'get_client_index'):
+        return {
+            "success": False,
+            "message": "Servicio de Google Sheets no disponible",
+            "health": await system_health()
+        }
+    
+    owner_key = (owner or '').strip().lower()
+    try:
+        index = await asyncio.to_thread(sheets_service.get_client_index)
+        body = encoded_payloads.get('bootstrap', owner_key, index.version)
+        if body is None:
+            async with bootstrap_lock:
+                # Otra petición pudo haberlo construido mientras esperábamos
+                body = encoded_payloads.get('bootstrap', owner_key, index.version)
+                if body is None:
+                    body = await _build_bootstrap(index, owner_key)
+        
+        return encoded_response(merge_encoded(body, {"health": await system_health()}))
+    except Exception as e:
+        logger.error(f"Error building bootstrap payload: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def _build_bootstrap(index, owner_key: str) -> bytes:
+    """Bytes del bootstrap de `index`; se guardan solo si la lectura fue completa y consistente"""
+    prospects, incidents, sheets_status = await asyncio.gather(
+        asyncio.to_thread(sheets_service.get_prospects),
+        asyncio.to_thread(sheets_service.get_incidents),
+        asyncio.to_thread(sheets_service.test_connection),
+        return_exceptions=True
+    )
+    if isinstance(sheets_status, Exception):
+        sheets_status = {"status": "error", "message": str(sheets_status)}
+    
+    clients = index.rows
+    if owner_key:
+        clients = [c for c in clients if str(c.get('Propietario', '')).strip().lower() == owner_key]
+    
+    payload = {
+        "success": True,
+        "version": index.version,
+        "owner": owner_key or None,
+        "clients": _bootstrap_section(clients, BOOTSTRAP_RECENT["clients"]),
+        "prospects": _bootstrap_section(prospects, BOOTSTRAP_RECENT["prospects"]),
+        "incidents": _bootstrap_section(incidents, BOOTSTRAP_RECENT["incidents"]),
+        "sheets_status": {
+            "success": True,
+            "sheets_connected": sheets_status.get("status") == "connected",
+            "details": sheets_status
+        },
+        "dashboard": _dashboard_from_clients(clients),
+        "kpis": _kpis_from_clients(clients),
+        "generated_at": datetime.now().isoformat()
+    }
+    
+    complete = (
+        not any(isinstance(r, Exception) for r in (prospects, incidents))
+        and sheets_status.get("status") == "connected"
+    )
+    if complete and sheets_service.data_version == index.version:
+        return encoded_payloads.put('bootstrap', owner_key, index.version, payload)
+    # Lectura parcial o datos cambiados durante la carga: se responde sin guardar
+    return dumps(payload)
+
 @app.get("/api/analytics")
 async def get_analytics():
     """Get advanced analytics data"""
@@ -1008,79 +1369,60 @@ async def get_analytics():
         logger.error(f"Error getting analytics: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# === EVENTOS EN VIVO (SSE) ===
+
+@app.get("/api/stream")
+async def dashboard_stream(request: Request):
+    """
+    Server-Sent Events del dashboard: `kpis` al conectarse y cuando cambian,
+    `clients_changed` y `data_changed` tras escrituras o recargas de Sheets.
+    Reemplaza el polling periódico del frontend.
+    """
+    async def events():
+        # Reconexión automática del EventSource tras 5 s si se corta
+        yield "retry: 5000\n\n"
+        async with event_hub.subscribe() as queue:
+            while not await request.is_disconnected():
+                try:
+                    event, payload = await asyncio.wait_for(queue.get(), timeout=settings.STREAM_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    # Comentario SSE: mantiene viva la conexión a través de proxies
+                    yield ": heartbeat\n\n"
+                    continue
+                yield _sse_event(event, payload)
+    
+    return _sse_response(events())
+
 # === TELEGRAM BOT WEBHOOK ===
 
 @app.post("/api/telegram/webhook")
 async def telegram_webhook(request: Request):
-    """Webhook para el bot de Telegram - Integrado con Carlos"""
+    """
+    Webhook para el bot de Telegram - Integrado con Carlos.
+    Responde de inmediato; el update se procesa en el pool de workers.
+    Con TELEGRAM_INLINE_UPDATES (por defecto en Vercel) se procesa antes de responder.
+    """
     try:
-        # Importar el handler del webhook
-        import sys
-        from pathlib import Path
-        api_dir = Path(__file__).parents[2] / "api"
-        sys.path.insert(0, str(api_dir))
-        
-        try:
-            from telegram_webhook import handle_telegram_webhook
-        except ImportError:
-            logger.warning("⚠️ telegram_webhook module not found, using simplified handler")
-            # Función básica de fallback
-            def handle_telegram_webhook(update_data):
-                return {"success": False, "message": "Telegram handler not available"}
-        
-        # Obtener los datos del update
         update_data = await request.json()
-        logger.info(f"📱 Telegram webhook recibido: {update_data}")
-        
-        # Extraer mensaje para procesarlo con Carlos
-        message = update_data.get('message', {})
-        text = message.get('text', '').strip()
-        chat_id = message.get('chat', {}).get('id')
-        
-        # Si hay texto, procesarlo primero con Carlos (IA real)
-        carlos_response = None
-        if text and text.lower() not in ['/start', '/help']:
-            try:
-                # Usar el agente consolidado ya disponible
-                if consolidated_agent:
-                    carlos_result = await consolidated_agent.process_query(text)
-                    
-                    if carlos_result and carlos_result.message:
-                        carlos_response = carlos_result.message
-                        
-            except Exception as e:
-                logger.warning(f"Carlos no disponible para Telegram: {e}")
-        
-        # Procesar el update con el webhook handler
-        response = handle_telegram_webhook(update_data)
-        
-        # Si Carlos respondió, usar su respuesta
-        if carlos_response and response.get("method") == "sendMessage":
-            response["text"] = f"🤖 **Carlos - Red Soluciones ISP**\n\n{carlos_response}"
-        
-        if response.get("method") == "sendMessage":
-            # Enviar respuesta directamente a Telegram
-            import requests
-            
-            # Usar token desde configuración
-            from .core.config_unified import settings
-            token = settings.TELEGRAM_BOT_TOKEN
-            telegram_api_url = f"https://api.telegram.org/bot{token}/sendMessage"
-            
-            requests.post(telegram_api_url, json={
-                "chat_id": response["chat_id"],
-                "text": response["text"],
-                "parse_mode": response.get("parse_mode", "Markdown")
-            })
-            
-            logger.info(f"📱 Respuesta enviada a Telegram chat {chat_id}")
-            return {"status": "message_sent"}
-        
-        return response
-        
     except Exception as e:
         logger.error(f"Error en webhook de Telegram: {e}")
         return {"status": "error", "message": str(e)}
+    
+    if not isinstance(update_data, dict):
+        raise HTTPException(status_code=400, detail="El update de Telegram debe ser un objeto JSON")
+    
+    logger.info(f"📱 Telegram webhook recibido: update {update_data.get('update_id')}")
+    
+    if settings.TELEGRAM_INLINE_UPDATES:
+        # Serverless: la función puede congelarse al responder, así que se procesa aquí
+        processed = await telegram_bot.process_now(update_data)
+        return {"status": "processed" if processed else "duplicate"}
+    
+    if not telegram_bot.submit(update_data):
+        # Cola llena: Telegram reintenta el update más tarde
+        raise HTTPException(status_code=503, detail="Cola de Telegram llena")
+    
+    return {"status": "queued"}
 
 @app.get("/api/telegram/test")
 async def test_telegram_bot():
@@ -1122,25 +1464,16 @@ async def test_telegram_bot():
         return {"status": "error", "message": str(e)}
 
 @app.get("/api/telegram/setup")
-async def setup_telegram_webhook():
+async def setup_telegram_webhook(request: Request):
     """Configurar webhook de Telegram"""
     try:
-        import requests
-        from .core.config_unified import settings
-        
-        # URL del webhook (será la URL de Vercel + /api/telegram/webhook)
-        webhook_url = "https://tu-proyecto.vercel.app/api/telegram/webhook"
+        # TELEGRAM_WEBHOOK_URL o, si no está configurada, la URL pública de este servidor
+        webhook_url = settings.TELEGRAM_WEBHOOK_URL or str(request.url_for("telegram_webhook"))
         
         # Configurar webhook en Telegram usando token desde configuración
-        token = settings.TELEGRAM_BOT_TOKEN
-        telegram_api_url = f"https://api.telegram.org/bot{token}/setWebhook"
-        
-        response = requests.post(telegram_api_url, json={
-            "url": webhook_url
-        })
+        result = await telegram_bot.client.call("setWebhook", {"url": webhook_url})
         
-        if response.status_code == 200:
-            result = response.json()
+        if result.get("ok"):
             return {
                 "success": True,
                 "message": "Webhook configurado exitosamente",
@@ -1151,8 +1484,8 @@ async def setup_telegram_webhook():
             return {
                 "success": False,
                 "message": "Error configurando webhook",
-                "status_code": response.status_code,
-                "response": response.text
+                "webhook_url": webhook_url,
+                "response": result
             }
             
     except Exception as e:
@@ -1185,7 +1518,13 @@ async def get_system_status():
             "version": "4.0 Homologado",
             "entities_loaded": entity_count,
             "cache_health": cache_stats,
-            "available_users": list(context_engine.user_contexts.keys()),
+            "available_users": context_engine.get_available_users(),
+            "data_version": context_engine.data_version,
+            "loaded_from_snapshot": context_engine.loaded_from_snapshot,
+            "ai_response_cache": enhanced_agent.response_cache.stats(),
+            "encoded_payloads": encoded_payloads.stats(),
+            "event_stream": event_hub.stats(),
+            "services": services.stats(),
             "last_sync": max(context_engine.cache_timestamps.values()) if context_engine.cache_timestamps else None
         }
         
@@ -1198,22 +1537,50 @@ async def get_system_status():
         }
 
 @app.get("/api/v2/context/{propietario}")
-async def get_full_context(propietario: str):
-    """Obtener contexto completo para un propietario"""
+async def get_full_context(
+    propietario: str,
+    section: Optional[str] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None
+):
+    """Obtener contexto completo para un propietario (o una página de una sección)"""
     try:
         if not context_engine:
             raise HTTPException(status_code=503, detail="Context Engine no disponible")
         
-        full_context = await context_engine.get_full_context(propietario)
+        # Paginación: una sección del contexto con proyección de campos
+        if section or limit or cursor or fields:
+            try:
+                page = await context_engine.get_context_page(
+                    propietario,
+                    section=section or 'clientes',
+                    limit=limit,
+                    cursor=cursor,
+                    fields=_parse_fields(fields)
+                )
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            
+            if 'error' in page:
+                raise HTTPException(status_code=404, detail=page['error'])
+            
+            return {
+                "success": True,
+                "context": page,
+                "timestamp": datetime.now().isoformat()
+            }
         
-        if 'error' in full_context:
-            raise HTTPException(status_code=404, detail=full_context['error'])
+        # Contexto serializado una vez por versión de datos (sin re-serializar clientes)
+        version = context_engine.data_version
+        body = encoded_payloads.get('context', propietario, version)
+        if body is None:
+            context = await context_engine.get_full_context(propietario)
+            if 'error' in context:
+                raise HTTPException(status_code=404, detail="Contexto no disponible")
+            body = encoded_payloads.put('context', propietario, version, {"success": True, "context": context})
         
-        return {
-            "success": True,
-            "context": full_context,
-            "timestamp": datetime.now().isoformat()
-        }
+        return encoded_response(merge_encoded(body, {"timestamp": datetime.now().isoformat()}))
         
     except HTTPException:
         raise
@@ -1274,6 +1641,54 @@ async def enhanced_chat(request: Request):
             "suggestions": ["Reformular la consulta", "Verificar conectividad"]
         }
 
+@app.post("/api/v2/chat/enhanced/stream")
+async def enhanced_chat_stream(request: Request):
+    """Chat mejorado en streaming (SSE)"""
+    data = await request.json()
+    message = data.get("message", "").strip()
+    propietario = data.get("user_name", "Sistema")
+    session_id = data.get("session_id")
+    
+    if not consolidated_agent or not message:
+        async def rejected():
+            yield _sse_event("done", {
+                "success": False,
+                "message": "Sistema de IA no disponible" if message else "Mensaje vacío",
+                "suggestions": ["Intentar más tarde"] if message else ["Escribir una consulta específica"]
+            })
+        return _sse_response(rejected())
+    
+    def build_done(response):
+        return {
+            "success": True,
+            "message": response.message,
+            "action_type": response.action_type.value,
+            "confidence": response.confidence,
+            "data": response.data,
+            "suggestions": response.suggestions,
+            "quick_actions": response.quick_actions,
+            "context_used": response.context_used,
+            "timestamp": datetime.now().isoformat()
+        }
+    
+    user_context = {"propietario": propietario, "session_id": session_id}
+    return _sse_response(_stream_agent_events(message, user_context, build_done))
+
+@app.get("/api/v2/agent/metrics")
+async def get_agent_metrics():
+    """Latencias por etapa del pipeline del agente y eficacia de la cache IA"""
+    if not consolidated_agent:
+        raise HTTPException(status_code=503, detail="Agente no disponible")
+    
+    return {
+        "success": True,
+        "metrics": {
+            **consolidated_agent.get_metrics(),
+            "telegram": {**telegram_bot.stats(), **(telegram_poller.stats() if telegram_poller else {'mode': 'webhook'})}
+        },
+        "timestamp": datetime.now().isoformat()
+    }
+
 @app.get("/api/v2/insights/{propietario}")
 async def get_business_insights(propietario: str):
     """Obtener insights automáticos del negocio"""
@@ -1338,92 +1753,107 @@ async def get_enhanced_dashboard(propietario: str):
         if not context_engine:
             raise HTTPException(status_code=503, detail="Context Engine no disponible")
         
-        # Obtener contexto completo
-        full_context = await context_engine.get_full_context(propietario)
-        
-        if 'error' in full_context:
-            raise HTTPException(status_code=404, detail=full_context['error'])
-        
-        business_context = full_context.get('business_context', {})
-        user_context = full_context.get('user_context', {})
-        
-        # Construir dashboard optimizado
-        dashboard_data = {
-            "propietario": propietario,
-            "global_metrics": {
-                "total_clientes": business_context.get('total_clientes', 0),
-                "clientes_activos": business_context.get('clientes_activos', 0),
-                "ingresos_mensuales": business_context.get('ingresos_mensuales', 0),
-                "incidentes_abiertos": business_context.get('incidentes_abiertos', 0),
-                "arpu": business_context.get('arpu', 0),
-                "churn_rate": business_context.get('churn_rate', 0)
-            },
-            "personal_metrics": user_context.get('kpis_personales', {}),
-            "quick_stats": {
-                "mis_clientes": len(user_context.get('clientes_asignados', [])),
-                "mis_prospectos": len(user_context.get('prospectos_pipeline', [])),
-                "mis_incidentes": len(user_context.get('incidentes_responsable', [])),
-                "mis_zonas": len(user_context.get('zonas_responsable', []))
-            },
-            "system_status": full_context.get('system_status', {}),
-            "quick_actions": full_context.get('quick_actions', []),
-            "recent_insights": full_context.get('insights', [])
-        }
+        # Dashboard serializado una vez por versión de datos
+        version = context_engine.data_version
+        body = encoded_payloads.get('owner_dashboard', propietario, version)
+        if body is None:
+            dashboard = await context_engine.get_dashboard(propietario)
+            if dashboard is None:
+                raise HTTPException(status_code=404, detail="Contexto no disponible")
+            body = encoded_payloads.put('owner_dashboard', propietario, version, {"success": True, "dashboard": dashboard})
+        
+        return encoded_response(merge_encoded(body, {"timestamp": datetime.now().isoformat()}))
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting enhanced dashboard for {propietario}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/v2/metrics/history")
+async def get_metrics_history(
+    metric: str = "total_clientes",
+    scope: str = "global",
+    key: str = "all",
+    bucket: str = "day",
+    agg: str = "last",
+    days: int = 30
+):
+    """Serie histórica de un KPI agregada por periodo (global, propietario o zona)"""
+    try:
+        if not context_engine or not context_engine.metrics_history:
+            raise HTTPException(status_code=503, detail="Histórico de métricas no disponible")
+        
+        start = time.time() - max(days, 1) * 86400
+        series = context_engine.metrics_history.rollup(
+            metric, scope=scope, key=key, bucket=bucket, agg=agg, start=start
+        )
         
         return {
             "success": True,
-            "dashboard": dashboard_data,
+            "metric": metric,
+            "scope": scope,
+            "key": key,
+            "bucket": bucket,
+            "agg": agg,
+            "series": series,
             "timestamp": datetime.now().isoformat()
         }
         
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error getting enhanced dashboard for {propietario}: {e}")
+        logger.error(f"Error getting metrics history: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/v2/entities/search")
 async def search_entities(
     q: str, 
     entity_type: Optional[str] = None,
-    propietario: Optional[str] = None
+    propietario: Optional[str] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    include_relationships: bool = False
 ):
-    """Búsqueda avanzada de entidades"""
+    """Búsqueda avanzada de entidades (paginada)"""
     try:
         if not context_engine:
             raise HTTPException(status_code=503, detail="Context Engine no disponible")
         
-        from backend.app.services.context_engine import search_entities
-        
-        # Realizar búsqueda
-        results = search_entities(context_engine, q, entity_type)
-        
-        # Filtrar por propietario si se especifica
-        if propietario:
-            results = [r for r in results if r.propietario == propietario]
-        
-        # Formatear resultados
-        formatted_results = []
-        for result in results:
-            formatted_results.append({
-                "id": result.id,
-                "type": result.type,
-                "data": result.data,
-                "propietario": result.propietario,
-                "last_updated": result.last_updated.isoformat(),
-                "relationships": result.relationships
-            })
-        
-        return {
-            "success": True,
-            "results": formatted_results,
-            "count": len(formatted_results),
-            "query": q,
-            "filters": {
-                "entity_type": entity_type,
-                "propietario": propietario
+        # Búsqueda paginada con filtros y proyección resueltos en el motor
+        def build():
+            page = context_engine.search_page(
+                q,
+                entity_type=entity_type,
+                propietario=propietario,
+                limit=limit,
+                cursor=cursor,
+                fields=_parse_fields(fields),
+                include_relationships=include_relationships
+            )
+            return {
+                "success": True,
+                "results": page['items'],
+                "count": page['count'],
+                "next_cursor": page['next_cursor'],
+                "stale_cursor": page['stale_cursor'],
+                "query": q,
+                "filters": {
+                    "entity_type": entity_type,
+                    "propietario": propietario
+                }
             }
-        }
+        
+        key = (q, entity_type, propietario, limit, cursor, fields, include_relationships)
+        try:
+            body = encoded_payloads.get_or_encode('entities_search', key, context_engine.data_version, build)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        return encoded_response(body)
         
     except HTTPException:
         raise
@@ -1434,7 +1864,15 @@ async def search_entities(
 # === MOUNT FRONTEND AL FINAL ===
 # Montar el directorio 'frontend' en la raíz para servir la SPA/sitio estático.
 # IMPORTANTE: Esto debe ir al final, después de todas las rutas API.
-app.mount("/", StaticFiles(directory=settings.FRONTEND_DIR, html=True), name="frontend")
+# Las variantes .br/.gz se generan en startup (static_files.precompress)
+static_files = PrecompressedStaticFiles(
+    directory=settings.FRONTEND_DIR,
+    html=True,
+    cache_dir=settings.STATIC_CACHE_DIR,
+    minimum_size=settings.COMPRESSION_MIN_SIZE,
+    max_age=settings.STATIC_MAX_AGE
+)
+app.mount("/", static_files, name="frontend")
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,132 @@
+"""
+🚦 GOBERNADOR DE LLAMADAS IA - Red Soluciones ISP
+================================================
+
+Limita las llamadas a Gemini con un token bucket (tasa sostenida + ráfaga)
+y un semáforo de concurrencia. Si la espera en cola supera el SLO de
+latencia la llamada se rechaza y el agente responde con su fallback
+estructurado en lugar de degradar todos los chats.
+"""
+
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+class AIThrottled(Exception):
+    """La llamada no obtuvo turno dentro del SLO de espera"""
+
+class TokenBucket:
+    """Token bucket con reservas: quien llega primero recibe el siguiente token"""
+
+    def __init__(self, rate_per_second: float, capacity: int):
+        self.rate = rate_per_second
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+
+    def reserve(self, max_wait: float) -> Optional[float]:
+        """
+        Reserva un token y devuelve los segundos a esperar hasta poder usarlo,
+        o None (sin consumir) si la espera superaría max_wait
+        """
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+        wait = 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.rate
+        if wait > max_wait:
+            return None
+        self._tokens -= 1
+        return wait
+
+class AIGovernor:
+    """Token bucket + semáforo con métricas de cola y espera"""
+
+    RECENT_WINDOW = 500
+
+    def __init__(self, rate_per_minute: float = 60, burst: int = 10, max_concurrency: int = 4, max_queue_wait: float = 3.0):
+        self.bucket = TokenBucket(rate_per_minute / 60.0, burst)
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue_wait = max_queue_wait
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.in_flight = 0
+        self.calls = 0
+        self.throttled = 0
+        self._waits = deque(maxlen=self.RECENT_WINDOW)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[float]:
+        """
+        Turno para una llamada al modelo; entrega la espera en cola (s).
+
+        Raises:
+            AIThrottled: si no hay turno dentro de max_queue_wait
+        """
+        start = time.monotonic()
+        self.queue_depth += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+        acquired = False
+        try:
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), timeout=self.max_queue_wait)
+            except asyncio.TimeoutError:
+                self._reject(start)
+            acquired = True
+
+            wait = self.bucket.reserve(self.max_queue_wait - (time.monotonic() - start))
+            if wait is None:
+                self._reject(start)
+            if wait:
+                await asyncio.sleep(wait)
+        except BaseException:
+            if acquired:
+                self._semaphore.release()
+            raise
+        finally:
+            self.queue_depth -= 1
+
+        waited = time.monotonic() - start
+        self._waits.append(waited)
+        self.calls += 1
+        self.in_flight += 1
+        try:
+            yield waited
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    def _reject(self, start: float):
+        self.throttled += 1
+        self._waits.append(time.monotonic() - start)
+        raise AIThrottled(f"Sin turno para la IA en {self.max_queue_wait:.1f}s")
+
+    def stats(self) -> Dict[str, Any]:
+        waits = sorted(self._waits)
+
+        def percentile(p: float) -> Optional[float]:
+            if not waits:
+                return None
+            return round(waits[min(len(waits) - 1, int(len(waits) * p))] * 1000, 3)
+
+        return {
+            'rate_per_minute': round(self.bucket.rate * 60, 3),
+            'burst': self.bucket.capacity,
+            'max_concurrency': self.max_concurrency,
+            'max_queue_wait_seconds': self.max_queue_wait,
+            'queue_depth': self.queue_depth,
+            'max_queue_depth': self.max_queue_depth,
+            'in_flight': self.in_flight,
+            'calls': self.calls,
+            'throttled': self.throttled,
+            'wait_ms': {
+                'window': len(waits),
+                'avg': round(sum(waits) / len(waits) * 1000, 3) if waits else None,
+                'p50': percentile(0.5),
+                'p95': percentile(0.95),
+                'max': round(waits[-1] * 1000, 3) if waits else None
+            }
+        }
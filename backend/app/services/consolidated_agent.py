@@ -14,36 +14,64 @@ Fecha: 2025-07-26
 """
 
 import asyncio
+import importlib.util
 import json
 import logging
 import re
 import os
-from typing import Dict, List, Any, Optional, Tuple, Union
+import time
+import unicodedata
+from typing import AsyncIterator, Dict, List, Any, Optional, Tuple, Union
 from datetime import datetime, timedelta
-from dataclasses import dataclass
+from dataclasses import dataclass, field, replace
 from enum import Enum
 
+from backend.app.services.ai_governor import AIGovernor, AIThrottled
+from backend.app.services.conversation_store import ConversationStore
+from backend.app.services.pipeline_metrics import PipelineMetrics, StageTimer
+from backend.app.services.response_cache import ResponseCache, normalize_query
+
 # === CONFIGURACIÓN GEMINI AI ===
+# google.generativeai se importa y configura al crear el primer modelo,
+# no al importar el agente (reduce el arranque en frío)
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 GEMINI_AVAILABLE = False
 genai = None
 try:
-    import google.generativeai as genai
-    
-    api_key = os.getenv("GEMINI_API_KEY")
-    if api_key and len(api_key) > 20:
-        genai.configure(api_key=api_key)
+    if importlib.util.find_spec("google.generativeai") is None:
+        raise ImportError
+    if GEMINI_API_KEY and len(GEMINI_API_KEY) > 20:
         GEMINI_AVAILABLE = True
-        logging.info("✅ IA Empresarial: Sistema operacional")
     else:
         logging.warning("⚠️ GEMINI_API_KEY no configurado - Funcionando con respuestas estructuradas")
 except ImportError:
     logging.warning("⚠️ Módulo google-generativeai no disponible")
-    genai = None
-except Exception as e:
-    logging.error(f"❌ Error configurando IA: {e}")
-    genai = None
+
+def _load_genai():
+    """Importa y configura google.generativeai en el primer uso"""
+    global genai, GEMINI_AVAILABLE
+    if genai is None and GEMINI_AVAILABLE:
+        try:
+            import google.generativeai as genai_module
+            genai_module.configure(api_key=GEMINI_API_KEY)
+            genai = genai_module
+            logging.info("✅ IA Empresarial: Sistema operacional")
+        except Exception as e:
+            logging.error(f"❌ Error configurando IA: {e}")
+            GEMINI_AVAILABLE = False
+    return genai
+
+def _chunk_text(chunk) -> str:
+    """Texto de un fragmento de Gemini; `.text` lanza ValueError si el fragmento fue bloqueado"""
+    try:
+        return getattr(chunk, 'text', '') or ''
+    except ValueError as e:
+        raise AIResponseBlocked(str(e)) from e
 
 # === TIPOS DE DATOS ===
+class AIResponseBlocked(Exception):
+    """Gemini devolvió un fragmento sin texto (bloqueado por filtros de seguridad)"""
+
 class ActionType(Enum):
     """Tipos de acciones del agente"""
     CLIENTE_ALTA = "cliente_alta"
@@ -74,6 +102,7 @@ class AgentResponse:
     quick_actions: List[Dict[str, str]]
     context_used: Dict[str, Any]
     execution_time: float
+    stage_timings: Dict[str, float] = field(default_factory=dict)  # ms por etapa del pipeline
 
 @dataclass
 class BusinessInsight:
@@ -106,6 +135,146 @@ class ProspectoData:
     estado: str = "Pendiente"
     propietario: str = ""
 
+# === ROUTER DE INTENCIONES ===
+# (intención, acción, extractor, patrones). Los patrones se escriben sin acentos
+# (el router pliega el texto) y gana la coincidencia más a la izquierda; en
+# empate, la intención listada primero. Las altas van ancladas al inicio
+# ("Cliente: ...") para que una mención a mitad de frase no registre nada.
+INTENT_SPECS = [
+    # === CONSULTAS ===
+    ('cliente_info', ActionType.CLIENTE_INFO, '_extract_search_term', [
+        r'informacion\s+(?:del\s+)?cliente(?:\s*:\s*|\s+)(.+)',
+        r'datos\s+(?:del\s+)?cliente(?:\s*:\s*|\s+)(.+)',
+        r'buscar\s+cliente(?:\s*:\s*|\s+)(.+)',
+        r'ver\s+cliente(?:\s*:\s*|\s+)(.+)',
+        # Sin dos puntos: "Cliente : ..." es un alta, no una búsqueda
+        r'cliente\s+(?![\s:])(.+)(?:\s+informacion|\s+datos|$)'
+    ]),
+    ('estadisticas', ActionType.ESTADISTICAS, None, [
+        r'estadisticas?',
+        r'reporte',
+        r'numeros',
+        r'metricas',
+        r'dashboard',
+        r'resumen'
+    ]),
+    ('analisis', ActionType.ANALISIS, '_extract_analysis_target', [
+        r'analisis\s+(.+)',
+        r'analizar\s+(.+)',
+        r'revisar\s+(.+)',
+        r'evaluar\s+(.+)'
+    ]),
+    # === ALTAS (ancladas al inicio del mensaje) ===
+    ('cliente_alta', ActionType.CLIENTE_ALTA, '_extract_cliente_data_flexible', [
+        r'^cliente\s*:\s*(.*)',
+        r'^alta\s+(?:de\s+)?cliente\s*:?\s*(.*)',
+        r'^registrar\s+cliente\s*:?\s*(.*)',
+        r'^nuevo\s+cliente\s*:?\s*(.*)',
+        r'^(?:agregar|anadir)\s+cliente\s*:?\s*(.*)'
+    ]),
+    ('prospecto_alta', ActionType.PROSPECTO_ALTA, '_extract_prospecto_data_flexible', [
+        r'^prospecto\b[:\s]*(.*)',
+        r'^alta\s+(?:de\s+)?prospecto\s*:?\s*(.*)',
+        r'^nuevo\s+prospecto\s*:?\s*(.*)',
+        r'^lead\b[:\s]*(.*)'
+    ]),
+    ('incidente_crear', ActionType.INCIDENTE_CREAR, '_extract_incidente_data_flexible', [
+        r'^incidente\b[:\s]*(.*)',
+        r'^crear\s+incidente\s*:?\s*(.*)',
+        r'^nuevo\s+incidente\s*:?\s*(.*)',
+        r'^problema\b[:\s]*(.*)'
+    ])
+]
+
+# === ALTA MASIVA ===
+# "Cliente: ..." / "Prospecto: ..." por línea, o "Clientes:" como encabezado del bloque
+BULK_LINE_PREFIX = re.compile(r'^(clientes?|prospectos?|leads?)\s*:\s*(.*)$', re.IGNORECASE)
+
+# Encabezados CSV reconocidos (normalizados) -> campo
+BULK_HEADER_FIELDS = {
+    'nombre': 'nombre',
+    'email': 'email',
+    'correo': 'email',
+    'zona': 'zona',
+    'telefono': 'telefono',
+    'tel': 'telefono',
+    'celular': 'telefono',
+    'pago': 'pago',
+    'pago mensual': 'pago',
+    'mensualidad': 'pago',
+    'monto': 'pago'
+}
+
+BULK_REQUIRED_FIELDS = {
+    'cliente': ('nombre', 'email', 'zona', 'telefono', 'pago'),
+    'prospecto': ('nombre', 'telefono', 'zona')
+}
+
+class _FoldTable(dict):
+    """Tabla para str.translate: cada carácter en minúscula y sin marcas, calculado al primer uso"""
+
+    def __missing__(self, code: int) -> str:
+        char = chr(code)
+        lower = char.lower()
+        # NFD separa la letra base de sus marcas (é -> e + ´); se conserva solo la base
+        folded = unicodedata.normalize('NFD', lower)[0] if len(lower) == 1 else char
+        self[code] = folded
+        return folded
+
+_FOLD_TABLE = _FoldTable()
+
+def fold_accents(text: str) -> str:
+    """
+    Minúsculas sin acentos ni diéresis, carácter por carácter: la posición de
+    cada letra coincide con la del texto original (en NFC).
+    """
+    return text.translate(_FOLD_TABLE)
+
+class RoutedMatch:
+    """Match del patrón ganador sobre el texto plegado, con los grupos tomados del original"""
+
+    def __init__(self, match: re.Match, original: str):
+        self._match = match
+        self._original = original
+
+    def group(self, index: int = 0) -> Optional[str]:
+        start, end = self._match.span(index)
+        return None if start < 0 else self._original[start:end]
+
+    def groups(self) -> Tuple[Optional[str], ...]:
+        return tuple(self.group(i) for i in range(1, self._match.re.groups + 1))
+
+class IntentRouter:
+    """
+    Clasificador de intenciones compilado una sola vez.
+    
+    Todos los patrones se combinan en una alternancia con grupos nombrados:
+    una sola búsqueda sobre el texto sin acentos devuelve la coincidencia más
+    a la izquierda y, en empate, la de la intención listada primero. Solo el
+    patrón ganador se reaplica para extraer sus grupos de captura, que se
+    devuelven con los acentos del mensaje original.
+    """
+
+    def __init__(self, specs: List[Tuple[str, ActionType, Optional[str], List[str]]]):
+        self.routes: Dict[str, Tuple[str, re.Pattern]] = {}
+        alternatives = []
+        for intent, _action, _extractor, patterns in specs:
+            for index, pattern in enumerate(patterns):
+                group = f"{intent}__{index}"
+                self.routes[group] = (intent, re.compile(pattern, re.IGNORECASE))
+                alternatives.append(f"(?P<{group}>{pattern})")
+        self.combined = re.compile('|'.join(alternatives), re.IGNORECASE)
+
+    def route(self, text: str) -> Optional[Tuple[str, RoutedMatch]]:
+        """Devuelve (intención, match del patrón ganador) o None"""
+        text = unicodedata.normalize('NFC', text)
+        folded = fold_accents(text)
+        found = self.combined.search(folded)
+        if not found:
+            return None
+        intent, pattern = self.routes[found.lastgroup]
+        return intent, RoutedMatch(pattern.match(folded, found.start()), text)
+
 class ConsolidatedISPAgent:
     """
     🧠 AGENTE IA EMPRESARIAL CONSOLIDADO
@@ -121,233 +290,40 @@ class ConsolidatedISPAgent:
     - ✅ Gestión de incidentes
     - ✅ Reportes ejecutivos
     - ✅ Procesamiento de lenguaje natural
+    """
 
-    def __init__(self, sheets_service=None, context_engine=None):
-        self.sheets_service = sheets_service
-        self.context_engine = context_engine
-        self.logger = logging.getLogger(__name__)
-        self.company = "Red Soluciones ISP"
-        self.version = "4.0 Consolidado"
-        self.role = "SUPER_ADMINISTRADOR_CONSOLIDADO"
-        self.ai_model = None
-        if GEMINI_AVAILABLE and genai is not None:
-            try:
-                self.ai_model = genai.GenerativeModel(
-                    'gemini-2.5-pro',
-                    system_instruction=self._get_consolidated_prompt()
-                )
-                self.logger.info("🧠 IA Consolidada configurada exitosamente")
-            except Exception as e:
-                self.logger.error(f"❌ Error configurando IA: {e}")
-        self._setup_patterns()
-        self.business_metrics = {
-            "target_monthly_revenue": 150000,
-            "standard_plan": 350,
-            "premium_plan": 500,
-            "enterprise_plan": 750,
-            "churn_threshold": 5
-        }
-        self.conversation_memory = {}
-        self.fallback_responses = {
-            "greeting": "Listo. ¿Qué necesitas?",
-            "help": "Comandos: estadísticas | buscar [nombre] | Cliente: nombre,email,zona,teléfono,pago",
-            "error": "Error. Revisa formato.",
-            "unknown": "No se reconoce el comando. Usa 'ayuda' para ver opciones."
-        }
-        self.logger.info(f"🧠 Agente Consolidado v{self.version} inicializado exitosamente")
-    def _get_consolidated_prompt(self) -> str:
-        return (
-            "Eres CARLOS, administrador de backend de Red Soluciones ISP para Omar y Eduardo.\n"
-            "\nROL: Administrador operativo del sistema backend\n"
-            "PERSONALIDAD: Directo, eficiente, sin charla innecesaria\n"
-            "RESPUESTAS: Solo lo que se pide, máximo 2-3 líneas\n"
-            "\nFUNCIONES PRINCIPALES:\n"
-            "- Alta/consulta clientes y prospectos\n"
-            "- Estadísticas del negocio\n"
-            "- Crear incidentes técnicos\n"
-            "- Análisis operativos\n"
-            "\nFORMATO:\n"
-            "✅ Cliente María López registrada. Zona Norte.\n"
-            "❌ Error: Cliente no encontrado.\n"
-            "📊 534 clientes activos, $158K ingresos mensuales.\n"
-            "\nNO digas: 'puedo ayudarte', 'estoy aquí para', explicaciones largas.\n"
-            "SÍ responde: Datos directos, resultados claros, estado de operaciones.\n"
-            "\nOmar y Eduardo necesitan eficiencia operativa, no conversación.\n"
-            "- Acciones recomendadas claras\n"
-            "\nCOMANDOS CLAVE:\n"
-            "- 'Cliente: [datos]' → Alta de cliente\n"
-            "- 'Prospecto: [datos]' → Alta de prospecto\n"
-            "- 'Incidente: [descripción]' → Crear incidente\n"
-            "- 'Estadísticas' → Reporte completo\n"
-            "- 'Información [nombre]' → Datos del cliente\n"
-            "\nResponde siempre con información útil y accionable."
-        )
-    def _setup_patterns(self):
-        self.intent_patterns = {
-            'cliente_alta': {
-                'patterns': [
-                    r'cliente[:\s]*(.*)',
-                    r'alta\s+cliente\s*(.*)',
-                    r'registrar\s+cliente\s*(.*)',
-                    r'nuevo\s+cliente\s*(.*)',
-                    r'(?:agregar|añadir)\s+cliente\s*(.*)'
-                ],
-                'action': ActionType.CLIENTE_ALTA,
-                'extractor': self._extract_cliente_data_flexible
-            },
-            'cliente_info': {
-                'patterns': [
-                    r'información\s+(?:del\s+)?cliente\s+(.+)',
-                    r'datos\s+(?:del\s+)?cliente\s+(.+)',
-                    r'buscar\s+cliente\s+(.+)',
-                    r'ver\s+cliente\s+(.+)',
-                    r'cliente\s+(.+)(?:\s+información|\s+datos|$)'
-                ],
-                'action': ActionType.CLIENTE_INFO,
-                'extractor': self._extract_search_term
-            },
-            'prospecto_alta': {
-                'patterns': [
-                    r'prospecto[:\s]*(.*)',
-                    r'alta\s+prospecto\s*(.*)',
-                    r'nuevo\s+prospecto\s*(.*)',
-                    r'lead[:\s]*(.*)'
-                ],
-                'action': ActionType.PROSPECTO_ALTA,
-                'extractor': self._extract_prospecto_data_flexible
-            },
-            'incidente_crear': {
-                'patterns': [
-                    r'incidente[:\s]*(.*)',
-                    r'crear\s+incidente\s*(.*)',
-                    r'nuevo\s+incidente\s*(.*)',
-                    r'problema[:\s]*(.*)'
-                ],
-                'action': ActionType.INCIDENTE_CREAR,
-                'extractor': self._extract_incidente_data_flexible
-            },
-            'estadisticas': {
-                'patterns': [
-                    r'estadísticas?',
-                    r'reporte',
-                    r'números',
-                    r'métricas',
-                    r'dashboard',
-                    r'resumen'
-                ],
-                'action': ActionType.ESTADISTICAS,
-                'extractor': lambda x: {}
-            },
-            'analisis': {
-                'patterns': [
-                    r'análisis\s+(.+)',
-                    r'analizar\s+(.+)',
-                    r'revisar\s+(.+)',
-                    r'evaluar\s+(.+)'
-                ],
-                'action': ActionType.ANALISIS,
-                'extractor': self._extract_analysis_target
-            }
-        }
-        self.data_patterns = {
-            'cliente': r'([^,]+),\s*([^,]+),\s*([^,]+),\s*([^,]+),\s*(\d+)',
-            'prospecto': r'([^,]+),\s*([^,]+),\s*([^,]+)',
-            'email': r'[\w\.-]+@[\w\.-]+\.\w+',
-            'telefono': r'\b\d{3}[-.\s]?\d{3,4}[-.\s]?\d{4}\b',
-            'zona': r'\b(?:norte|sur|este|oeste|centro|zona\s+\d+)\b',
-            'pago': r'\b\d{2,6}\b'
-        }
-    def _extract_cliente_data_flexible(self, data_string: str) -> 'ClienteData':
-        campos = [x.strip() for x in re.split(r',|;', data_string) if x.strip()]
-        nombre = email = zona = telefono = pago = None
-        for campo in campos:
-            if re.match(self.data_patterns['email'], campo):
-                email = campo
-            elif re.match(self.data_patterns['telefono'], campo):
-                telefono = campo
-            elif re.match(self.data_patterns['zona'], campo, re.IGNORECASE):
-                zona = campo
-            elif re.match(self.data_patterns['pago'], campo):
-                pago = float(campo)
-            elif not nombre:
-                nombre = campo
-        missing = []
-        if not nombre: missing.append('nombre')
-        if not email: missing.append('email')
-        if not zona: missing.append('zona')
-        if not telefono: missing.append('teléfono')
-        if not pago: missing.append('pago')
-        if missing:
-            raise ValueError(f"Faltan datos: {', '.join(missing)}. Ejemplo: Cliente: Nombre, email, zona, teléfono, pago")
-        return ClienteData(nombre=nombre, email=email, zona=zona, telefono=telefono, pago=pago)
-    def _extract_prospecto_data_flexible(self, data_string: str) -> 'ProspectoData':
-        campos = [x.strip() for x in re.split(r',|;', data_string) if x.strip()]
-        nombre = telefono = zona = None
-        for campo in campos:
-            if re.match(self.data_patterns['telefono'], campo):
-                telefono = campo
-            elif re.match(self.data_patterns['zona'], campo, re.IGNORECASE):
-                zona = campo
-            elif not nombre:
-                nombre = campo
-        missing = []
-        if not nombre: missing.append('nombre')
-        if not telefono: missing.append('teléfono')
-        if not zona: missing.append('zona')
-        if missing:
-            raise ValueError(f"Faltan datos: {', '.join(missing)}. Ejemplo: Prospecto: Nombre, teléfono, zona")
-        return ProspectoData(nombre=nombre, telefono=telefono, zona=zona)
-    def _extract_incidente_data_flexible(self, data_string: str) -> dict:
-        descripcion = data_string.strip()
-        if not descripcion:
-            raise ValueError("Falta la descripción del incidente. Ejemplo: Incidente: descripción del problema")
-        return {"descripcion": descripcion}
-    async def _process_intent(self, intent: Dict, query: str, user_context: Optional[Dict[str, Any]] = None) -> AgentResponse:
-        # ...existing code...
-    async def _process_with_ai(self, query: str, user_context: Optional[Dict[str, Any]] = None) -> AgentResponse:
-        # ...existing code...
-    def _fallback_response(self, query: str) -> AgentResponse:
-        # ...existing code...
-    def _extract_cliente_data(self, data_string: str) -> ClienteData:
-        # ...existing code...
-    def _extract_prospecto_data(self, data_string: str) -> ProspectoData:
-        # ...existing code...
-    def _extract_search_term(self, data_string: str) -> Dict[str, str]:
-        # ...existing code...
-    def _extract_incidente_data(self, data_string: str) -> Dict[str, str]:
-        # ...existing code...
-    def _extract_analysis_target(self, data_string: str) -> Dict[str, str]:
-        # ...existing code...
-    async def _handle_cliente_alta(self, cliente_data: ClienteData) -> AgentResponse:
-        # ...existing code...
-    async def _handle_cliente_info(self, search_data: Dict[str, str]) -> AgentResponse:
-        # ...existing code...
-    async def _handle_prospecto_alta(self, prospecto_data: ProspectoData) -> AgentResponse:
-        # ...existing code...
-    async def _handle_incidente_crear(self, incidente_data: Dict[str, str]) -> AgentResponse:
-        # ...existing code...
-    async def _handle_estadisticas(self) -> AgentResponse:
-        # ...existing code...
-    async def _handle_analisis(self, analysis_data: Dict[str, str]) -> AgentResponse:
-        # ...existing code...
-    def _analyze_revenue(self, data: List[Dict]) -> List[str]:
-        # ...existing code...
-    def _analyze_zones(self, data: List[Dict]) -> List[str]:
-        # ...existing code...
-    def _analyze_clients(self, data: List[Dict]) -> List[str]:
-        # ...existing code...
-    def _general_analysis(self, data: List[Dict]) -> List[str]:
-        # ...existing code...
-    async def _get_business_context(self) -> Dict[str, Any]:
-        # ...existing code...
-    def _generate_suggestions(self, query: str) -> List[str]:
-        # ...existing code...
-    def _generate_quick_actions(self, query: str) -> List[Dict[str, str]]:
-        # ...existing code...
-    async def chat(self, message: str, user_context: Optional[Dict[str, Any]] = None) -> str:
-        # ...existing code...
-    def process_message(self, message: str) -> str:
-        # ...existing code...
+    # Router compilado al cargar la clase (compartido por todas las instancias)
+    INTENT_ROUTER = IntentRouter(INTENT_SPECS)
+    
+    # Etapas de process_query
+    PIPELINE_STAGES = ('normalize', 'route', 'extract', 'handler', 'format')
+    
+    # Procesamiento por lotes
+    BATCH_MAX_MESSAGES = 50
+    BATCH_AI_CONCURRENCY = 3
+    
+    # Alta masiva (una sola escritura a Sheets por mensaje)
+    BULK_MAX_ROWS = 200
+    BULK_REPORT_ROWS = 20
+    
+    # Vigencia del snapshot analítico (la hoja también se edita a mano)
+    ANALYTICS_TTL = 300
+    
+    # Historial de conversación incluido en el prompt
+    AI_HISTORY_MAX_CHARS = 1500
+    
+    # Presupuesto del contexto empresarial enviado a la IA
+    AI_CONTEXT_TOKEN_BUDGET = int(os.getenv("AI_CONTEXT_TOKEN_BUDGET", "600"))
+    AI_CONTEXT_TTL = 120  # segundos (sin motor de contexto no hay versión de datos)
+    CHARS_PER_TOKEN = 4
+    
+    # Límite de llamadas a Gemini (cuota) y SLO de espera en cola
+    AI_RATE_PER_MINUTE = float(os.getenv("AI_RATE_PER_MINUTE", "60"))
+    AI_BURST = int(os.getenv("AI_BURST", "10"))
+    AI_MAX_CONCURRENCY = int(os.getenv("AI_MAX_CONCURRENCY", "4"))
+    AI_MAX_QUEUE_WAIT = float(os.getenv("AI_MAX_QUEUE_WAIT", "3"))  # segundos
+
+    def __init__(self, sheets_service=None, context_engine=None, conversation_path=None):
         self.sheets_service = sheets_service
         self.context_engine = context_engine
         self.logger = logging.getLogger(__name__)
@@ -357,16 +333,9 @@ class ConsolidatedISPAgent:
         self.version = "4.0 Consolidado"
         self.role = "SUPER_ADMINISTRADOR_CONSOLIDADO"
         # === CONFIGURACIÓN IA ===
-        self.ai_model = None
-        if GEMINI_AVAILABLE and genai is not None:
-            try:
-                self.ai_model = genai.GenerativeModel(
-                    'gemini-2.5-pro',
-                    system_instruction=self._get_consolidated_prompt()
-                )
-                self.logger.info("🧠 IA Consolidada configurada exitosamente")
-            except Exception as e:
-                self.logger.error(f"❌ Error configurando IA: {e}")
+        # El modelo se crea en el primer uso (ver ai_model)
+        self._ai_model = None
+        self._ai_model_loaded = False
         # === CONFIGURACIÓN DE PATRONES ===
         self._setup_patterns()
         # === MÉTRICAS EMPRESARIALES ===
@@ -378,15 +347,55 @@ class ConsolidatedISPAgent:
             "churn_threshold": 5
         }
         # === MEMORIA DE CONVERSACIÓN ===
-        self.conversation_memory = {}
+        self.conversation_memory = ConversationStore(persist_path=conversation_path, logger=self.logger)
+        # === MÉTRICAS DEL PIPELINE ===
+        self.pipeline_metrics = PipelineMetrics(self.PIPELINE_STAGES)
+        # === CACHE DE RESPUESTAS IA ===
+        self.response_cache = ResponseCache()
+        # === LÍMITE DE LLAMADAS IA ===
+        self.ai_governor = AIGovernor(
+            rate_per_minute=self.AI_RATE_PER_MINUTE,
+            burst=self.AI_BURST,
+            max_concurrency=self.AI_MAX_CONCURRENCY,
+            max_queue_wait=self.AI_MAX_QUEUE_WAIT
+        )
+        # Snapshot analítico compartido (estadísticas, análisis y contexto IA)
+        self._analytics_snapshot: Optional[Dict[str, Any]] = None
+        self._analytics_lock = asyncio.Lock()
+        self._local_data_generation = 0
+        # Contexto compacto para prompts: propietario -> (versión, creado, contexto)
+        self._business_context_cache: Dict[str, Tuple[Tuple[Any, int], float, Dict[str, Any]]] = {}
         # === RESPUESTAS ESTRUCTURADAS ===
         self.fallback_responses = {
             "greeting": "Listo. ¿Qué necesitas?",
             "help": "Comandos: estadísticas | buscar [nombre] | Cliente: nombre,email,zona,teléfono,pago",
-            "error": "Error. Revisa formato."
+            "error": "Error. Revisa formato.",
+            "unknown": "No se reconoce el comando. Usa 'ayuda' para ver opciones."
         }
         self.logger.info(f"🧠 Agente Consolidado v{self.version} inicializado exitosamente")
 
+    @property
+    def ai_model(self):
+        """Modelo Gemini, creado (e importado google.generativeai) en el primer acceso"""
+        if not self._ai_model_loaded:
+            self._ai_model_loaded = True
+            genai_module = _load_genai()
+            if genai_module is not None:
+                try:
+                    self._ai_model = genai_module.GenerativeModel(
+                        'gemini-2.5-pro',
+                        system_instruction=self._get_consolidated_prompt()
+                    )
+                    self.logger.info("🧠 IA Consolidada configurada exitosamente")
+                except Exception as e:
+                    self.logger.error(f"❌ Error configurando IA: {e}")
+        return self._ai_model
+
+    @ai_model.setter
+    def ai_model(self, model):
+        self._ai_model = model
+        self._ai_model_loaded = True
+
     def _get_consolidated_prompt(self) -> str:
         return (
             "Eres CARLOS, administrador de backend de Red Soluciones ISP para Omar y Eduardo.\n"
@@ -462,82 +471,16 @@ class ConsolidatedISPAgent:
         if not descripcion:
             raise ValueError("Falta la descripción del incidente. Ejemplo: Incidente: descripción del problema")
         return {"descripcion": descripcion}
-- "Estadísticas" → Reporte completo
-- "Información [nombre]" → Datos del cliente
-
-Responde siempre con información útil y accionable."""
 
     def _setup_patterns(self):
         """Configurar patrones de reconocimiento de intenciones"""
         self.intent_patterns = {
-            # === GESTIÓN DE CLIENTES ===
-            'cliente_alta': {
-                'patterns': [
-                    r'cliente[:\s]*(.*)',
-                    r'alta\s+cliente\s*(.*)',
-                    r'registrar\s+cliente\s*(.*)',
-                    r'nuevo\s+cliente\s*(.*)',
-                    r'(?:agregar|añadir)\s+cliente\s*(.*)'
-                ],
-                'action': ActionType.CLIENTE_ALTA,
-                'extractor': self._extract_cliente_data_flexible
-            },
-            'cliente_info': {
-                'patterns': [
-                    r'información\s+(?:del\s+)?cliente\s+(.+)',
-                    r'datos\s+(?:del\s+)?cliente\s+(.+)',
-                    r'buscar\s+cliente\s+(.+)',
-                    r'ver\s+cliente\s+(.+)',
-                    r'cliente\s+(.+)(?:\s+información|\s+datos|$)'
-                ],
-                'action': ActionType.CLIENTE_INFO,
-                'extractor': self._extract_search_term
-            },
-            # === GESTIÓN DE PROSPECTOS ===
-            'prospecto_alta': {
-                'patterns': [
-                    r'prospecto[:\s]*(.*)',
-                    r'alta\s+prospecto\s*(.*)',
-                    r'nuevo\s+prospecto\s*(.*)',
-                    r'lead[:\s]*(.*)'
-                ],
-                'action': ActionType.PROSPECTO_ALTA,
-                'extractor': self._extract_prospecto_data_flexible
-            },
-            # === GESTIÓN DE INCIDENTES ===
-            'incidente_crear': {
-                'patterns': [
-                    r'incidente[:\s]*(.*)',
-                    r'crear\s+incidente\s*(.*)',
-                    r'nuevo\s+incidente\s*(.*)',
-                    r'problema[:\s]*(.*)'
-                ],
-                'action': ActionType.INCIDENTE_CREAR,
-                'extractor': self._extract_incidente_data_flexible
-            },
-            # === ANÁLISIS Y ESTADÍSTICAS ===
-            'estadisticas': {
-                'patterns': [
-                    r'estadísticas?',
-                    r'reporte',
-                    r'números',
-                    r'métricas',
-                    r'dashboard',
-                    r'resumen'
-                ],
-                'action': ActionType.ESTADISTICAS,
-                'extractor': lambda x: {}
-            },
-            'analisis': {
-                'patterns': [
-                    r'análisis\s+(.+)',
-                    r'analizar\s+(.+)',
-                    r'revisar\s+(.+)',
-                    r'evaluar\s+(.+)'
-                ],
-                'action': ActionType.ANALISIS,
-                'extractor': self._extract_analysis_target
+            name: {
+                'patterns': list(patterns),
+                'action': action,
+                'extractor': getattr(self, extractor) if extractor else (lambda x: {})
             }
+            for name, action, extractor, patterns in INTENT_SPECS
         }
         # === PATRONES DE EXTRACCIÓN DE DATOS ===
         self.data_patterns = {
@@ -549,17 +492,50 @@ Responde siempre con información útil y accionable."""
             'pago': r'\b\d{2,6}\b'
         }
 
+    def _detect_intent(self, query: str) -> Optional[Dict[str, Any]]:
+        """Clasifica el mensaje en una sola pasada con el router compilado"""
+        if '\n' in query:
+            bulk = self._parse_bulk_input(query)
+            if bulk:
+                kind = bulk[0]
+                return {
+                    'name': f"{kind}_alta_masiva",
+                    'action': ActionType.CLIENTE_ALTA if kind == 'cliente' else ActionType.PROSPECTO_ALTA,
+                    'extractor': self._extract_bulk_data,
+                    'match': None
+                }
+            # Mensaje de varias líneas que no es un lote: se enruta como una sola línea
+            query = ' '.join(query.split())
+        
+        routed = self.INTENT_ROUTER.route(query)
+        if not routed:
+            return None
+        
+        name, match = routed
+        intent = self.intent_patterns[name]
+        return {
+            'name': name,
+            'action': intent['action'],
+            'extractor': intent['extractor'],
+            'match': match
+        }
+
     async def _process_intent(self, intent: Dict, query: str, user_context: Optional[Dict[str, Any]] = None) -> AgentResponse:
         """Procesar intención detectada"""
+        extracted_data, error_response = self._extract_intent_data(intent, query)
+        if error_response:
+            return error_response
+        return await self._dispatch_intent(intent['action'], extracted_data, query, user_context)
+
+    def _extract_intent_data(self, intent: Dict, query: str) -> Tuple[Any, Optional[AgentResponse]]:
+        """Extraer datos según el tipo de intención: (datos, respuesta de error)"""
         action_type = intent['action']
-        extractor = intent['extractor']
         match = intent['match']
         
-        # Extraer datos según el tipo de intención
         try:
-            extracted_data = extractor(match.group(1) if match.groups() else query)
+            return intent['extractor'](match.group(1) if match and match.groups() else query), None
         except Exception as e:
-            return AgentResponse(
+            return None, AgentResponse(
                 message=f"No se pudo procesar la información: {str(e)}",
                 action_type=action_type,
                 response_type=ResponseType.ERROR,
@@ -570,9 +546,20 @@ Responde siempre con información útil y accionable."""
                 context_used={},
                 execution_time=0.0
             )
-        
+
+    async def _dispatch_intent(
+        self,
+        action_type: ActionType,
+        extracted_data: Any,
+        query: str,
+        user_context: Optional[Dict[str, Any]] = None
+    ) -> AgentResponse:
+        """Ejecutar el manejador de la acción"""
         try:
-            if action_type == ActionType.CLIENTE_ALTA:
+            # Los manejadores de altas invalidan snapshot, contexto y cache IA tras escribir en Sheets
+            if isinstance(extracted_data, dict) and extracted_data.get('bulk'):
+                return await self._handle_alta_masiva(extracted_data)
+            elif action_type == ActionType.CLIENTE_ALTA:
                 return await self._handle_cliente_alta(extracted_data)
             elif action_type == ActionType.CLIENTE_INFO:
                 return await self._handle_cliente_info(extracted_data)
@@ -606,39 +593,135 @@ Responde siempre con información útil y accionable."""
         if not GEMINI_AVAILABLE or not self.ai_model:
             return self._fallback_response(query)
         
+        cached = self._get_cached_ai_response(query, user_context)
+        if cached:
+            return cached
+        
         try:
             # Obtener contexto empresarial
-            business_context = await self._get_business_context()
+            business_context = await self._get_business_context(self._context_owner(user_context))
             
-            # Crear prompt contextual
-            contextual_prompt = f"""
-Contexto empresarial actual:
-{json.dumps(business_context, indent=2, ensure_ascii=False)}
-
-Consulta del usuario: {query}
-
-Proporciona una respuesta profesional y accionable basada en el contexto empresarial disponible.
-"""
+            # Generar respuesta con IA (sin bloquear el event loop)
+            history = self._conversation_history(user_context)
+            chunks = [chunk async for chunk in self._stream_ai_text(query, business_context, history)]
             
-            # Generar respuesta con IA
-            response = self.ai_model.generate_content(contextual_prompt)
-            
-            return AgentResponse(
-                message=response.text,
-                action_type=ActionType.CHAT,
-                response_type=ResponseType.INFO,
-                confidence=0.8,
-                data={"ai_response": True, "context": business_context},
-                suggestions=self._generate_suggestions(query),
-                quick_actions=self._generate_quick_actions(query),
-                context_used=business_context,
-                execution_time=0.0
-            )
+            response = self._build_ai_response(query, ''.join(chunks), business_context)
+            self._cache_ai_response(query, user_context, response)
+            return response
             
+        except AIThrottled as e:
+            self.logger.warning(f"🚦 IA saturada, respuesta estructurada: {e}")
+            return self._throttled_response(query)
+        except AIResponseBlocked as e:
+            self.logger.warning(f"🛡️ Respuesta de IA bloqueada, respuesta estructurada: {e}")
+            return self._fallback_response(query)
         except Exception as e:
             self.logger.error(f"Error con IA: {e}")
             return self._fallback_response(query)
 
+    def _data_version(self) -> int:
+        """Versión de datos del motor de contexto (0 si no hay motor)"""
+        return getattr(self.context_engine, 'data_version', 0) if self.context_engine else 0
+
+    def _ai_cache_version(self) -> Tuple[Any, int]:
+        """Versión de los datos que ve la IA: Sheets (cualquier escritura) + motor de contexto"""
+        return (getattr(self.sheets_service, 'data_version', None), self._data_version())
+
+    def _get_cached_ai_response(self, query: str, user_context: Optional[Dict[str, Any]]) -> Optional[AgentResponse]:
+        """Copia de una respuesta IA vigente para la misma pregunta y versión de datos"""
+        if self._has_conversation(user_context):
+            # En una conversación en curso la respuesta depende del historial
+            return None
+        scope = self._context_owner(user_context) or ''
+        cached = self.response_cache.get(query, self._ai_cache_version(), scope)
+        if cached is None:
+            return None
+        return replace(cached, data={**cached.data, "cached": True})
+
+    def _cache_ai_response(self, query: str, user_context: Optional[Dict[str, Any]], response: AgentResponse):
+        """Guarda una respuesta IA completa (no vacía) en la cache"""
+        if response.message.strip() and not self._has_conversation(user_context):
+            scope = self._context_owner(user_context) or ''
+            self.response_cache.put(query, self._ai_cache_version(), response, scope)
+
+    # === MEMORIA DE CONVERSACIÓN ===
+
+    def _session_key(self, user_context: Optional[Dict[str, Any]]) -> Optional[str]:
+        """Identificador de la conversación (sesión web, usuario o chat de Telegram)"""
+        if not user_context:
+            return None
+        key = user_context.get('session_id') or user_context.get('user_id')
+        return str(key) if key else None
+
+    def _has_conversation(self, user_context: Optional[Dict[str, Any]]) -> bool:
+        session = self._session_key(user_context)
+        return bool(session) and self.conversation_memory.has_history(session)
+
+    def _conversation_history(self, user_context: Optional[Dict[str, Any]]) -> str:
+        session = self._session_key(user_context)
+        if not session:
+            return ''
+        return self.conversation_memory.render(session, self.AI_HISTORY_MAX_CHARS)
+
+    def _remember_turn(self, user_context: Optional[Dict[str, Any]], query: str, response: AgentResponse):
+        """Guarda la pregunta y la respuesta en la memoria de la sesión"""
+        session = self._session_key(user_context)
+        if not session or not query:
+            return
+        self.conversation_memory.append(session, 'user', query)
+        self.conversation_memory.append(session, 'assistant', response.message)
+
+    def _build_ai_prompt(self, query: str, business_context: Dict[str, Any], history: str = '') -> str:
+        """Crear prompt contextual"""
+        conversation = f"\nConversación reciente:\n{history}\n" if history else ''
+        return f"""
+Contexto empresarial actual:
+{business_context.get('prompt_context', '')}
+{conversation}
+Consulta del usuario: {query}
+
+Proporciona una respuesta profesional y accionable basada en el contexto empresarial disponible.
+"""
+
+    async def _stream_ai_text(self, query: str, business_context: Dict[str, Any], history: str = '') -> AsyncIterator[str]:
+        """
+        Genera la respuesta de Gemini en fragmentos usando la API asíncrona.
+        Si el modelo solo ofrece la API síncrona, se ejecuta en un hilo.
+        Cada llamada pasa por el gobernador de cuota (AIThrottled si no hay turno).
+        """
+        prompt = self._build_ai_prompt(query, business_context, history)
+        
+        async with self.ai_governor.slot():
+            if hasattr(self.ai_model, 'generate_content_async'):
+                response = await self.ai_model.generate_content_async(prompt, stream=True)
+                async for chunk in response:
+                    text = _chunk_text(chunk)
+                    if text:
+                        yield text
+            else:
+                response = await asyncio.to_thread(self.ai_model.generate_content, prompt)
+                yield _chunk_text(response)
+
+    def _build_ai_response(self, query: str, message: str, business_context: Dict[str, Any]) -> AgentResponse:
+        """Respuesta estructurada para un texto generado por IA"""
+        return AgentResponse(
+            message=message,
+            action_type=ActionType.CHAT,
+            response_type=ResponseType.INFO,
+            confidence=0.8,
+            data={"ai_response": True, "context": business_context},
+            suggestions=self._generate_suggestions(query),
+            quick_actions=self._generate_quick_actions(query),
+            context_used=business_context,
+            execution_time=0.0
+        )
+
+    def _throttled_response(self, query: str) -> AgentResponse:
+        """Fallback cuando la cola de la IA supera el SLO de espera"""
+        response = self._fallback_response(query)
+        response.data["throttled"] = True
+        return response
+
     def _fallback_response(self, query: str) -> AgentResponse:
         """Respuesta de fallback cuando IA no está disponible"""
         # Respuestas estructuradas básicas
@@ -696,6 +779,103 @@ Proporciona una respuesta profesional y accionable basada en el contexto empresa
         else:
             raise ValueError(f"Formato de prospecto inválido. Use: Prospecto: Nombre, teléfono, zona")
 
+    def _parse_bulk_input(self, text: str) -> Optional[Tuple[str, Optional[List[Optional[str]]], List[Tuple[int, str, Optional[str]]]]]:
+        """
+        Reconoce un lote pegado en varias líneas.
+        
+        Returns:
+            (tipo, columnas del encabezado CSV o None, [(línea, texto, tipo de la línea)])
+            o None si el mensaje no es un lote
+        """
+        lines = [line.strip() for line in text.split('\n')]
+        kind = None
+        header = None
+        rows: List[Tuple[int, str, Optional[str]]] = []
+        
+        for number, line in enumerate(lines, 1):
+            if not line:
+                continue
+            
+            prefixed = BULK_LINE_PREFIX.match(line)
+            if prefixed:
+                line_kind = 'cliente' if prefixed.group(1).lower().startswith('cliente') else 'prospecto'
+                kind = kind or line_kind
+                if prefixed.group(2).strip():
+                    rows.append((number, prefixed.group(2).strip(), line_kind))
+                continue
+            
+            if not rows and header is None:
+                columns = _parse_bulk_header(line)
+                if columns:
+                    header = columns
+                    continue
+                if ',' not in line and ';' not in line:
+                    # Línea de instrucción: "alta masiva de prospectos"
+                    lowered = line.lower()
+                    if 'prospecto' in lowered or 'lead' in lowered:
+                        kind = kind or 'prospecto'
+                        continue
+                    if 'cliente' in lowered:
+                        kind = kind or 'cliente'
+                        continue
+                    return None
+            
+            rows.append((number, line, None))
+        
+        if len(rows) < 2 or not (kind or header):
+            return None
+        return kind or 'cliente', header, rows
+
+    def _extract_bulk_data(self, data_string: str) -> Dict[str, Any]:
+        """Valida cada línea del lote sin detenerse en la primera con errores"""
+        kind, header, lines = self._parse_bulk_input(data_string)
+        if len(lines) > self.BULK_MAX_ROWS:
+            raise ValueError(f"El lote tiene {len(lines)} registros; máximo {self.BULK_MAX_ROWS} por mensaje")
+        
+        rows = []
+        for number, text, line_kind in lines:
+            row = {'line': number, 'raw': text, 'record': None, 'error': None}
+            try:
+                if line_kind and line_kind != kind:
+                    raise ValueError(f"Registro de {line_kind} en un lote de {kind}s")
+                row['record'] = self._bulk_record(kind, text, header)
+            except ValueError as e:
+                row['error'] = str(e)
+            rows.append(row)
+        
+        return {'bulk': True, 'kind': kind, 'rows': rows}
+
+    def _bulk_record(self, kind: str, text: str, header: Optional[List[Optional[str]]]) -> Union[ClienteData, ProspectoData]:
+        """Registro de una línea: por columnas si hay encabezado CSV, si no con el extractor flexible"""
+        if not header:
+            if kind == 'cliente':
+                return self._extract_cliente_data_flexible(text)
+            return self._extract_prospecto_data_flexible(text)
+        
+        values = [value.strip() for value in re.split(r',|;', text)]
+        fields = {
+            field: values[index]
+            for index, field in enumerate(header)
+            if field and index < len(values) and values[index]
+        }
+        missing = [field for field in BULK_REQUIRED_FIELDS[kind] if not fields.get(field)]
+        if missing:
+            raise ValueError(f"Faltan datos: {', '.join(missing)}")
+        
+        if kind == 'prospecto':
+            return ProspectoData(nombre=fields['nombre'], telefono=fields['telefono'], zona=fields['zona'])
+        
+        pago = _parse_amount(fields['pago'])
+        if pago <= 0:
+            raise ValueError(f"Pago inválido: {fields['pago']}")
+        return ClienteData(
+            nombre=fields['nombre'],
+            email=fields['email'],
+            zona=fields['zona'],
+            telefono=fields['telefono'],
+            pago=pago
+        )
+
     def _extract_search_term(self, data_string: str) -> Dict[str, str]:
         """Extraer término de búsqueda"""
         return {"search_term": data_string.strip()}
@@ -726,10 +906,11 @@ Proporciona una respuesta profesional y accionable basada en el contexto empresa
                 'Notas': f'Cliente agregado via agente el {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}'
             }
             
-            # Agregar usando el método correcto
-            result = self.sheets_service.add_client(client_data)
+            # Escritura bloqueante en Sheets: fuera del event loop
+            result = await asyncio.to_thread(self.sheets_service.add_client, client_data)
             
             if result:
+                self._on_data_changed()
                 message = f"✅ Cliente {cliente_data.nombre} registrado."
             else:
                 message = f"❌ Error registrando cliente {cliente_data.nombre}."
@@ -842,30 +1023,37 @@ Proporciona una respuesta profesional y accionable basada en el contexto empresa
             if not self.sheets_service:
                 raise Exception("Servicio de Google Sheets no disponible")
             
-            # Preparar datos para Sheets (en hoja de prospectos)
-            row_data = {
+            # Misma hoja 'Prospectos' que el alta masiva
+            prospect_data = {
                 'Nombre': prospecto_data.nombre,
                 'Teléfono': prospecto_data.telefono,
                 'Zona': prospecto_data.zona,
-                'Estado': prospecto_data.estado,
-                'Fecha Contacto': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                'Notas': f'Prospecto agregado via agente el {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}'
             }
             
-            # Agregar a Google Sheets (requiere implementar manejo de múltiples hojas)
-            # Por ahora agregamos como cliente potencial
-            result = self.sheets_service.add_row(row_data)
+            # Escritura bloqueante en Sheets: fuera del event loop
+            result = await asyncio.to_thread(self.sheets_service.add_prospect, prospect_data)
+            
+            if result:
+                self._on_data_changed()
+                message = f"✅ Prospecto {prospecto_data.nombre} registrado exitosamente."
+            else:
+                message = f"❌ Error registrando prospecto {prospecto_data.nombre}."
             
             return AgentResponse(
-                message=f"✅ Prospecto {prospecto_data.nombre} registrado exitosamente.",
+                message=message,
                 action_type=ActionType.PROSPECTO_ALTA,
-                response_type=ResponseType.SUCCESS,
-                confidence=1.0,
-                data={"prospecto": prospecto_data.__dict__, "result": result},
-                suggestions=["Programar llamada de seguimiento", "Enviar información comercial"],
+                response_type=ResponseType.SUCCESS if result else ResponseType.ERROR,
+                confidence=1.0 if result else 0.0,
+                data={"prospecto": prospecto_data.__dict__, "success": result},
+                suggestions=(
+                    ["Programar llamada de seguimiento", "Enviar información comercial"]
+                    if result else ["Verificar conexión", "Revisar datos"]
+                ),
                 quick_actions=[
                     {"text": "Ver estadísticas", "action": "estadísticas"},
                     {"text": "Agregar otro prospecto", "action": "prospecto_alta"}
-                ],
+                ] if result else [],
                 context_used={"sheets_available": True},
                 execution_time=0.0
             )
@@ -884,6 +1072,168 @@ Proporciona una respuesta profesional y accionable basada en el contexto empresa
                 execution_time=0.0
             )
 
+    async def _handle_alta_masiva(self, bulk: Dict[str, Any]) -> AgentResponse:
+        """
+        Alta masiva de clientes o prospectos.
+        
+        Deduplica contra los registros existentes y dentro del propio lote,
+        escribe todas las filas válidas con una sola llamada a Sheets y
+        devuelve el resultado de cada línea.
+        """
+        kind = bulk['kind']
+        action_type = ActionType.CLIENTE_ALTA if kind == 'cliente' else ActionType.PROSPECTO_ALTA
+        
+        try:
+            if not self.sheets_service:
+                raise Exception("Servicio de Google Sheets no disponible")
+            
+            existing = await asyncio.to_thread(self._load_dedup_index, kind)
+            
+            results = []
+            pending = []
+            seen: Dict[str, int] = {}
+            for row in bulk['rows']:
+                record = row['record']
+                result = {
+                    "linea": row['line'],
+                    "nombre": record.nombre if record else row['raw'][:40],
+                    "estado": "invalido",
+                    "motivo": row['error']
+                }
+                results.append(result)
+                if record is None:
+                    continue
+                
+                keys = _dedup_keys(record.nombre, getattr(record, 'email', ''), record.telefono, record.zona)
+                registered = next((key for key in keys if key in existing), None)
+                repeated = next((key for key in keys if key in seen), None)
+                if registered:
+                    result.update(estado="duplicado", motivo=f"Ya registrado como {existing[registered]}")
+                elif repeated:
+                    result.update(estado="duplicado", motivo=f"Repite la línea {seen[repeated]}")
+                else:
+                    seen.update((key, row['line']) for key in keys)
+                    pending.append((result, record))
+            
+            write_error = None
+            if pending:
+                write = await asyncio.to_thread(self._write_bulk_records, kind, [record for _, record in pending])
+                write_error = None if write.get('success') else write.get('error', 'Error desconocido')
+                for result, _ in pending:
+                    if write_error:
+                        result.update(estado="error", motivo=write_error)
+                    else:
+                        result.update(estado="registrado", motivo=None)
+                if not write_error:
+                    self._on_data_changed()
+            
+            counts = {
+                estado: sum(1 for result in results if result['estado'] == estado)
+                for estado in ("registrado", "duplicado", "invalido", "error")
+            }
+            
+            if counts["registrado"]:
+                response_type = ResponseType.SUCCESS
+            elif write_error:
+                response_type = ResponseType.ERROR
+            else:
+                response_type = ResponseType.WARNING
+            
+            icon = {"registrado": "✅", "duplicado": "⚠️", "invalido": "❌", "error": "❌"}
+            message = (
+                f"{icon['registrado'] if counts['registrado'] else icon['duplicado']} Alta masiva de {kind}s: "
+                f"{counts['registrado']} registrados, {counts['duplicado']} duplicados, "
+                f"{counts['invalido']} inválidos" + (f", {counts['error']} con error" if counts['error'] else "")
+            )
+            detail = [
+                f"L{result['linea']} {icon[result['estado']]} {result['nombre']}"
+                + (f" — {result['motivo']}" if result['motivo'] else "")
+                for result in results
+                if result['estado'] != "registrado"
+            ]
+            if detail:
+                message += "\n" + "\n".join(detail[:self.BULK_REPORT_ROWS])
+                if len(detail) > self.BULK_REPORT_ROWS:
+                    message += f"\n… y {len(detail) - self.BULK_REPORT_ROWS} más"
+            
+            return AgentResponse(
+                message=message,
+                action_type=action_type,
+                response_type=response_type,
+                confidence=1.0 if counts["registrado"] else 0.5,
+                data={
+                    "bulk": True,
+                    "kind": kind,
+                    "total": len(results),
+                    "registrados": counts["registrado"],
+                    "duplicados": counts["duplicado"],
+                    "invalidos": counts["invalido"],
+                    "errores": counts["error"],
+                    "rows": results
+                },
+                suggestions=["Corrija las líneas marcadas y reenvíelas"] if detail else [],
+                quick_actions=[{"text": "Ver estadísticas", "action": "estadísticas"}],
+                context_used={"sheets_available": True, "existing_keys": len(existing)},
+                execution_time=0.0
+            )
+            
+        except Exception as e:
+            self.logger.error(f"Error en alta masiva de {kind}s: {e}")
+            return AgentResponse(
+                message=f"❌ Error en alta masiva: {str(e)}",
+                action_type=action_type,
+                response_type=ResponseType.ERROR,
+                confidence=0.0,
+                data={"error": str(e), "bulk": True, "kind": kind, "total": len(bulk['rows'])},
+                suggestions=["Verifique la conexión a Google Sheets"],
+                quick_actions=[],
+                context_used={},
+                execution_time=0.0
+            )
+
+    def _load_dedup_index(self, kind: str) -> Dict[str, str]:
+        """Claves de deduplicación (email, teléfono, nombre+zona) -> nombre registrado"""
+        if hasattr(self.sheets_service, 'get_all_clients'):
+            rows = list(self.sheets_service.get_all_clients(include_inactive=True))
+        else:
+            rows = list(self._load_client_rows())
+        if kind == 'prospecto' and hasattr(self.sheets_service, 'get_prospects'):
+            rows.extend(self.sheets_service.get_prospects())
+        
+        index: Dict[str, str] = {}
+        for row in rows:
+            for key in _dedup_keys(row.get('Nombre'), row.get('Email'), row.get('Teléfono'), row.get('Zona')):
+                index.setdefault(key, str(row.get('Nombre', '')))
+        return index
+
+    def _write_bulk_records(self, kind: str, records: List[Union[ClienteData, ProspectoData]]) -> Dict[str, Any]:
+        """Escribe el lote con una sola llamada append_rows del servicio de Sheets"""
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        if kind == 'cliente':
+            rows = [
+                {
+                    'Nombre': record.nombre,
+                    'Email': record.email,
+                    'Zona': record.zona,
+                    'Teléfono': record.telefono,
+                    'Pago': record.pago,
+                    'Notas': f'Cliente agregado via agente (alta masiva) el {timestamp}'
+                }
+                for record in records
+            ]
+            return self.sheets_service.add_clients(rows)
+        
+        rows = [
+            {
+                'Nombre': record.nombre,
+                'Teléfono': record.telefono,
+                'Zona': record.zona,
+                'Notas': f'Prospecto agregado via agente (alta masiva) el {timestamp}'
+            }
+            for record in records
+        ]
+        return self.sheets_service.add_prospects(rows)
+
     async def _handle_incidente_crear(self, incidente_data: Dict[str, str]) -> AgentResponse:
         """Manejar creación de incidente"""
         try:
@@ -930,65 +1280,19 @@ Proporciona una respuesta profesional y accionable basada en el contexto empresa
             )
 
     async def _handle_estadisticas(self) -> AgentResponse:
-        """Manejar solicitud de estadísticas"""
+        """Manejar solicitud de estadísticas (desde el snapshot analítico)"""
         try:
             if not self.sheets_service:
                 raise Exception("Servicio de Google Sheets no disponible")
             
-            # Obtener datos enriquecidos de Sheets
-            if hasattr(self.sheets_service, 'get_enriched_clients'):
-                all_rows = self.sheets_service.get_enriched_clients()
-            else:
-                all_rows = self.sheets_service.get_all_rows()
-            
-            # Calcular estadísticas
-            total_clients = len(all_rows)
-            active_clients = len([r for r in all_rows if str(r.get('Activo (SI/NO)', '')).lower() in ['si', 'sí', 'yes', '1', 'true']])
-            
-            # Calcular ingresos
-            total_revenue = 0
-            for row in all_rows:
-                try:
-                    # Intentar varios nombres de campo para el pago
-                    pago = row.get('Pago Mensual', 0) or row.get('Pago', 0)
-                    if isinstance(pago, str):
-                        # Remover comas y convertir a float
-                        pago = float(pago.replace(',', '').replace('$', ''))
-                    else:
-                        pago = float(pago)
-                    total_revenue += pago
-                except (ValueError, TypeError):
-                    pass
-            
-            # Análisis por zonas
-            zonas = {}
-            for row in all_rows:
-                zona = row.get('Zona', 'Sin Zona')
-                zonas[zona] = zonas.get(zona, 0) + 1
-            
-            # Formatear mensaje directo
-            message = f"📊 {total_clients} clientes activos, ${total_revenue:,.0f}/mes"
-            
-            # Solo agregar zonas si son menos de 6 para mantenerlo breve
-            if len(zonas) <= 6:
-                message += f"\n📍 {', '.join([f'{z}: {c}' for z, c in sorted(zonas.items())[:5]])}"
-            else:
-                top_zones = sorted(zonas.items(), key=lambda x: x[1], reverse=True)[:3]
-                message += f"\n� Top zonas: {', '.join([f'{z}: {c}' for z, c in top_zones])}"
+            stats = (await self._get_analytics_snapshot())['estadisticas']
             
             return AgentResponse(
-                message=message,
+                message=stats['message'],
                 action_type=ActionType.ESTADISTICAS,
                 response_type=ResponseType.SUCCESS,
                 confidence=1.0,
-                data={
-                    "total_clients": total_clients,
-                    "active_clients": active_clients,
-                    "total_revenue": total_revenue,
-                    "zones": zonas,
-                    "avg_payment": total_revenue / max(active_clients, 1),
-                    "target_achievement": (total_revenue / self.business_metrics["target_monthly_revenue"]) * 100
-                },
+                data=dict(stats['data']),
                 suggestions=[],
                 quick_actions=[],
                 context_used={},
@@ -1010,26 +1314,25 @@ Proporciona una respuesta profesional y accionable basada en el contexto empresa
             )
 
     async def _handle_analisis(self, analysis_data: Dict[str, str]) -> AgentResponse:
-        """Manejar solicitud de análisis"""
+        """Manejar solicitud de análisis (insights precalculados en el snapshot)"""
         target = analysis_data.get('target', '')
         
         try:
             if not self.sheets_service:
                 raise Exception("Servicio de Google Sheets no disponible")
             
-            all_rows = self.sheets_service.get_all_rows()
-            
-            # Realizar análisis según el objetivo
-            insights = []
+            snapshot = await self._get_analytics_snapshot()
             
-            if 'ingreso' in target.lower() or 'revenue' in target.lower():
-                insights = self._analyze_revenue(all_rows)
-            elif 'zona' in target.lower():
-                insights = self._analyze_zones(all_rows)
-            elif 'cliente' in target.lower():
-                insights = self._analyze_clients(all_rows)
+            # Seleccionar análisis según el objetivo
+            target_lower = target.lower()
+            if 'ingreso' in target_lower or 'revenue' in target_lower:
+                insights = snapshot['insights']['revenue']
+            elif 'zona' in target_lower:
+                insights = snapshot['insights']['zones']
+            elif 'cliente' in target_lower:
+                insights = snapshot['insights']['clients']
             else:
-                insights = self._general_analysis(all_rows)
+                insights = snapshot['insights']['general']
             
             # Formatear mensaje de análisis
             message = f"🔍 **ANÁLISIS: {target.upper()}**\n\n"
@@ -1041,13 +1344,13 @@ Proporciona una respuesta profesional y accionable basada en el contexto empresa
                 action_type=ActionType.ANALISIS,
                 response_type=ResponseType.SUCCESS,
                 confidence=0.9,
-                data={"analysis_target": target, "insights": insights},
+                data={"analysis_target": target, "insights": list(insights)},
                 suggestions=["Implementar mejoras sugeridas", "Monitorear KPIs regularmente"],
                 quick_actions=[
                     {"text": "Ver estadísticas completas", "action": "estadísticas"},
                     {"text": "Análisis detallado", "action": f"análisis {target}"}
                 ],
-                context_used={"analysis_date": datetime.now().isoformat()},
+                context_used={"analysis_date": snapshot['built_at_iso']},
                 execution_time=0.0
             )
             
@@ -1065,13 +1368,116 @@ Proporciona una respuesta profesional y accionable basada en el contexto empresa
                 execution_time=0.0
             )
 
+    # === SNAPSHOT ANALÍTICO ===
+
+    def _analytics_version(self) -> Tuple[int, int]:
+        """Versión de datos del servicio de Sheets (cambia con cualquier escritura) + altas del agente"""
+        sheets_version = getattr(self.sheets_service, 'data_version', None)
+        if sheets_version is None:
+            sheets_version = self._data_version()
+        return (sheets_version, self._local_data_generation)
+
+    def _load_analytics_rows(self) -> Tuple[Tuple[int, int], List[Dict[str, Any]]]:
+        """Filas del índice de clientes (sin otra lectura a Sheets) y la versión a la que corresponden"""
+        if hasattr(self.sheets_service, 'get_client_index'):
+            index = self.sheets_service.get_client_index()
+            return (index.version, self._local_data_generation), index.rows
+        version = self._analytics_version()
+        return version, self._load_client_rows()
+
+    async def _get_analytics_snapshot(self) -> Dict[str, Any]:
+        """
+        Estadísticas, resumen para IA e insights calculados una vez por versión
+        de datos (con TTL porque la hoja también se edita fuera del sistema)
+        """
+        snapshot = self._analytics_snapshot
+        if self._analytics_snapshot_fresh(snapshot):
+            return snapshot
+        
+        async with self._analytics_lock:
+            # Otra corrutina pudo reconstruirlo mientras esperábamos
+            snapshot = self._analytics_snapshot
+            if self._analytics_snapshot_fresh(snapshot):
+                return snapshot
+            
+            version, rows = await asyncio.to_thread(self._load_analytics_rows)
+            snapshot = self._build_analytics_snapshot(rows)
+            snapshot['version'] = version
+            self._analytics_snapshot = snapshot
+            self.logger.info(f"📊 Snapshot analítico reconstruido ({len(rows)} clientes)")
+            return snapshot
+
+    def _analytics_snapshot_fresh(self, snapshot: Optional[Dict[str, Any]]) -> bool:
+        return bool(snapshot) and snapshot['version'] == self._analytics_version() \
+            and time.time() - snapshot['built_at'] < self.ANALYTICS_TTL
+
+    def _build_analytics_snapshot(self, rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Calcula en una pasada todo lo que consultan estadísticas, análisis y la IA"""
+        total_clients = len(rows)
+        active_clients = 0
+        total_revenue = 0.0
+        zonas: Dict[str, int] = {}
+        
+        for row in rows:
+            if str(row.get('Activo (SI/NO)', '')).lower() in ACTIVE_VALUES:
+                active_clients += 1
+            # Intentar varios nombres de campo para el pago
+            total_revenue += _parse_amount(row.get('Pago Mensual', 0) or row.get('Pago', 0))
+            zona = row.get('Zona', 'Sin Zona')
+            zonas[zona] = zonas.get(zona, 0) + 1
+        
+        # Formatear mensaje directo
+        message = f"📊 {active_clients} clientes activos de {total_clients}, ${total_revenue:,.0f}/mes"
+        
+        # Solo agregar zonas si son menos de 6 para mantenerlo breve
+        if len(zonas) <= 6:
+            message += f"\n📍 {', '.join([f'{z}: {c}' for z, c in sorted(zonas.items())[:5]])}"
+        else:
+            top_zones = sorted(zonas.items(), key=lambda x: x[1], reverse=True)[:3]
+            message += f"\n📍 Top zonas: {', '.join([f'{z}: {c}' for z, c in top_zones])}"
+        
+        revenue = self._analyze_revenue(rows)
+        zones = self._analyze_zones(rows)
+        clients = self._analyze_clients(rows)
+        
+        now = time.time()
+        return {
+            'built_at': now,
+            'built_at_iso': datetime.fromtimestamp(now).isoformat(),
+            'estadisticas': {
+                'message': message,
+                'data': {
+                    "total_clients": total_clients,
+                    "active_clients": active_clients,
+                    "total_revenue": total_revenue,
+                    "zones": zonas,
+                    "avg_payment": total_revenue / max(active_clients, 1),
+                    "target_achievement": (total_revenue / self.business_metrics["target_monthly_revenue"]) * 100
+                }
+            },
+            'summary': _summarize_client_rows(rows, self.business_metrics["target_monthly_revenue"]),
+            'insights': {
+                'revenue': revenue,
+                'zones': zones,
+                'clients': clients,
+                'general': revenue + zones + clients
+            }
+        }
+
+    def _on_data_changed(self):
+        """Invalida todo lo derivado de los datos tras una alta hecha por el agente"""
+        self._local_data_generation += 1
+        self._analytics_snapshot = None
+        self._business_context_cache.clear()
+        self.response_cache.invalidate()
+
     # === MÉTODOS DE ANÁLISIS ===
     
     def _analyze_revenue(self, data: List[Dict]) -> List[str]:
         """Analizar ingresos"""
         insights = []
         
-        total_revenue = sum(float(row.get('Pago Mensual', 0)) for row in data if row.get('Pago Mensual'))
+        total_revenue = sum(_parse_amount(row.get('Pago Mensual', 0)) for row in data if row.get('Pago Mensual'))
         avg_payment = total_revenue / max(len(data), 1)
         
         if avg_payment < self.business_metrics["standard_plan"]:
@@ -1112,10 +1518,11 @@ Proporciona una respuesta profesional y accionable basada en el contexto empresa
         """Analizar clientes"""
         insights = []
         
-        active_clients = len([r for r in data if r.get('Estado', '').lower() == 'activo'])
+        active_clients = len([r for r in data if str(r.get('Estado', '')).lower() == 'activo'])
         total_clients = len(data)
         
-        if total_clients < self.business_metrics["target_clients"]:
+        target_clients = self.business_metrics.get("target_clients")
+        if target_clients and total_clients < target_clients:
             insights.append(f"📊 {total_clients} clientes de {self.business_metrics['target_clients']} objetivo")
         
         activation_rate = (active_clients / max(total_clients, 1)) * 100
@@ -1136,8 +1543,23 @@ Proporciona una respuesta profesional y accionable basada en el contexto empresa
 
     # === MÉTODOS DE SOPORTE ===
     
-    async def _get_business_context(self) -> Dict[str, Any]:
-        """Obtener contexto empresarial actual"""
+    async def _get_business_context(self, propietario: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Contexto empresarial compacto para la IA, memoizado por versión de
+        datos y propietario (con TTL para cuando no hay motor de contexto)
+        """
+        key = propietario or ''
+        version = self._ai_cache_version()
+        cached = self._business_context_cache.get(key)
+        if cached and cached[0] == version and time.time() - cached[1] < self.AI_CONTEXT_TTL:
+            return cached[2]
+        
+        context = await self._build_business_context(propietario)
+        self._business_context_cache[key] = (version, time.time(), context)
+        return context
+
+    async def _build_business_context(self, propietario: Optional[str] = None) -> Dict[str, Any]:
+        """Ensambla resúmenes precalculados por prioridad dentro del presupuesto de tokens"""
         context = {
             "company": self.company,
             "version": self.version,
@@ -1149,18 +1571,80 @@ Proporciona una respuesta profesional y accionable basada en el contexto empresa
             }
         }
         
+        # Secciones en orden de prioridad (las últimas se recortan primero)
+        sections: List[Tuple[str, Any]] = []
+        
         if self.sheets_service:
             try:
-                all_rows = self.sheets_service.get_all_rows()
-                context["business_data"] = {
-                    "total_clients": len(all_rows),
-                    "last_update": datetime.now().isoformat()
-                }
-            except Exception:
+                summary = (await self._get_analytics_snapshot())['summary']
+                sections.append(("kpis", summary["kpis"]))
+            except Exception as e:
+                self.logger.warning(f"⚠️ No se pudo resumir clientes para IA: {e}")
+                summary = None
                 context["business_data"] = {"error": "No se pudo obtener datos"}
+        else:
+            summary = None
+        
+        if self.context_engine and propietario:
+            owner_slice = await self._get_owner_slice(propietario)
+            if owner_slice:
+                sections.append(("propietario", owner_slice))
+        
+        business = getattr(self.context_engine, 'global_context', {}).get('business') if self.context_engine else None
+        if business:
+            sections.append(("tendencias", {
+                "crecimiento_pct": round(business.growth_rate, 1),
+                "churn_pct": round(business.churn_rate, 1),
+                "incidentes_abiertos": business.incidentes_abiertos,
+                "prospectos_activos": business.prospectos_activos
+            }))
         
+        if summary:
+            sections.append(("zonas_top", summary["zonas_top"]))
+            sections.append(("zonas_pago_pendiente", summary["zonas_pago_pendiente"]))
+        
+        prompt_context, included, omitted = _render_context_sections(
+            sections, self.AI_CONTEXT_TOKEN_BUDGET * self.CHARS_PER_TOKEN
+        )
+        context.update(included)
+        context["prompt_context"] = prompt_context
+        context["estimated_tokens"] = len(prompt_context) // self.CHARS_PER_TOKEN
+        if omitted:
+            context["omitted_sections"] = omitted
         return context
 
+    def _load_client_rows(self) -> List[Dict[str, Any]]:
+        """Clientes desde Sheets (enriquecidos con cobranza si es posible)"""
+        if hasattr(self.sheets_service, 'get_enriched_clients'):
+            return self.sheets_service.get_enriched_clients()
+        return self.sheets_service.get_all_rows()
+
+    async def _get_owner_slice(self, propietario: str) -> Optional[Dict[str, Any]]:
+        """Resumen del propietario a partir de ContextEngine.get_full_context"""
+        try:
+            full_context = await self.context_engine.get_full_context(propietario)
+        except Exception as e:
+            self.logger.warning(f"⚠️ Contexto de {propietario} no disponible: {e}")
+            return None
+        
+        user_context = full_context.get('user_context')
+        if not user_context:
+            return None
+        
+        return {
+            "nombre": propietario,
+            **user_context.get('kpis_personales', {}),
+            "prospectos": len(user_context.get('prospectos_pipeline', [])),
+            "zonas": user_context.get('zonas_responsable', [])[:5],
+            "insights": full_context.get('insights', [])[:3]
+        }
+
+    def _context_owner(self, user_context: Optional[Dict[str, Any]]) -> Optional[str]:
+        """Propietario al que se refiere la conversación (si se conoce)"""
+        if not user_context:
+            return None
+        return user_context.get('propietario') or user_context.get('name')
+
     def _generate_suggestions(self, query: str) -> List[str]:
         """Generar sugerencias basadas en la consulta"""
         suggestions = []
@@ -1197,6 +1681,204 @@ Proporciona una respuesta profesional y accionable basada en el contexto empresa
         
         return actions
 
+    # === PROCESAMIENTO DE CONSULTAS ===
+    
+    async def process_query(self, query: str, user_context: Optional[Dict[str, Any]] = None) -> AgentResponse:
+        """
+        Procesa una consulta como pipeline cronometrado:
+        normalize → route → extract → handler → format
+        
+        Args:
+            query: Mensaje del usuario
+            user_context: Contexto del usuario
+            
+        Returns:
+            AgentResponse: Respuesta con execution_time (s) y stage_timings (ms)
+        """
+        timer = StageTimer()
+        
+        # 1. Normalizar
+        query = self._normalize_query(query)
+        timer.lap('normalize')
+        
+        # 2. Enrutar intención
+        intent = self._detect_intent(query)
+        timer.lap('route')
+        
+        # 3. Extraer datos y 4. ejecutar manejador
+        if intent:
+            extracted_data, response = self._extract_intent_data(intent, query)
+            timer.lap('extract')
+            if response is None:
+                response = await self._dispatch_intent(intent['action'], extracted_data, query, user_context)
+        else:
+            response = await self._process_with_ai(query, user_context)
+        timer.lap('handler')
+        
+        # 5. Formatear
+        response = self._format_response(response, query)
+        self._remember_turn(user_context, query, response)
+        timer.lap('format')
+        
+        return self._finish_pipeline(response, timer)
+
+    async def process_batch(
+        self,
+        messages: List[str],
+        user_context: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Procesa varias consultas en una llamada.
+        
+        - Mensajes idénticos (tras normalizar) se procesan una sola vez
+        - Intenciones estructuradas corren concurrentemente sobre el snapshot compartido
+        - Consultas para la IA se limitan a BATCH_AI_CONCURRENCY llamadas simultáneas
+        - El resultado conserva el orden de entrada, con tiempos por elemento
+        
+        Los lotes no escriben en la memoria de conversación: sus mensajes son
+        independientes entre sí.
+        """
+        if len(messages) > self.BATCH_MAX_MESSAGES:
+            raise ValueError(f"Máximo {self.BATCH_MAX_MESSAGES} mensajes por lote")
+        
+        batch_context = {k: v for k, v in (user_context or {}).items() if k not in ('session_id', 'user_id')}
+        ai_semaphore = asyncio.Semaphore(self.BATCH_AI_CONCURRENCY)
+        
+        # Deduplicar conservando la primera aparición
+        unique: Dict[str, int] = {}
+        owners: List[int] = []
+        for index, message in enumerate(messages):
+            key = self._normalize_query(message).lower()
+            owners.append(unique.setdefault(key, index))
+        
+        async def run(index: int) -> AgentResponse:
+            query = messages[index]
+            if self._detect_intent(self._normalize_query(query)):
+                return await self.process_query(query, batch_context)
+            async with ai_semaphore:
+                return await self.process_query(query, batch_context)
+        
+        first_indexes = sorted(set(unique.values()))
+        responses = await asyncio.gather(*(run(i) for i in first_indexes), return_exceptions=True)
+        by_index = dict(zip(first_indexes, responses))
+        
+        results = []
+        for index, message in enumerate(messages):
+            owner = owners[index]
+            response = by_index[owner]
+            item: Dict[str, Any] = {"index": index, "message": message}
+            if owner != index:
+                item["duplicate_of"] = owner
+            
+            if isinstance(response, Exception):
+                self.logger.error(f"Error en lote (elemento {owner}): {response}")
+                item.update({"success": False, "error": str(response)})
+            else:
+                item.update({
+                    "success": response.response_type != ResponseType.ERROR,
+                    "response": response.message,
+                    "type": response.action_type.value,
+                    "confidence": response.confidence,
+                    "data": response.data,
+                    "execution_time": response.execution_time if owner == index else 0.0,
+                    "stage_timings": response.stage_timings if owner == index else {}
+                })
+            results.append(item)
+        
+        return results
+
+    def _normalize_query(self, query: str) -> str:
+        """
+        Quita espacios sobrantes (el router no distingue mayúsculas).
+        Conserva los saltos de línea para reconocer altas masivas.
+        """
+        lines = (' '.join(line.split()) for line in (query or '').splitlines())
+        return '\n'.join(line for line in lines if line)
+
+    def _format_response(self, response: AgentResponse, query: str) -> AgentResponse:
+        """Última etapa: mensaje limpio y acciones rápidas para respuestas abiertas"""
+        response.message = (response.message or '').strip()
+        if not response.quick_actions and response.action_type in (ActionType.CHAT, ActionType.CONSULTA_GENERAL):
+            response.quick_actions = self._generate_quick_actions(query)
+        return response
+
+    def _finish_pipeline(self, response: AgentResponse, timer: StageTimer) -> AgentResponse:
+        """Registra tiempos en la respuesta y en las métricas agregadas"""
+        response.execution_time = round(timer.elapsed, 4)
+        response.stage_timings = dict(timer.timings)
+        self.pipeline_metrics.record(
+            response.action_type.value,
+            response.stage_timings,
+            timer.elapsed * 1000,
+            error=response.response_type == ResponseType.ERROR
+        )
+        return response
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Métricas del pipeline, de la cache de respuestas y del límite de llamadas IA"""
+        return {
+            'pipeline': self.pipeline_metrics.snapshot(),
+            'response_cache': self.response_cache.stats(),
+            'ai_governor': self.ai_governor.stats(),
+            'conversations': self.conversation_memory.stats()
+        }
+
+    async def stream_query(self, query: str, user_context: Optional[Dict[str, Any]] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Variante en streaming de process_query.
+        
+        Emite eventos {'event': 'delta', 'text': ...} con los fragmentos de la IA
+        a medida que llegan y un evento final {'event': 'done', 'response': AgentResponse}.
+        Las intenciones estructuradas y el fallback se emiten en un solo delta.
+        """
+        timer = StageTimer()
+        query = self._normalize_query(query)
+        timer.lap('normalize')
+        intent = self._detect_intent(query)
+        timer.lap('route')
+        
+        cached = None if intent else self._get_cached_ai_response(query, user_context)
+        
+        if intent or cached or not GEMINI_AVAILABLE or not self.ai_model:
+            if intent:
+                extracted_data, response = self._extract_intent_data(intent, query)
+                timer.lap('extract')
+                if response is None:
+                    response = await self._dispatch_intent(intent['action'], extracted_data, query, user_context)
+            else:
+                response = cached or self._fallback_response(query)
+            timer.lap('handler')
+            response = self._format_response(response, query)
+            yield {'event': 'delta', 'text': response.message}
+        else:
+            business_context = await self._get_business_context(self._context_owner(user_context))
+            chunks = []
+            try:
+                history = self._conversation_history(user_context)
+                async for text in self._stream_ai_text(query, business_context, history):
+                    chunks.append(text)
+                    yield {'event': 'delta', 'text': text}
+                response = self._build_ai_response(query, ''.join(chunks), business_context)
+                self._cache_ai_response(query, user_context, response)
+            except Exception as e:
+                if isinstance(e, AIThrottled):
+                    self.logger.warning(f"🚦 IA saturada (streaming): {e}")
+                    response = self._throttled_response(query)
+                elif isinstance(e, AIResponseBlocked):
+                    self.logger.warning(f"🛡️ Respuesta de IA bloqueada (streaming): {e}")
+                    response = self._fallback_response(query)
+                else:
+                    self.logger.error(f"Error con IA (streaming): {e}")
+                    response = self._fallback_response(query)
+                if not chunks:
+                    yield {'event': 'delta', 'text': response.message}
+            timer.lap('handler')
+            response = self._format_response(response, query)
+        
+        self._remember_turn(user_context, query, response)
+        timer.lap('format')
+        yield {'event': 'done', 'response': self._finish_pipeline(response, timer)}
+
     # === MÉTODO PRINCIPAL PARA COMPATIBILIDAD ===
     
     async def chat(self, message: str, user_context: Optional[Dict[str, Any]] = None) -> str:
@@ -1241,5 +1923,117 @@ Proporciona una respuesta profesional y accionable basada en el contexto empresa
             self.logger.error(f"Error en process_message: {e}")
             return f"❌ Error: {str(e)}"
 
+# === RESÚMENES PARA CONTEXTO IA ===
+
+ACTIVE_VALUES = ('si', 'sí', 'yes', '1', 'true')
+
+def _parse_amount(value: Any) -> float:
+    """Monto de la hoja ('$1,200', 350, '') a float"""
+    if isinstance(value, str):
+        value = value.replace(',', '').replace('$', '').strip()
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+def _dedup_keys(nombre: Any, email: Any, telefono: Any, zona: Any) -> List[str]:
+    """Claves que identifican a un cliente: email, teléfono (10 dígitos) y nombre+zona"""
+    keys = []
+    email = str(email or '').strip().lower()
+    if '@' in email:
+        keys.append(f"email:{email}")
+    digits = re.sub(r'\D', '', str(telefono or ''))
+    if len(digits) >= 7:
+        keys.append(f"tel:{digits[-10:]}")
+    nombre = normalize_query(str(nombre or ''))
+    if nombre:
+        keys.append(f"nombre:{nombre}|{normalize_query(str(zona or ''))}")
+    return keys
+
+def _parse_bulk_header(line: str) -> Optional[List[Optional[str]]]:
+    """Columnas de un encabezado CSV ('Nombre, Email, Zona, ...') o None si no lo es"""
+    columns = [BULK_HEADER_FIELDS.get(normalize_query(cell)) for cell in re.split(r',|;', line)]
+    if 'nombre' not in columns or sum(1 for column in columns if column) < 2:
+        return None
+    return columns
+
+def _summarize_client_rows(rows: List[Dict[str, Any]], target_revenue: float) -> Dict[str, Any]:
+    """KPIs, zonas principales y pagos pendientes en una sola pasada"""
+    activos = pagados = 0
+    ingresos = 0.0
+    zonas: Dict[str, Dict[str, float]] = {}
+    
+    for row in rows:
+        zona = row.get('Zona') or 'Sin Zona'
+        stats = zonas.setdefault(zona, {'clientes': 0, 'ingresos': 0.0, 'pendientes': 0})
+        stats['clientes'] += 1
+        
+        if str(row.get('Activo (SI/NO)', '')).lower() not in ACTIVE_VALUES:
+            continue
+        activos += 1
+        pago = _parse_amount(row.get('Pago Mensual', 0) or row.get('Pago', 0))
+        ingresos += pago
+        stats['ingresos'] += pago
+        if str(row.get('Pagado', 'NO')).upper() == 'SI':
+            pagados += 1
+        else:
+            stats['pendientes'] += 1
+    
+    por_clientes = sorted(zonas.items(), key=lambda x: x[1]['clientes'], reverse=True)
+    por_pendientes = sorted(
+        ((z, s) for z, s in zonas.items() if s['pendientes']),
+        key=lambda x: x[1]['pendientes'], reverse=True
+    )
+    
+    return {
+        "kpis": {
+            "total_clientes": len(rows),
+            "clientes_activos": activos,
+            "ingresos_mensuales": round(ingresos, 2),
+            "pagados": pagados,
+            "pago_pendiente": activos - pagados,
+            "arpu": round(ingresos / max(activos, 1), 2),
+            "meta_pct": round(ingresos / max(target_revenue, 1) * 100, 1),
+            "zonas": len(zonas)
+        },
+        "zonas_top": [
+            {"zona": z, "clientes": s['clientes'], "ingresos": round(s['ingresos'])} for z, s in por_clientes[:5]
+        ],
+        "zonas_pago_pendiente": [
+            {"zona": z, "pendientes": s['pendientes']} for z, s in por_pendientes[:5]
+        ]
+    }
+
+def _render_context_sections(sections: List[Tuple[str, Any]], max_chars: int) -> Tuple[str, Dict[str, Any], List[str]]:
+    """
+    Serializa las secciones en JSON compacto (una por línea) hasta agotar el
+    presupuesto. Las listas que no caben completas se recortan por el final.
+    """
+    lines: List[str] = []
+    included: Dict[str, Any] = {}
+    omitted: List[str] = []
+    used = 0
+    
+    for name, value in sections:
+        candidate = value
+        while True:
+            line = f"{name}: {json.dumps(candidate, ensure_ascii=False, separators=(',', ':'), default=str)}"
+            if used + len(line) + 1 <= max_chars:
+                break
+            if isinstance(candidate, list) and len(candidate) > 1:
+                candidate = candidate[:-1]
+                continue
+            candidate = None
+            break
+        
+        if candidate is None or candidate == []:
+            omitted.append(name)
+            continue
+        lines.append(line)
+        included[name] = candidate
+        used += len(line) + 1
+    
+    return '\n'.join(lines), included, omitted
+
 # === EXPORTAR CLASE PRINCIPAL ===
 __all__ = ["ConsolidatedISPAgent", "AgentResponse", "ActionType", "ResponseType", "BusinessInsight"]
@@ -14,14 +14,22 @@ Características:
 """
 
 import asyncio
-import json
 import logging
+import sys
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional, Union, Tuple
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, fields as dataclass_fields
 from enum import Enum
 import time
 from collections import defaultdict
+from itertools import islice
+from pathlib import Path
+
+from backend.app.services.context_snapshot import ContextSnapshotStore
+from backend.app.utils.pagination import decode_cursor, encode_cursor
+from backend.app.services.metrics_history import (
+    MetricsHistoryStore, SCOPE_GLOBAL, SCOPE_PROPIETARIO, SCOPE_ZONA, GLOBAL_KEY
+)
 
 @dataclass
 class BusinessContext:
@@ -49,15 +57,95 @@ class UserContext:
     permissions: List[str]
     preferences: Dict[str, Any]
 
-@dataclass
+# Campos categóricos cuyos valores se internan (se comparte una sola instancia por valor)
+INTERNED_FIELDS = frozenset({'Zona', 'Estado', 'Plan', 'Propietario', 'Tipo', 'Prioridad'})
+
+# Índices campo -> posición compartidos entre entidades con las mismas columnas
+_FIELD_LAYOUTS: Dict[Tuple[str, ...], Dict[str, int]] = {}
+
+def _field_layout(keys: Tuple[str, ...]) -> Dict[str, int]:
+    """Devuelve el índice compartido para una combinación de columnas"""
+    layout = _FIELD_LAYOUTS.get(keys)
+    if layout is None:
+        layout = {sys.intern(str(k)): i for i, k in enumerate(keys)}
+        _FIELD_LAYOUTS[keys] = layout
+    return layout
+
+def _intern_value(field: str, value: Any) -> Any:
+    """Interna los valores de campos categóricos"""
+    if field in INTERNED_FIELDS and isinstance(value, str):
+        return sys.intern(value)
+    return value
+
 class DataEntity:
-    """Entidad de datos con metadatos"""
-    id: str
-    type: str  # 'cliente', 'prospecto', 'incidente', etc.
-    data: Dict[str, Any]
-    relationships: Dict[str, List[str]]
-    last_updated: datetime
-    propietario: str
+    """
+    Entidad de datos compacta con metadatos.
+    
+    Los valores se guardan en una tupla alineada a un índice de columnas
+    compartido por hoja; tipo, propietario y campos categóricos van internados
+    y las relaciones solo se reservan cuando existen.
+    """
+    __slots__ = ('id', 'type', 'propietario', '_layout', '_values', '_relationships', '_updated_at')
+
+    def __init__(
+        self,
+        id: str,
+        type: str,  # 'cliente', 'prospecto', 'incidente', etc.
+        data: Dict[str, Any],
+        relationships: Optional[Dict[str, List[str]]] = None,
+        last_updated: Optional[Union[datetime, float]] = None,
+        propietario: str = 'Sistema'
+    ):
+        self.id = id
+        self.type = sys.intern(type)
+        self.propietario = sys.intern(str(propietario))
+        self._layout = _field_layout(tuple(data.keys()))
+        self._values = tuple(_intern_value(k, v) for k, v in data.items())
+        self._relationships = relationships or None
+        if isinstance(last_updated, datetime):
+            last_updated = last_updated.timestamp()
+        self._updated_at = last_updated if last_updated is not None else time.time()
+
+    @property
+    def data(self) -> Dict[str, Any]:
+        """Vista dict de los valores (se construye al acceder)"""
+        values = self._values
+        return {k: values[i] for k, i in self._layout.items()}
+
+    @property
+    def values(self) -> Tuple[Any, ...]:
+        return self._values
+
+    def get(self, field: str, default: Any = None) -> Any:
+        """Lectura de un campo sin materializar el dict"""
+        i = self._layout.get(field)
+        return default if i is None else self._values[i]
+
+    def project(self, fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Dict con solo los campos solicitados (todos si no se especifican)"""
+        if not fields:
+            return self.data
+        return {f: self._values[self._layout[f]] for f in fields if f in self._layout}
+
+    @property
+    def relationships(self) -> Dict[str, List[str]]:
+        return self._relationships or {}
+
+    def set_relationship(self, relationship_type: str, related_ids: List[str]):
+        """Registra una relación; las listas vacías no ocupan memoria"""
+        if related_ids:
+            if self._relationships is None:
+                self._relationships = {}
+            self._relationships[relationship_type] = related_ids
+        elif self._relationships:
+            self._relationships.pop(relationship_type, None)
+
+    @property
+    def last_updated(self) -> datetime:
+        return datetime.fromtimestamp(self._updated_at)
+
+    def __repr__(self) -> str:
+        return f"DataEntity(id={self.id!r}, type={self.type!r}, propietario={self.propietario!r})"
 
 class SheetType(Enum):
     """Tipos de hojas en Google Sheets"""
@@ -76,16 +164,50 @@ class ContextEngine:
     del Google Sheets como un backend coherente.
     """
     
-    def __init__(self, sheets_service):
+    # Configuración de paginación
+    DEFAULT_PAGE_SIZE = 50
+    MAX_PAGE_SIZE = 500
+    
+    # Secciones paginables del contexto de usuario
+    CONTEXT_SECTIONS = {
+        'clientes': 'clientes_asignados',
+        'prospectos': 'prospectos_pipeline',
+        'incidentes': 'incidentes_responsable'
+    }
+    
+    # Ventana de comparación para crecimiento y churn
+    GROWTH_WINDOW_DAYS = 30
+    MIN_HISTORY_SECONDS = 86400
+    
+    def __init__(
+        self,
+        sheets_service,
+        snapshot_path: Optional[Union[str, Path]] = None,
+        history_path: Optional[Union[str, Path]] = None
+    ):
         self.sheets = sheets_service
         self.logger = logging.getLogger(__name__)
         
+        # Snapshot persistente para arranque rápido (opcional)
+        self.snapshot_store = ContextSnapshotStore(Path(snapshot_path), self.logger) if snapshot_path else None
+        self.loaded_from_snapshot = False
+        
+        # Histórico de KPIs (opcional): alimenta crecimiento, churn y reportes
+        self.metrics_history = MetricsHistoryStore(Path(history_path), self.logger) if history_path else None
+        
         # Estado global del sistema
         self.global_context = {}
         self.user_contexts = {}
         self.entity_graph = {}
         self.relationship_map = defaultdict(list)
         
+        # Versión de datos: se incrementa en cada carga y invalida los memos
+        self.data_version = 0
+        self.known_propietarios: List[str] = []
+        self._entities_by_owner: Dict[str, Dict[str, List[DataEntity]]] = {}
+        self._user_context_versions: Dict[str, int] = {}
+        self._memory_footprint: Optional[Tuple[int, Dict[str, Any]]] = None
+        
         # Cache inteligente
         self.cache = {}
         self.cache_timestamps = {}
@@ -158,10 +280,16 @@ class ContextEngine:
             # 3. Calcular contexto de negocio global
             business_context = await self._calculate_business_context()
             
+            # Una sola versión de datos nueva por recarga completa (no una por hoja)
+            self._bump_data_version()
+            
             # 4. Preparar contextos por usuario
             await self._initialize_user_contexts()
             
             load_time = time.time() - start_time
+            self.loaded_from_snapshot = False
+            self.save_snapshot()
+            self._record_metrics_history()
             
             result = {
                 'success': True,
@@ -169,7 +297,7 @@ class ContextEngine:
                 'load_time': round(load_time, 2),
                 'entities_loaded': len(self.entity_graph),
                 'business_context': asdict(business_context),
-                'available_users': list(self.user_contexts.keys()),
+                'available_users': self.get_available_users(),
                 'sheets_mapped': list(self.sheet_config.keys())
             }
             
@@ -184,6 +312,76 @@ class ContextEngine:
                 'message': 'Error en la inicialización del sistema'
             }
 
+    # === SNAPSHOT PERSISTENTE ===
+
+    async def load_snapshot(self) -> bool:
+        """
+        Restaura el grafo de entidades y el contexto de negocio desde el snapshot
+        local, sin llamar a Google Sheets.
+        
+        Returns:
+            True si se restauró un snapshot válido
+        """
+        if not self.snapshot_store:
+            return False
+        
+        start_time = time.time()
+        snapshot = self.snapshot_store.load()
+        if not snapshot:
+            return False
+        
+        entity_graph = {}
+        cache = defaultdict(list)
+        for entity_id, entity_type, propietario, data, relationships, updated_at in snapshot['entities']:
+            entity = DataEntity(
+                id=entity_id,
+                type=entity_type,
+                data=data,
+                relationships=relationships,
+                last_updated=updated_at,
+                propietario=propietario
+            )
+            entity_graph[entity_id] = entity
+            cache[entity_type].append(entity)
+        
+        meta = snapshot['meta']
+        self.entity_graph = entity_graph
+        self.cache = dict(cache)
+        self.cache_timestamps = dict(meta.get('cache_timestamps') or {})
+        
+        if meta.get('business_context'):
+            self.global_context['business'] = BusinessContext(**meta['business_context'])
+        else:
+            await self._calculate_business_context()
+        self._bump_data_version()
+        
+        await self._initialize_user_contexts()
+        self.loaded_from_snapshot = True
+        
+        age = time.time() - meta.get('saved_at', time.time())
+        self.logger.info(
+            f"⚡ Snapshot restaurado en {time.time() - start_time:.3f}s - "
+            f"{len(self.entity_graph)} entidades (antigüedad {age:.0f}s)"
+        )
+        return True
+
+    def save_snapshot(self) -> bool:
+        """Persiste el estado actual del motor en el snapshot local"""
+        if not self.snapshot_store:
+            return False
+        
+        try:
+            self.snapshot_store.save(
+                self.entity_graph.values(),
+                self.global_context.get('business'),
+                self.cache_timestamps,
+                self.data_version
+            )
+            return True
+        except Exception as e:
+            self.logger.error(f"❌ Error guardando snapshot: {e}")
+            return False
+
     async def _load_all_sheets(self):
         """Carga todas las hojas de Google Sheets en paralelo"""
         tasks = []
@@ -204,15 +402,16 @@ class ContextEngine:
     async def _load_sheet_data(self, sheet_type: SheetType, config: Dict) -> List[Dict]:
         """Carga datos de una hoja específica"""
         try:
-            # Simular carga asíncrona (adaptar según tu SheetsService)
+            # Lectura bloqueante de Sheets: fuera del event loop
             if hasattr(self.sheets, 'get_all_rows'):
-                raw_data = self.sheets.get_all_rows()
+                raw_data = await asyncio.to_thread(self.sheets.get_all_rows)
             else:
                 # Fallback si no está disponible
                 raw_data = []
             
             # Procesar y estructurar datos
             processed_data = []
+            loaded_at = time.time()
             for i, row in enumerate(raw_data):
                 if not row or not any(row):  # Saltar filas vacías
                     continue
@@ -221,7 +420,8 @@ class ContextEngine:
                     id=f"{sheet_type.value}_{i+1}",
                     type=sheet_type.value,
                     data=dict(zip(config['key_fields'], row)),
-                    propietario=row.get('Propietario', 'Sistema') if isinstance(row, dict) else 'Sistema'
+                    propietario=row.get('Propietario', 'Sistema') if isinstance(row, dict) else 'Sistema',
+                    loaded_at=loaded_at
                 )
                 
                 processed_data.append(entity)
@@ -239,14 +439,13 @@ class ContextEngine:
             self.logger.error(f"Error cargando {sheet_type.value}: {e}")
             return []
 
-    def _create_entity(self, id: str, type: str, data: Dict, propietario: str) -> DataEntity:
+    def _create_entity(self, id: str, type: str, data: Dict, propietario: str, loaded_at: Optional[float] = None) -> DataEntity:
         """Crea una entidad de datos estructurada"""
         return DataEntity(
             id=id,
             type=type,
             data=data,
-            relationships={},
-            last_updated=datetime.now(),
+            last_updated=loaded_at,
             propietario=propietario
         )
 
@@ -256,26 +455,23 @@ class ContextEngine:
         
         # Relaciones Cliente -> Incidentes
         clientes = [e for e in self.entity_graph.values() if e.type == 'clientes']
-        incidentes = [e for e in self.entity_graph.values() if e.type == 'incidentes']
+        incidentes_por_cliente = defaultdict(list)
+        for inc in self.entity_graph.values():
+            if inc.type == 'incidentes':
+                incidentes_por_cliente[inc.get('Cliente_ID')].append(inc.id)
         
         for cliente in clientes:
-            cliente_id = cliente.data.get('ID')
-            related_incidentes = [
-                inc.id for inc in incidentes 
-                if inc.data.get('Cliente_ID') == cliente_id
-            ]
-            cliente.relationships['incidentes'] = related_incidentes
+            cliente.set_relationship('incidentes', incidentes_por_cliente.get(cliente.get('ID'), []))
             
         # Relaciones Cliente -> Zona
-        zonas = [e for e in self.entity_graph.values() if e.type == 'zonas']
+        zonas_por_nombre = {}
+        for z in self.entity_graph.values():
+            if z.type == 'zonas':
+                zonas_por_nombre.setdefault(z.get('Nombre'), z.id)
         for cliente in clientes:
-            zona_nombre = cliente.data.get('Zona')
-            related_zona = next(
-                (z.id for z in zonas if z.data.get('Nombre') == zona_nombre),
-                None
-            )
+            related_zona = zonas_por_nombre.get(cliente.get('Zona'))
             if related_zona:
-                cliente.relationships['zona'] = [related_zona]
+                cliente.set_relationship('zona', [related_zona])
         
         # Más relaciones según necesidades...
         self.logger.info(f"✅ Grafo de relaciones construido con {len(self.entity_graph)} entidades")
@@ -288,33 +484,28 @@ class ContextEngine:
         zonas = [e for e in self.entity_graph.values() if e.type == 'zonas']
         
         # Cálculos de negocio
-        total_clientes = len(clientes)
-        clientes_activos = len([c for c in clientes if c.data.get('Estado') == 'Activo'])
-        clientes_morosos = len([c for c in clientes if c.data.get('Estado') == 'Moroso'])
-        
-        ingresos_mensuales = sum(
-            float(c.data.get('Pago_Mensual', 0)) 
-            for c in clientes 
-            if c.data.get('Estado') == 'Activo'
-        )
+        kpis = _summarize_kpis(clientes, incidentes, prospectos)
+        total_clientes = kpis['total_clientes']
+        clientes_activos = kpis['clientes_activos']
+        clientes_morosos = kpis['clientes_morosos']
+        ingresos_mensuales = kpis['ingresos_mensuales']
         
-        incidentes_abiertos = len([i for i in incidentes if i.data.get('Estado') == 'Abierto'])
-        prospectos_activos = len([p for p in prospectos if p.data.get('Estado') == 'Activo'])
+        zonas_cobertura = [z.get('Nombre') for z in zonas]
         
-        zonas_cobertura = [z.data.get('Nombre') for z in zonas]
-        
-        # KPIs calculados
+        # KPIs calculados (crecimiento y churn contra el histórico)
         arpu = ingresos_mensuales / max(clientes_activos, 1)
-        growth_rate = 0.0  # Calcular según datos históricos
-        churn_rate = clientes_morosos / max(total_clientes, 1) * 100
+        growth_rate, churn_rate = self._historical_rates(total_clientes, clientes_activos)
+        if churn_rate is None:
+            # Sin histórico suficiente: aproximación por morosidad
+            churn_rate = clientes_morosos / max(total_clientes, 1) * 100
         
         context = BusinessContext(
             total_clientes=total_clientes,
             clientes_activos=clientes_activos,
             clientes_morosos=clientes_morosos,
             ingresos_mensuales=ingresos_mensuales,
-            incidentes_abiertos=incidentes_abiertos,
-            prospectos_activos=prospectos_activos,
+            incidentes_abiertos=kpis['incidentes_abiertos'],
+            prospectos_activos=kpis['prospectos_activos'],
             zonas_cobertura=zonas_cobertura,
             growth_rate=growth_rate,
             churn_rate=churn_rate,
@@ -324,33 +515,130 @@ class ContextEngine:
         self.global_context['business'] = context
         return context
 
+    # === HISTÓRICO DE MÉTRICAS ===
+
+    def _historical_rates(self, total_clientes: int, clientes_activos: int) -> Tuple[float, Optional[float]]:
+        """
+        Crecimiento (%) y churn (%) contra el snapshot de hace GROWTH_WINDOW_DAYS
+        (o el más antiguo disponible). El churn es None si no hay histórico.
+        """
+        if not self.metrics_history:
+            return 0.0, None
+        
+        now = time.time()
+        since = now - self.GROWTH_WINDOW_DAYS * 86400
+        try:
+            base_total = self.metrics_history.baseline('total_clientes', since)
+            base_activos = self.metrics_history.baseline('clientes_activos', since)
+        except Exception as e:
+            self.logger.warning(f"⚠️ Histórico de métricas no disponible: {e}")
+            return 0.0, None
+        
+        if not base_total or not base_activos or now - base_total[0] < self.MIN_HISTORY_SECONDS:
+            return 0.0, None
+        
+        total_inicio, activos_inicio = base_total[1], base_activos[1]
+        growth_rate = (total_clientes - total_inicio) / max(total_inicio, 1) * 100
+        
+        # Bajas = activos al inicio + altas del periodo - activos actuales
+        altas = max(0, total_clientes - total_inicio)
+        bajas = max(0, activos_inicio + altas - clientes_activos)
+        churn_rate = bajas / max(activos_inicio, 1) * 100
+        return round(growth_rate, 2), round(churn_rate, 2)
+
+    def _collect_kpi_snapshot(self) -> Dict[Tuple[str, str], Dict[str, float]]:
+        """KPIs actuales por ámbito: global, por propietario y por zona"""
+        snapshot = {}
+        
+        business = self.global_context.get('business')
+        if business:
+            snapshot[(SCOPE_GLOBAL, GLOBAL_KEY)] = {
+                'total_clientes': business.total_clientes,
+                'clientes_activos': business.clientes_activos,
+                'clientes_morosos': business.clientes_morosos,
+                'ingresos_mensuales': business.ingresos_mensuales,
+                'incidentes_abiertos': business.incidentes_abiertos,
+                'prospectos_activos': business.prospectos_activos
+            }
+        
+        for propietario, entidades in self._index_entities_by_owner().items():
+            snapshot[(SCOPE_PROPIETARIO, propietario)] = _summarize_kpis(
+                entidades.get('clientes', []),
+                entidades.get('incidentes', []),
+                entidades.get('prospectos', [])
+            )
+        
+        clientes_por_zona: Dict[str, List[DataEntity]] = defaultdict(list)
+        for entity in self.entity_graph.values():
+            if entity.type == 'clientes' and entity.get('Zona'):
+                clientes_por_zona[entity.get('Zona')].append(entity)
+        for zona, clientes in clientes_por_zona.items():
+            snapshot[(SCOPE_ZONA, zona)] = _summarize_kpis(clientes, [], [])
+        
+        return snapshot
+
+    def _record_metrics_history(self) -> int:
+        """Registra un snapshot de KPIs en el histórico tras cada sincronización"""
+        if not self.metrics_history:
+            return 0
+        
+        try:
+            written = self.metrics_history.record(self._collect_kpi_snapshot())
+            self.logger.info(f"📈 Histórico de métricas actualizado ({written} puntos)")
+            return written
+        except Exception as e:
+            self.logger.error(f"❌ Error registrando histórico de métricas: {e}")
+            return 0
+
+    def _bump_data_version(self):
+        """Marca los datos como modificados e invalida los contextos memoizados"""
+        self.data_version += 1
+        self.user_contexts.clear()
+        self._user_context_versions.clear()
+        self._entities_by_owner = {}
+
+    def _index_entities_by_owner(self) -> Dict[str, Dict[str, List[DataEntity]]]:
+        """Agrupa las entidades por propietario y tipo en una sola pasada"""
+        if not self._entities_by_owner and self.entity_graph:
+            index: Dict[str, Dict[str, List[DataEntity]]] = defaultdict(lambda: defaultdict(list))
+            for entity in self.entity_graph.values():
+                if entity.propietario:
+                    index[entity.propietario][entity.type].append(entity)
+            self._entities_by_owner = index
+        return self._entities_by_owner
+
     async def _initialize_user_contexts(self):
-        """Inicializa contextos específicos por usuario"""
-        propietarios = ['Eduardo', 'Omar']  # Desde Google Sheets
+        """Descubre los propietarios presentes en los datos (los contextos se construyen bajo demanda)"""
+        self.user_contexts.clear()
+        self._user_context_versions.clear()
+        self.known_propietarios = sorted(self._index_entities_by_owner().keys())
         
-        for propietario in propietarios:
-            user_context = await self._build_user_context(propietario)
-            self.user_contexts[propietario] = user_context
-            
-        self.logger.info(f"✅ Contextos de usuario inicializados: {list(self.user_contexts.keys())}")
+        self.logger.info(f"✅ Propietarios detectados: {self.known_propietarios}")
 
-    async def _build_user_context(self, propietario: str) -> UserContext:
-        """Construye el contexto específico para un propietario"""
-        # Filtrar entidades por propietario
-        clientes_usuario = [
-            e.data for e in self.entity_graph.values() 
-            if e.type == 'clientes' and e.propietario == propietario
-        ]
+    def get_available_users(self) -> List[str]:
+        """Propietarios con datos en la versión actual"""
+        return list(self.known_propietarios)
+
+    async def _get_user_context(self, propietario: str) -> Optional[UserContext]:
+        """Devuelve el contexto del propietario, construyéndolo solo si cambió la versión de datos"""
+        if self._user_context_versions.get(propietario) == self.data_version:
+            return self.user_contexts.get(propietario)
         
-        prospectos_usuario = [
-            e.data for e in self.entity_graph.values() 
-            if e.type == 'prospectos' and e.propietario == propietario
-        ]
+        if propietario not in self._index_entities_by_owner():
+            return None
         
-        incidentes_usuario = [
-            e.data for e in self.entity_graph.values() 
-            if e.type == 'incidentes' and e.propietario == propietario
-        ]
+        user_context = await self._build_user_context(propietario)
+        self.user_contexts[propietario] = user_context
+        self._user_context_versions[propietario] = self.data_version
+        return user_context
+
+    async def _build_user_context(self, propietario: str) -> UserContext:
+        """Construye el contexto específico para un propietario"""
+        # Filtrar entidades por propietario usando el índice
+        entidades = self._index_entities_by_owner().get(propietario, {})
+        clientes_usuario = [e.data for e in entidades.get('clientes', [])]
+        prospectos_usuario = [e.data for e in entidades.get('prospectos', [])]
+        incidentes_usuario = [e.data for e in entidades.get('incidentes', [])]
         
         # Zonas responsables
         zonas_usuario = list(set([
@@ -381,10 +669,10 @@ class ContextEngine:
         Obtiene el contexto COMPLETO para un propietario específico.
         Esto es lo que usará el agente IA para respuestas inteligentes.
         """
-        if propietario not in self.user_contexts:
+        if not self.known_propietarios:
             await self._initialize_user_contexts()
         
-        user_context = self.user_contexts.get(propietario)
+        user_context = await self._get_user_context(propietario)
         business_context = self.global_context.get('business')
         
         if not user_context or not business_context:
@@ -392,10 +680,11 @@ class ContextEngine:
         
         return {
             'propietario': propietario,
-            'business_context': asdict(business_context),
-            'user_context': asdict(user_context),
+            'business_context': _dataclass_to_dict(business_context),
+            'user_context': _dataclass_to_dict(user_context),
             'system_status': {
                 'entities_loaded': len(self.entity_graph),
+                'data_version': self.data_version,
                 'last_sync': max(self.cache_timestamps.values()) if self.cache_timestamps else 0,
                 'cache_health': self._get_cache_health()
             },
@@ -403,6 +692,144 @@ class ContextEngine:
             'insights': await self._generate_insights(propietario)
         }
 
+    async def get_dashboard(self, propietario: str) -> Optional[Dict[str, Any]]:
+        """Dashboard del propietario (métricas globales, personales y acciones rápidas)"""
+        if not self.known_propietarios:
+            await self._initialize_user_contexts()
+        
+        user_context = await self._get_user_context(propietario)
+        business_context = self.global_context.get('business')
+        if not user_context or not business_context:
+            return None
+        
+        dashboard = {
+            "propietario": propietario,
+            "global_metrics": {
+                "total_clientes": business_context.total_clientes,
+                "clientes_activos": business_context.clientes_activos,
+                "ingresos_mensuales": business_context.ingresos_mensuales,
+                "incidentes_abiertos": business_context.incidentes_abiertos,
+                "arpu": business_context.arpu,
+                "churn_rate": business_context.churn_rate
+            },
+            "personal_metrics": user_context.kpis_personales,
+            "quick_stats": {
+                "mis_clientes": len(user_context.clientes_asignados),
+                "mis_prospectos": len(user_context.prospectos_pipeline),
+                "mis_incidentes": len(user_context.incidentes_responsable),
+                "mis_zonas": len(user_context.zonas_responsable)
+            },
+            "system_status": {
+                'entities_loaded': len(self.entity_graph),
+                'data_version': self.data_version,
+                'last_sync': max(self.cache_timestamps.values()) if self.cache_timestamps else 0,
+                'cache_health': self._get_cache_health()
+            },
+            "quick_actions": self._get_quick_actions(propietario),
+            "recent_insights": await self._generate_insights(propietario)
+        }
+        return dashboard
+
+    # === PAGINACIÓN Y PROYECCIÓN ===
+
+    def _page_bounds(self, limit: Optional[int], cursor: Optional[str]) -> Tuple[int, int, bool]:
+        """Normaliza (offset, limit, stale) a partir del cursor y el tamaño de página solicitado"""
+        if limit is None:
+            limit = self.DEFAULT_PAGE_SIZE
+        limit = max(1, min(int(limit), self.MAX_PAGE_SIZE))
+        offset, stale = decode_cursor(cursor, self.data_version) if cursor else (0, False)
+        return offset, limit, stale
+
+    async def get_context_page(
+        self,
+        propietario: str,
+        section: str = 'clientes',
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        fields: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """
+        Obtiene una página de una sección del contexto del propietario
+        (clientes, prospectos o incidentes) con proyección de campos opcional.
+        
+        Si los datos cambiaron desde que se emitió el cursor, se continúa
+        desde la misma posición y `stale_cursor` lo indica.
+        
+        Raises:
+            ValueError: Si la sección o el cursor no son válidos
+        """
+        if section not in self.CONTEXT_SECTIONS:
+            raise ValueError(f"Sección inválida: {section}. Opciones: {', '.join(self.CONTEXT_SECTIONS)}")
+        
+        offset, limit, stale = self._page_bounds(limit, cursor)
+        
+        if not self.known_propietarios:
+            await self._initialize_user_contexts()
+        
+        user_context = await self._get_user_context(propietario)
+        if not user_context:
+            return {'error': 'Contexto no disponible'}
+        
+        rows = getattr(user_context, self.CONTEXT_SECTIONS[section])
+        page = rows[offset:offset + limit]
+        next_offset = offset + len(page)
+        
+        return {
+            'propietario': propietario,
+            'section': section,
+            'kpis_personales': user_context.kpis_personales,
+            'totals': {
+                name: len(getattr(user_context, attr))
+                for name, attr in self.CONTEXT_SECTIONS.items()
+            },
+            'items': [_project(row, fields) for row in page],
+            'count': len(page),
+            'next_cursor': encode_cursor(self.data_version, next_offset) if next_offset < len(rows) else None,
+            'stale_cursor': stale,
+            'data_version': self.data_version
+        }
+
+    def search_page(
+        self,
+        query: str,
+        entity_type: Optional[str] = None,
+        propietario: Optional[str] = None,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+        include_relationships: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Búsqueda paginada de entidades. El recorrido se detiene en cuanto
+        se completa la página y el cursor permite continuar donde quedó
+        (con `stale_cursor` si los datos cambiaron desde entonces).
+        
+        Raises:
+            ValueError: Si el cursor no es válido
+        """
+        offset, limit, stale = self._page_bounds(limit, cursor)
+        query_lower = query.lower()
+        
+        items = []
+        next_cursor = None
+        scan_position = offset
+        
+        for entity in islice(self.entity_graph.values(), offset, None):
+            if len(items) == limit:
+                next_cursor = encode_cursor(self.data_version, scan_position)
+                break
+            scan_position += 1
+            if _entity_matches(entity, query_lower, entity_type, propietario):
+                items.append(_format_entity(entity, fields, include_relationships))
+        
+        return {
+            'items': items,
+            'count': len(items),
+            'next_cursor': next_cursor,
+            'stale_cursor': stale,
+            'data_version': self.data_version
+        }
+
     def _get_cache_health(self) -> Dict[str, Any]:
         """Estado del sistema de cache"""
         return {
@@ -411,8 +838,49 @@ class ContextEngine:
             'freshness': {
                 k: time.time() - ts 
                 for k, ts in self.cache_timestamps.items()
-            }
+            },
+            'memory': self._get_memory_footprint()
+        }
+
+    def _get_memory_footprint(self) -> Dict[str, Any]:
+        """Huella de memoria aproximada del grafo de entidades (calculada una vez por versión)"""
+        if self._memory_footprint and self._memory_footprint[0] == self.data_version:
+            return self._memory_footprint[1]
+        
+        seen = set()
+        
+        def sizeof(obj) -> int:
+            # Cada objeto compartido (strings internados, layouts) se cuenta una sola vez
+            if id(obj) in seen:
+                return 0
+            seen.add(id(obj))
+            return sys.getsizeof(obj)
+        
+        entity_bytes = value_bytes = relationship_bytes = layout_bytes = 0
+        for entity in self.entity_graph.values():
+            entity_bytes += sizeof(entity) + sizeof(entity.id)
+            value_bytes += sizeof(entity._values) + sum(sizeof(v) for v in entity._values)
+            layout_bytes += sizeof(entity._layout)
+            if entity._relationships:
+                relationship_bytes += sizeof(entity._relationships) + sum(
+                    sizeof(ids) for ids in entity._relationships.values()
+                )
+        
+        total = entity_bytes + value_bytes + relationship_bytes + layout_bytes
+        footprint = {
+            'entities': len(self.entity_graph),
+            'total_bytes': total,
+            'bytes_per_entity': round(total / max(len(self.entity_graph), 1), 1),
+            'breakdown': {
+                'entities': entity_bytes,
+                'values': value_bytes,
+                'relationships': relationship_bytes,
+                'layouts': layout_bytes
+            },
+            'shared_layouts': len(_FIELD_LAYOUTS)
         }
+        self._memory_footprint = (self.data_version, footprint)
+        return footprint
 
     def _get_quick_actions(self, propietario: str) -> List[Dict[str, str]]:
         """Acciones rápidas disponibles para el usuario"""
@@ -426,7 +894,7 @@ class ContextEngine:
 
     async def _generate_insights(self, propietario: str) -> List[str]:
         """Genera insights automáticos para el propietario"""
-        user_context = self.user_contexts.get(propietario)
+        user_context = await self._get_user_context(propietario)
         if not user_context:
             return []
         
@@ -457,6 +925,7 @@ class ContextEngine:
                 sheet_enum = SheetType(sheet_type)
                 config = self.sheet_config[sheet_enum]
                 await self._load_sheet_data(sheet_enum, config)
+                self._bump_data_version()
                 
                 return {
                     'success': True,
@@ -467,7 +936,11 @@ class ContextEngine:
                 # Refrescar todo el sistema
                 await self._load_all_sheets()
                 await self._build_relationship_graph()
+                await self._calculate_business_context()
+                self._bump_data_version()
                 await self._initialize_user_contexts()
+                self.save_snapshot()
+                self._record_metrics_history()
                 
                 return {
                     'success': True,
@@ -485,27 +958,86 @@ class ContextEngine:
 
 # === FUNCIONES DE UTILIDAD ===
 
+def _dataclass_to_dict(obj) -> Dict[str, Any]:
+    """Vista superficial de un dataclass (sin la copia profunda de asdict)"""
+    return {f.name: getattr(obj, f.name) for f in dataclass_fields(obj)}
+
+def _to_float(value: Any) -> float:
+    """Convierte montos de la hoja a float (vacíos o inválidos cuentan 0)"""
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+def _summarize_kpis(clientes: List[DataEntity], incidentes: List[DataEntity], prospectos: List[DataEntity]) -> Dict[str, float]:
+    """KPIs base de un conjunto de entidades"""
+    activos = [c for c in clientes if c.get('Estado') == 'Activo']
+    return {
+        'total_clientes': len(clientes),
+        'clientes_activos': len(activos),
+        'clientes_morosos': sum(1 for c in clientes if c.get('Estado') == 'Moroso'),
+        'ingresos_mensuales': sum(_to_float(c.get('Pago_Mensual', 0)) for c in activos),
+        'incidentes_abiertos': sum(1 for i in incidentes if i.get('Estado') == 'Abierto'),
+        'prospectos_activos': sum(1 for p in prospectos if p.get('Estado') == 'Activo')
+    }
+
 def get_entity_by_id(engine: ContextEngine, entity_id: str) -> Optional[DataEntity]:
     """Obtiene una entidad por su ID"""
     return engine.entity_graph.get(entity_id)
 
-def search_entities(engine: ContextEngine, query: str, entity_type: Optional[str] = None) -> List[DataEntity]:
-    """Busca entidades por texto"""
+def search_entities(
+    engine: ContextEngine,
+    query: str,
+    entity_type: Optional[str] = None,
+    propietario: Optional[str] = None,
+    limit: Optional[int] = None
+) -> List[DataEntity]:
+    """Busca entidades por texto (se detiene al alcanzar limit)"""
     results = []
     query_lower = query.lower()
     
     for entity in engine.entity_graph.values():
-        if entity_type and entity.type != entity_type:
-            continue
-            
-        # Buscar en todos los campos de datos
-        for field, value in entity.data.items():
-            if isinstance(value, str) and query_lower in value.lower():
-                results.append(entity)
+        if _entity_matches(entity, query_lower, entity_type, propietario):
+            results.append(entity)
+            if limit is not None and len(results) >= limit:
                 break
     
     return results
 
+def _entity_matches(entity: DataEntity, query_lower: str, entity_type: Optional[str], propietario: Optional[str]) -> bool:
+    """Verifica filtros y coincidencia de texto sobre los campos de la entidad"""
+    if entity_type and entity.type != entity_type:
+        return False
+    if propietario and entity.propietario != propietario:
+        return False
+    if not query_lower:
+        return True
+    
+    # Buscar en todos los campos de datos
+    for value in entity.values:
+        if isinstance(value, str) and query_lower in value.lower():
+            return True
+    return False
+
+def _project(row: Dict[str, Any], fields: Optional[List[str]]) -> Dict[str, Any]:
+    """Proyecta un registro a los campos solicitados (todos si no se especifican)"""
+    if not fields:
+        return row
+    return {f: row[f] for f in fields if f in row}
+
+def _format_entity(entity: DataEntity, fields: Optional[List[str]] = None, include_relationships: bool = False) -> Dict[str, Any]:
+    """Representación JSON de una entidad"""
+    formatted = {
+        "id": entity.id,
+        "type": entity.type,
+        "data": entity.project(fields),
+        "propietario": entity.propietario,
+        "last_updated": entity.last_updated.isoformat()
+    }
+    if include_relationships:
+        formatted["relationships"] = entity.relationships
+    return formatted
+
 def get_related_entities(engine: ContextEngine, entity_id: str, relationship_type: str) -> List[DataEntity]:
     """Obtiene entidades relacionadas"""
     entity = engine.entity_graph.get(entity_id)
@@ -0,0 +1,129 @@
+"""
+💾 SNAPSHOT PERSISTENTE DEL MOTOR DE CONTEXTO - Red Soluciones ISP
+================================================================
+
+Guarda el grafo de entidades, sus relaciones y el contexto de negocio
+en un archivo SQLite local para que el ContextEngine arranque al instante
+(incluyendo los cold starts de Vercel) y se reconcilie con Google Sheets
+en segundo plano.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import time
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+# Incrementar si cambia el esquema de las tablas
+SNAPSHOT_SCHEMA_VERSION = 1
+
+class ContextSnapshotStore:
+    """Lectura/escritura atómica del snapshot en SQLite"""
+
+    def __init__(self, path: Path, logger: Optional[logging.Logger] = None):
+        self.path = Path(path)
+        self.logger = logger or logging.getLogger(__name__)
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def save(
+        self,
+        entities: Iterable[Any],
+        business_context: Optional[Any],
+        cache_timestamps: Dict[str, float],
+        data_version: int
+    ) -> int:
+        """
+        Escribe el snapshot completo en un archivo temporal y lo reemplaza
+        atómicamente para no dejar nunca un snapshot a medias.
+        
+        Returns:
+            Número de entidades guardadas
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + '.tmp')
+        if tmp_path.exists():
+            tmp_path.unlink()
+        
+        rows = [
+            (
+                entity.id,
+                entity.type,
+                entity.propietario,
+                json.dumps(entity.data, ensure_ascii=False, default=str),
+                json.dumps(entity._relationships, ensure_ascii=False) if entity._relationships else None,
+                entity._updated_at
+            )
+            for entity in entities
+        ]
+        
+        meta = {
+            'schema_version': SNAPSHOT_SCHEMA_VERSION,
+            'saved_at': time.time(),
+            'data_version': data_version,
+            'cache_timestamps': cache_timestamps,
+            'business_context': asdict(business_context) if business_context else None
+        }
+        
+        conn = sqlite3.connect(str(tmp_path))
+        try:
+            conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            conn.execute(
+                "CREATE TABLE entities ("
+                "id TEXT PRIMARY KEY, type TEXT NOT NULL, propietario TEXT NOT NULL, "
+                "data TEXT NOT NULL, relationships TEXT, updated_at REAL NOT NULL)"
+            )
+            conn.executemany(
+                "INSERT INTO meta (key, value) VALUES (?, ?)",
+                [(k, json.dumps(v, ensure_ascii=False, default=str)) for k, v in meta.items()]
+            )
+            conn.executemany("INSERT INTO entities VALUES (?, ?, ?, ?, ?, ?)", rows)
+            conn.commit()
+        finally:
+            conn.close()
+        
+        os.replace(tmp_path, self.path)
+        self.logger.info(f"💾 Snapshot guardado: {len(rows)} entidades en {self.path}")
+        return len(rows)
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        """
+        Lee el snapshot si existe y es compatible.
+        
+        Returns:
+            Dict con 'meta' y 'entities' (lista de tuplas), o None si no hay snapshot válido
+        """
+        if not self.exists():
+            return None
+        
+        try:
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+            try:
+                meta = {k: json.loads(v) for k, v in conn.execute("SELECT key, value FROM meta")}
+                if meta.get('schema_version') != SNAPSHOT_SCHEMA_VERSION:
+                    self.logger.warning(f"⚠️ Snapshot con esquema incompatible: {meta.get('schema_version')}")
+                    return None
+                
+                entities = [
+                    (
+                        entity_id,
+                        entity_type,
+                        propietario,
+                        json.loads(data),
+                        json.loads(relationships) if relationships else None,
+                        updated_at
+                    )
+                    for entity_id, entity_type, propietario, data, relationships, updated_at
+                    in conn.execute("SELECT id, type, propietario, data, relationships, updated_at FROM entities")
+                ]
+            finally:
+                conn.close()
+        except (sqlite3.Error, ValueError) as e:
+            self.logger.error(f"❌ Snapshot ilegible en {self.path}: {e}")
+            return None
+        
+        return {'meta': meta, 'entities': entities}
@@ -0,0 +1,183 @@
+"""
+💬 MEMORIA DE CONVERSACIÓN - Red Soluciones ISP
+==============================================
+
+Memoria por sesión (web o chat de Telegram) acotada en memoria:
+- LRU de sesiones activas (las expulsadas siguen en disco si hay persistencia)
+- Tope de turnos literales por sesión; los más antiguos se resumen
+- TTL de inactividad y persistencia opcional en SQLite
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+class ConversationStore:
+    """Historial de conversación por sesión con memoria acotada"""
+    
+    DEFAULT_MAX_SESSIONS = 2000
+    DEFAULT_MAX_TURNS = 10          # turnos literales conservados por sesión
+    SUMMARY_MAX_CHARS = 600         # resumen de turnos antiguos
+    TURN_PREVIEW_CHARS = 120        # recorte de cada turno al resumirlo
+    SESSION_TTL = 24 * 3600         # inactividad antes de olvidar la sesión
+
+    def __init__(
+        self,
+        max_sessions: int = DEFAULT_MAX_SESSIONS,
+        max_turns: int = DEFAULT_MAX_TURNS,
+        persist_path: Optional[Path] = None,
+        logger: Optional[logging.Logger] = None
+    ):
+        self.max_sessions = max_sessions
+        self.max_turns = max_turns
+        self.logger = logger or logging.getLogger(__name__)
+        
+        # session_id -> {'summary': str, 'turns': [{'role','text','ts'}], 'updated_at': float}
+        self._sessions: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.evictions = 0
+        
+        self._lock = threading.Lock()
+        self._conn = None
+        if persist_path:
+            try:
+                persist_path = Path(persist_path)
+                persist_path.parent.mkdir(parents=True, exist_ok=True)
+                self._conn = sqlite3.connect(str(persist_path), check_same_thread=False)
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS conversations ("
+                    "session_id TEXT PRIMARY KEY, summary TEXT NOT NULL, "
+                    "turns TEXT NOT NULL, updated_at REAL NOT NULL)"
+                )
+                self._conn.commit()
+            except Exception as e:
+                self.logger.warning(f"⚠️ Persistencia de conversaciones deshabilitada: {e}")
+                self._conn = None
+
+    # === ACCESO ===
+
+    def _load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Sesión desde memoria o, si fue expulsada, desde disco"""
+        session = self._sessions.get(session_id)
+        if session is None and self._conn is not None:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT summary, turns, updated_at FROM conversations WHERE session_id = ?",
+                    (session_id,)
+                ).fetchone()
+            if row:
+                session = {'summary': row[0], 'turns': json.loads(row[1]), 'updated_at': row[2]}
+        
+        if session is None:
+            return None
+        if time.time() - session['updated_at'] > self.SESSION_TTL:
+            self.clear(session_id)
+            return None
+        
+        self._sessions[session_id] = session
+        self._sessions.move_to_end(session_id)
+        self._evict()
+        return session
+
+    def get(self, session_id: str) -> Dict[str, Any]:
+        """Resumen y turnos recientes de la sesión"""
+        session = self._load(session_id)
+        if not session:
+            return {'summary': '', 'turns': []}
+        return {'summary': session['summary'], 'turns': list(session['turns'])}
+
+    def has_history(self, session_id: str) -> bool:
+        session = self._load(session_id)
+        return bool(session and (session['turns'] or session['summary']))
+
+    def append(self, session_id: str, role: str, text: str):
+        """Agrega un turno; resume los que exceden el tope"""
+        session = self._load(session_id) or {'summary': '', 'turns': [], 'updated_at': 0.0}
+        session['turns'].append({'role': role, 'text': text, 'ts': time.time()})
+        
+        overflow = len(session['turns']) - self.max_turns
+        if overflow > 0:
+            session['summary'] = self._summarize(session['summary'], session['turns'][:overflow])
+            del session['turns'][:overflow]
+        
+        session['updated_at'] = time.time()
+        self._sessions[session_id] = session
+        self._sessions.move_to_end(session_id)
+        self._persist(session_id, session)
+        self._evict()
+
+    def render(self, session_id: str, max_chars: int = 1500) -> str:
+        """Historial para el prompt: resumen + turnos recientes dentro de max_chars"""
+        session = self._load(session_id)
+        if not session:
+            return ''
+        
+        lines: List[str] = []
+        used = 0
+        # Los turnos más recientes tienen prioridad
+        for turn in reversed(session['turns']):
+            line = f"{'Usuario' if turn['role'] == 'user' else 'Carlos'}: {turn['text']}"
+            if used + len(line) > max_chars:
+                break
+            lines.append(line)
+            used += len(line)
+        lines.reverse()
+        
+        if session['summary'] and used + len(session['summary']) <= max_chars:
+            lines.insert(0, f"Resumen previo: {session['summary']}")
+        return '\n'.join(lines)
+
+    def clear(self, session_id: str):
+        self._sessions.pop(session_id, None)
+        if self._conn is not None:
+            with self._lock:
+                self._conn.execute("DELETE FROM conversations WHERE session_id = ?", (session_id,))
+                self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'sessions_in_memory': len(self._sessions),
+            'max_sessions': self.max_sessions,
+            'max_turns': self.max_turns,
+            'evictions': self.evictions,
+            'persistent': self._conn is not None
+        }
+
+    # === INTERNOS ===
+
+    def _summarize(self, summary: str, turns: List[Dict[str, Any]]) -> str:
+        """
+        Resumen extractivo de los turnos antiguos (sin llamar a la IA):
+        preguntas del usuario recortadas, conservando las más recientes
+        """
+        items = [s for s in summary.split(' | ') if s] if summary else []
+        for turn in turns:
+            if turn['role'] == 'user':
+                items.append(turn['text'][:self.TURN_PREVIEW_CHARS])
+        
+        while items and len(' | '.join(items)) > self.SUMMARY_MAX_CHARS:
+            items.pop(0)
+        return ' | '.join(items)
+
+    def _persist(self, session_id: str, session: Dict[str, Any]):
+        if self._conn is None:
+            return
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO conversations VALUES (?, ?, ?, ?)",
+                    (session_id, session['summary'], json.dumps(session['turns'], ensure_ascii=False), session['updated_at'])
+                )
+                self._conn.commit()
+        except Exception as e:
+            self.logger.warning(f"⚠️ No se pudo persistir la conversación {session_id}: {e}")
+
+    def _evict(self):
+        """Expulsa de memoria las sesiones menos recientes (siguen en disco)"""
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+            self.evictions += 1
@@ -0,0 +1,140 @@
+"""
+📡 EVENTOS DEL DASHBOARD - Red Soluciones ISP
+=============================================
+
+Un único vigilante (no uno por conexión) revisa cada pocos segundos la
+versión de datos del servicio de Sheets y del ContextEngine y, cuando
+cambia, publica eventos a los suscriptores de /api/stream:
+
+- kpis: KPIs del índice de clientes (también al conectarse)
+- clients_changed: altas/bajas/ediciones en la hoja de clientes
+- data_changed: cualquier otra escritura (prospectos, incidentes, recarga)
+
+El índice de clientes se relee solo al vencer su TTL, así que en estado
+estable el vigilante no llama a la API de Sheets; esa relectura no cambia
+la versión si la hoja trae las mismas filas, y sin cambio de versión no
+se publica nada.
+"""
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional, Set, Tuple
+
+class DashboardEventHub:
+    """Difunde cambios de la versión de datos a los clientes SSE conectados"""
+
+    def __init__(
+        self,
+        sheets_service=None,
+        context_engine=None,
+        interval: float = 2.0,
+        queue_size: int = 32,
+        logger: Optional[logging.Logger] = None
+    ):
+        self.sheets_service = sheets_service
+        self.context_engine = context_engine
+        self.interval = interval
+        self.queue_size = queue_size
+        self.logger = logger or logging.getLogger(__name__)
+
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._index = None
+        self._versions: Optional[Tuple[Any, Any]] = None
+        self._last_kpis: Optional[Dict[str, Any]] = None
+        self.published = 0
+        self.dropped = 0
+
+    # === SUSCRIPCIONES ===
+
+    @asynccontextmanager
+    async def subscribe(self) -> AsyncIterator[asyncio.Queue]:
+        """Cola de eventos del suscriptor; el vigilante arranca con el primero"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        if self._last_kpis is not None:
+            queue.put_nowait(('kpis', self._last_kpis))
+        self._subscribers.add(queue)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        try:
+            yield queue
+        finally:
+            self._subscribers.discard(queue)
+
+    def _publish(self, event: str, payload: Dict[str, Any]):
+        self.published += 1
+        for queue in list(self._subscribers):
+            if queue.full():
+                # Cliente lento: se descarta su evento más antiguo, el último estado es el que importa
+                queue.get_nowait()
+                self.dropped += 1
+            queue.put_nowait((event, payload))
+
+    # === VIGILANTE ===
+
+    async def _run(self):
+        self.logger.info("📡 Vigilante de eventos del dashboard iniciado")
+        try:
+            while self._subscribers:
+                try:
+                    await self.check()
+                except Exception as e:
+                    self.logger.warning(f"⚠️ Error revisando cambios para /api/stream: {e}")
+                await asyncio.sleep(self.interval)
+        finally:
+            self.logger.info("📡 Vigilante de eventos detenido (sin suscriptores)")
+
+    def _current_versions(self) -> Tuple[Any, Any]:
+        return (
+            getattr(self.sheets_service, 'data_version', None),
+            getattr(self.context_engine, 'data_version', None)
+        )
+
+    async def check(self):
+        """Compara versiones con la revisión anterior y publica los eventos que correspondan"""
+        index = self._index
+        if self.sheets_service is not None and hasattr(self.sheets_service, 'get_client_index'):
+            # Inmediato mientras el índice esté vigente; al vencer el TTL relee la hoja
+            index = await asyncio.to_thread(self.sheets_service.get_client_index)
+
+        versions = self._current_versions()
+        previous_index, previous_versions = self._index, self._versions
+        self._index, self._versions = index, versions
+        if versions == previous_versions:
+            return
+
+        sheets_version, context_version = versions
+        if index is not None and index is not previous_index:
+            if previous_index is None or index.kpis != previous_index.kpis:
+                self._last_kpis = dict(index.kpis, version=index.version)
+                self._publish('kpis', self._last_kpis)
+            if previous_index is not None and index.rows != previous_index.rows:
+                self._publish('clients_changed', {
+                    'version': index.version,
+                    'total': len(index.rows),
+                    'previous_total': len(previous_index.rows)
+                })
+
+        # Las versiones solo avanzan con escrituras (o filas distintas al releer)
+        if previous_versions is not None:
+            self._publish('data_changed', {'version': sheets_version, 'context_version': context_version})
+
+    async def stop(self):
+        self._subscribers.clear()
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'subscribers': len(self._subscribers),
+            'running': self._task is not None and not self._task.done(),
+            'versions': self._versions,
+            'published': self.published,
+            'dropped': self.dropped
+        }
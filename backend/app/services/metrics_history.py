@@ -0,0 +1,175 @@
+"""
+📈 HISTÓRICO DE MÉTRICAS - Red Soluciones ISP
+============================================
+
+Almacén append-only de snapshots de KPIs (globales, por propietario y por
+zona) registrados en cada sincronización con Google Sheets. Permite
+consultas por rango y agregaciones por periodo para calcular crecimiento,
+churn y tendencias reales en lugar de valores simulados.
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# Ámbitos de las series
+SCOPE_GLOBAL = 'global'
+SCOPE_PROPIETARIO = 'propietario'
+SCOPE_ZONA = 'zona'
+GLOBAL_KEY = 'all'
+
+# Formatos strftime de SQLite por tamaño de bucket
+BUCKET_FORMATS = {
+    'hour': '%Y-%m-%d %H:00',
+    'day': '%Y-%m-%d',
+    'week': '%Y-W%W',
+    'month': '%Y-%m'
+}
+
+AGGREGATIONS = {'last', 'avg', 'min', 'max', 'sum'}
+
+class MetricsHistoryStore:
+    """
+    Serie temporal local sobre SQLite.
+    
+    Cada punto es (ts, scope, key, metric, value); el índice
+    (scope, key, metric, ts) resuelve rangos y rollups sin recorrer la tabla.
+    """
+
+    def __init__(self, path: Path, logger: Optional[logging.Logger] = None):
+        self.path = Path(path)
+        self.logger = logger or logging.getLogger(__name__)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS kpi_points ("
+            "ts REAL NOT NULL, scope TEXT NOT NULL, key TEXT NOT NULL, "
+            "metric TEXT NOT NULL, value REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_kpi_series ON kpi_points (scope, key, metric, ts)"
+        )
+        self._conn.commit()
+
+    def record(self, snapshot: Dict[Tuple[str, str], Dict[str, float]], ts: Optional[float] = None) -> int:
+        """
+        Agrega un snapshot de KPIs.
+        
+        Args:
+            snapshot: {(scope, key): {metric: value}}
+            ts: Marca de tiempo (por defecto ahora)
+            
+        Returns:
+            Número de puntos escritos
+        """
+        ts = ts if ts is not None else time.time()
+        rows = [
+            (ts, scope, key, metric, float(value))
+            for (scope, key), metrics in snapshot.items()
+            for metric, value in metrics.items()
+            if value is not None
+        ]
+        with self._lock:
+            self._conn.executemany("INSERT INTO kpi_points VALUES (?, ?, ?, ?, ?)", rows)
+            self._conn.commit()
+        return len(rows)
+
+    def range(
+        self,
+        metric: str,
+        scope: str = SCOPE_GLOBAL,
+        key: str = GLOBAL_KEY,
+        start: Optional[float] = None,
+        end: Optional[float] = None
+    ) -> List[Tuple[float, float]]:
+        """Puntos (ts, value) de una serie en el rango [start, end]"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT ts, value FROM kpi_points "
+                "WHERE scope = ? AND key = ? AND metric = ? AND ts >= ? AND ts <= ? ORDER BY ts",
+                (scope, key, metric, start if start is not None else 0, end if end is not None else time.time())
+            ).fetchall()
+
+    def rollup(
+        self,
+        metric: str,
+        scope: str = SCOPE_GLOBAL,
+        key: str = GLOBAL_KEY,
+        bucket: str = 'day',
+        agg: str = 'last',
+        start: Optional[float] = None,
+        end: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Agrega una serie por periodo (hour/day/week/month).
+        
+        Raises:
+            ValueError: Si el bucket o la agregación no son válidos
+        """
+        if bucket not in BUCKET_FORMATS:
+            raise ValueError(f"Bucket inválido: {bucket}. Opciones: {', '.join(BUCKET_FORMATS)}")
+        if agg not in AGGREGATIONS:
+            raise ValueError(f"Agregación inválida: {agg}. Opciones: {', '.join(sorted(AGGREGATIONS))}")
+        
+        period = f"strftime('{BUCKET_FORMATS[bucket]}', ts, 'unixepoch', 'localtime')"
+        params = (scope, key, metric, start if start is not None else 0, end if end is not None else time.time())
+        where = "scope = ? AND key = ? AND metric = ? AND ts >= ? AND ts <= ?"
+        
+        if agg == 'last':
+            sql = (
+                f"SELECT period, value, ts FROM ("
+                f"SELECT {period} AS period, value, ts, "
+                f"ROW_NUMBER() OVER (PARTITION BY {period} ORDER BY ts DESC) AS rn "
+                f"FROM kpi_points WHERE {where}) WHERE rn = 1 ORDER BY period"
+            )
+        else:
+            sql = (
+                f"SELECT {period} AS period, {agg.upper()}(value), MAX(ts) "
+                f"FROM kpi_points WHERE {where} GROUP BY period ORDER BY period"
+            )
+        
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [{'period': p, 'value': v, 'ts': t} for p, v, t in rows]
+
+    def baseline(
+        self,
+        metric: str,
+        at: float,
+        scope: str = SCOPE_GLOBAL,
+        key: str = GLOBAL_KEY
+    ) -> Optional[Tuple[float, float]]:
+        """
+        Valor de referencia para comparar contra el presente: el último punto
+        en o antes de `at`, o el primero registrado si la historia es más corta.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT ts, value FROM kpi_points WHERE scope = ? AND key = ? AND metric = ? AND ts <= ? "
+                "ORDER BY ts DESC LIMIT 1",
+                (scope, key, metric, at)
+            ).fetchone()
+            if row is None:
+                row = self._conn.execute(
+                    "SELECT ts, value FROM kpi_points WHERE scope = ? AND key = ? AND metric = ? "
+                    "ORDER BY ts ASC LIMIT 1",
+                    (scope, key, metric)
+                ).fetchone()
+        return row
+
+    def series_keys(self, scope: str) -> List[str]:
+        """Claves con historia para un ámbito (propietarios o zonas)"""
+        with self._lock:
+            return [k for (k,) in self._conn.execute(
+                "SELECT DISTINCT key FROM kpi_points WHERE scope = ? ORDER BY key", (scope,)
+            )]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,89 @@
+"""
+⏱️ MÉTRICAS DEL PIPELINE DEL AGENTE - Red Soluciones ISP
+=======================================================
+
+Cronometraje por etapa de process_query (normalize → route → extract →
+handler → format) y agregados de latencia para el endpoint de métricas.
+"""
+
+import time
+from collections import defaultdict, deque
+from typing import Any, Dict, Iterable, Optional
+
+class StageTimer:
+    """Cronómetro de vueltas: cada lap() mide desde la vuelta anterior"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self._mark = self.start
+        self.timings: Dict[str, float] = {}
+
+    def lap(self, stage: str):
+        now = time.perf_counter()
+        self.timings[stage] = round(self.timings.get(stage, 0.0) + (now - self._mark) * 1000, 3)
+        self._mark = now
+
+    @property
+    def elapsed(self) -> float:
+        """Segundos desde el inicio"""
+        return time.perf_counter() - self.start
+
+class PipelineMetrics:
+    """Agregado de latencias (ms) por etapa, por acción y percentiles recientes"""
+    
+    RECENT_WINDOW = 500
+
+    def __init__(self, stages: Iterable[str]):
+        self.stages = tuple(stages)
+        self.requests = 0
+        self.errors = 0
+        self.by_action: Dict[str, int] = defaultdict(int)
+        self._stage_total = {stage: 0.0 for stage in self.stages}
+        self._stage_max = {stage: 0.0 for stage in self.stages}
+        self._stage_count = {stage: 0 for stage in self.stages}
+        self._recent = deque(maxlen=self.RECENT_WINDOW)
+        self.started_at = time.time()
+
+    def record(self, action: str, timings: Dict[str, float], total_ms: float, error: bool = False):
+        self.requests += 1
+        self.by_action[action] += 1
+        if error:
+            self.errors += 1
+        for stage, ms in timings.items():
+            if stage not in self._stage_total:
+                continue
+            self._stage_total[stage] += ms
+            self._stage_count[stage] += 1
+            if ms > self._stage_max[stage]:
+                self._stage_max[stage] = ms
+        self._recent.append(total_ms)
+
+    def snapshot(self) -> Dict[str, Any]:
+        recent = sorted(self._recent)
+        
+        def percentile(p: float) -> Optional[float]:
+            if not recent:
+                return None
+            return round(recent[min(len(recent) - 1, int(len(recent) * p))], 3)
+        
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'by_action': dict(self.by_action),
+            'stages': {
+                stage: {
+                    'count': self._stage_count[stage],
+                    'avg_ms': round(self._stage_total[stage] / self._stage_count[stage], 3) if self._stage_count[stage] else 0.0,
+                    'max_ms': round(self._stage_max[stage], 3)
+                }
+                for stage in self.stages
+            },
+            'latency_ms': {
+                'window': len(recent),
+                'avg': round(sum(recent) / len(recent), 3) if recent else None,
+                'p50': percentile(0.5),
+                'p95': percentile(0.95),
+                'p99': percentile(0.99)
+            },
+            'uptime_seconds': round(time.time() - self.started_at)
+        }
@@ -0,0 +1,163 @@
+"""
+💾 CACHE SEMÁNTICO DE RESPUESTAS IA - Red Soluciones ISP
+=======================================================
+
+Cache de respuestas generadas por IA para preguntas repetidas
+("cómo van los ingresos", "resumen de la zona norte").
+
+- Clave: consulta normalizada + ámbito (propietario) + versión de datos
+- Primero coincidencia exacta; luego similitud coseno sobre vectores
+  hasheados de trigramas de caracteres (sin modelos externos), exigiendo
+  que coincidan las palabras significativas ("zona norte" ≠ "zona sur")
+- TTL por entrada, invalidación al cambiar los datos y métricas de aciertos
+"""
+
+import math
+import re
+import time
+import unicodedata
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Hashable, Optional, Tuple
+
+# Palabras que no cambian el sentido de una consulta
+STOPWORDS = frozenset({
+    'como', 'cual', 'cuales', 'cuanto', 'cuantos', 'cuantas', 'dame', 'muestrame',
+    'para', 'por', 'favor', 'sobre', 'esta', 'este', 'estan', 'hay', 'van', 'tengo', 'tenemos'
+})
+
+def normalize_query(query: str) -> str:
+    """Minúsculas, sin acentos ni puntuación y con espacios colapsados"""
+    text = unicodedata.normalize('NFKD', query.lower())
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    text = re.sub(r'[^\w\s]', ' ', text)
+    return ' '.join(text.split())
+
+def _ngram_vector(text: str, dimensions: int) -> Dict[int, float]:
+    """Vector disperso normalizado de trigramas de caracteres hasheados"""
+    padded = f"  {text} "
+    counts: Dict[int, float] = {}
+    for i in range(len(padded) - 2):
+        bucket = zlib.crc32(padded[i:i + 3].encode('utf-8')) % dimensions
+        counts[bucket] = counts.get(bucket, 0.0) + 1.0
+    norm = math.sqrt(sum(v * v for v in counts.values())) or 1.0
+    return {k: v / norm for k, v in counts.items()}
+
+def _significant_tokens(text: str) -> FrozenSet[str]:
+    """Palabras que determinan el sentido de la consulta (zonas, periodos, métricas)"""
+    return frozenset(t for t in text.split() if len(t) >= 4 and t not in STOPWORDS)
+
+def _cosine(a: Dict[int, float], b: Dict[int, float]) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(v * b.get(k, 0.0) for k, v in a.items())
+
+class ResponseCache:
+    """Cache LRU de respuestas con búsqueda exacta y por similitud"""
+    
+    DEFAULT_TTL = 600              # 10 minutos
+    DEFAULT_MAX_ENTRIES = 256
+    SIMILARITY_THRESHOLD = 0.8
+    VECTOR_DIMENSIONS = 2048
+
+    def __init__(
+        self,
+        ttl: int = DEFAULT_TTL,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        similarity_threshold: Optional[float] = SIMILARITY_THRESHOLD
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+        
+        # (ámbito, consulta normalizada) -> (versión, creado, vector, palabras, valor)
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[Hashable, float, Dict[int, float], FrozenSet[str], Any]]" = OrderedDict()
+        self._version: Optional[Hashable] = None
+        
+        self.metrics = {
+            'exact_hits': 0,
+            'similar_hits': 0,
+            'misses': 0,
+            'stores': 0,
+            'evictions': 0,
+            'invalidations': 0
+        }
+
+    def _sync_version(self, data_version: Hashable):
+        """Descarta todo si cambió la versión de datos"""
+        if self._version != data_version:
+            if self._entries:
+                self.invalidate()
+            self._version = data_version
+
+    def get(self, query: str, data_version: Hashable, scope: str = '') -> Optional[Any]:
+        """Busca una respuesta vigente para la consulta"""
+        self._sync_version(data_version)
+        normalized = normalize_query(query)
+        now = time.time()
+        
+        key = (scope, normalized)
+        entry = self._entries.get(key)
+        if entry and now - entry[1] <= self.ttl:
+            self._entries.move_to_end(key)
+            self.metrics['exact_hits'] += 1
+            return entry[4]
+        if entry:
+            del self._entries[key]
+        
+        if self.similarity_threshold is not None and self._entries:
+            vector = _ngram_vector(normalized, self.VECTOR_DIMENSIONS)
+            tokens = _significant_tokens(normalized)
+            best_key, best_score = None, self.similarity_threshold
+            for candidate_key, (_, created, candidate_vector, candidate_tokens, _) in self._entries.items():
+                if candidate_key[0] != scope or now - created > self.ttl or candidate_tokens != tokens:
+                    continue
+                score = _cosine(vector, candidate_vector)
+                if score >= best_score:
+                    best_key, best_score = candidate_key, score
+            if best_key is not None:
+                self._entries.move_to_end(best_key)
+                self.metrics['similar_hits'] += 1
+                return self._entries[best_key][4]
+        
+        self.metrics['misses'] += 1
+        return None
+
+    def put(self, query: str, data_version: Hashable, value: Any, scope: str = ''):
+        """Guarda una respuesta para la versión de datos actual"""
+        self._sync_version(data_version)
+        normalized = normalize_query(query)
+        if not normalized:
+            return
+        
+        key = (scope, normalized)
+        self._entries[key] = (
+            data_version,
+            time.time(),
+            _ngram_vector(normalized, self.VECTOR_DIMENSIONS),
+            _significant_tokens(normalized),
+            value
+        )
+        self._entries.move_to_end(key)
+        self.metrics['stores'] += 1
+        
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.metrics['evictions'] += 1
+
+    def invalidate(self):
+        """Vacía la cache (p. ej. tras altas o cambios en los datos)"""
+        self._entries.clear()
+        self.metrics['invalidations'] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Métricas de uso y tasa de aciertos"""
+        hits = self.metrics['exact_hits'] + self.metrics['similar_hits']
+        lookups = hits + self.metrics['misses']
+        return {
+            **self.metrics,
+            'entries': len(self._entries),
+            'data_version': self._version,
+            'hit_rate': round(hits / lookups * 100, 2) if lookups else 0.0,
+            'ttl': self.ttl
+        }
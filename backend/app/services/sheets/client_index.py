@@ -0,0 +1,247 @@
+"""
+Índice en memoria de clientes - Red Soluciones ISP
+
+Snapshot inmutable construido una vez por versión de datos del servicio
+de Sheets: KPIs precalculados, conteos por zona y un índice invertido de
+prefijos para búsquedas sin recorrer la lista completa ni llamar a la API.
+query() combina esos índices con filtros por zona, propietario, activo y
+pagado, orden y paginación por desplazamiento.
+"""
+
+import re
+import time
+import unicodedata
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from itertools import islice
+from typing import Any, Dict, List, Optional, Set
+
+ACTIVE_VALUES = ('si', 'sí', 'yes', '1', 'true', 'activo')
+INACTIVE_VALUES = ('no', '0', 'false', 'inactivo')
+SEARCH_FIELDS = ('Nombre', 'Email', 'Zona', 'Teléfono', 'ID Cliente')
+# Campos ordenables: nombre del parámetro -> (columna, numérico)
+SORT_FIELDS = {
+    'nombre': ('Nombre', False),
+    'zona': ('Zona', False),
+    'pago': ('Pago', True),
+    'propietario': ('Propietario', False),
+    'id': ('ID Cliente', False)
+}
+
+def _normalize(text: Any) -> str:
+    """Minúsculas, sin acentos ni puntuación"""
+    text = unicodedata.normalize('NFKD', str(text or '').lower())
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return ' '.join(re.sub(r'[^\w\s]', ' ', text).split())
+
+def parse_flag(value: Any) -> Optional[bool]:
+    """'si'/'no' (y equivalentes) a bool; None o vacío = sin filtro"""
+    if value is None or isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if not text:
+        return None
+    if text in ACTIVE_VALUES:
+        return True
+    if text in INACTIVE_VALUES:
+        return False
+    raise ValueError(f"Valor no válido: {value!r} (use si/no)")
+
+def _amount(value: Any) -> float:
+    if isinstance(value, str):
+        value = value.replace(',', '').replace('$', '').strip()
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+class ClientIndex:
+    """KPIs e índice de búsqueda de una versión de los datos de clientes"""
+
+    def __init__(self, rows: List[Dict[str, Any]], version: int):
+        self.version = version
+        self.built_at = time.time()
+        self.rows = rows
+        self.kpis = self._build_kpis(rows)
+
+        postings: Dict[str, Set[int]] = defaultdict(set)
+        by_zone: Dict[str, Set[int]] = defaultdict(set)
+        by_owner: Dict[str, Set[int]] = defaultdict(set)
+        self._phones: List[str] = []
+        self._active: Set[int] = set()
+        self._paid: Set[int] = set()
+        for position, row in enumerate(rows):
+            for field in SEARCH_FIELDS:
+                for token in _normalize(row.get(field)).split():
+                    postings[token].add(position)
+            self._phones.append(re.sub(r'\D', '', str(row.get('Teléfono', ''))))
+            by_zone[_normalize(row.get('Zona'))].add(position)
+            by_owner[_normalize(row.get('Propietario'))].add(position)
+            if str(row.get('Activo (SI/NO)', 'SI')).strip().lower() in ACTIVE_VALUES:
+                self._active.add(position)
+            if str(row.get('Pagado', '')).strip().lower() in ACTIVE_VALUES:
+                self._paid.add(position)
+        self._postings = dict(postings)
+        self._vocabulary = sorted(self._postings)
+        self._by_zone = dict(by_zone)
+        self._by_owner = dict(by_owner)
+        # Órdenes por campo, calculados en la primera consulta que los pide
+        self._sort_orders: Dict[str, List[int]] = {}
+
+    @staticmethod
+    def _build_kpis(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+        activos = pagados = 0
+        ingresos = 0.0
+        zonas: Counter = Counter()
+        planes: Counter = Counter()
+        propietarios: Counter = Counter()
+
+        for row in rows:
+            if str(row.get('Activo (SI/NO)', 'SI')).strip().lower() not in ACTIVE_VALUES:
+                continue
+            activos += 1
+            pago = _amount(row.get('Pago', row.get('Pago Mensual', 0)))
+            ingresos += pago
+            if pago:
+                planes[int(pago)] += 1
+            if str(row.get('Pagado', '')).strip().lower() in ACTIVE_VALUES:
+                pagados += 1
+            zona = str(row.get('Zona', '')).strip()
+            if zona:
+                zonas[zona.upper()] += 1
+            propietario = str(row.get('Propietario', '')).strip()
+            if propietario:
+                propietarios[propietario] += 1
+
+        return {
+            'total': len(rows),
+            'activos': activos,
+            'inactivos': len(rows) - activos,
+            'ingresos_mensuales': round(ingresos, 2),
+            'ticket_promedio': round(ingresos / activos, 2) if activos else 0.0,
+            'pagados': pagados,
+            'pendientes': activos - pagados,
+            'zonas_cubiertas': len(zonas),
+            'zonas_top': zonas.most_common(5),
+            'plan_popular': planes.most_common(1)[0] if planes else None,
+            'propietarios': dict(propietarios)
+        }
+
+    def _prefix_matches(self, prefix: str) -> Set[int]:
+        """Filas con algún token que empieza por `prefix` (rango en el vocabulario ordenado)"""
+        matches: Set[int] = set()
+        start = bisect_left(self._vocabulary, prefix)
+        for token in islice(self._vocabulary, start, None):
+            if not token.startswith(prefix):
+                break
+            matches |= self._postings[token]
+        return matches
+
+    def match(self, term: str) -> List[int]:
+        """
+        Posiciones de los clientes cuyo nombre, email, zona, teléfono o ID
+        contienen todos los términos (por prefijo), primero los que empiezan por el nombre
+        """
+        tokens = _normalize(term).split()
+        if not tokens:
+            return []
+
+        digits = re.sub(r'\D', '', term)
+        if len(digits) >= 4 and len(digits) == len(re.sub(r'[\s\-]', '', term)):
+            # Búsqueda por teléfono (parcial)
+            positions = {i for i, phone in enumerate(self._phones) if digits in phone}
+        else:
+            positions = self._prefix_matches(tokens[0])
+            for token in tokens[1:]:
+                if not positions:
+                    break
+                positions &= self._prefix_matches(token)
+
+        query = ' '.join(tokens)
+        return sorted(
+            positions,
+            key=lambda i: (not _normalize(self.rows[i].get('Nombre')).startswith(query), str(self.rows[i].get('Nombre', '')))
+        )
+
+    def search(self, term: str, limit: int = 10) -> List[Dict[str, Any]]:
+        return [self.rows[i] for i in self.match(term)[:limit]]
+
+    def _sort_key(self, field: str):
+        column, numeric = SORT_FIELDS[field]
+        if numeric:
+            return lambda i: _amount(self.rows[i].get(column, self.rows[i].get('Pago Mensual', 0)))
+        return lambda i: _normalize(self.rows[i].get(column))
+
+    def _sort_order(self, field: str) -> List[int]:
+        order = self._sort_orders.get(field)
+        if order is None:
+            order = sorted(range(len(self.rows)), key=self._sort_key(field))
+            self._sort_orders[field] = order
+        return order
+
+    def query(
+        self,
+        q: Optional[str] = None,
+        zona: Optional[str] = None,
+        owner: Optional[str] = None,
+        activo: Optional[bool] = None,
+        pagado: Optional[bool] = None,
+        sort: Optional[str] = None,
+        offset: int = 0,
+        limit: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Clientes que cumplen todos los filtros, ordenados y paginados.
+        `sort` es un campo de SORT_FIELDS, con '-' delante para orden
+        descendente; sin `sort` se conserva el orden de la hoja (o el de
+        relevancia si hay `q`).
+        """
+        descending = bool(sort) and sort.startswith('-')
+        sort_field = sort.lstrip('-').lower() if sort else None
+        if sort_field and sort_field not in SORT_FIELDS:
+            raise ValueError(f"Campo de orden no válido: {sort!r} (opciones: {', '.join(SORT_FIELDS)})")
+
+        # Intersección de índices, empezando por los filtros exactos
+        candidates: Optional[Set[int]] = None
+        filters = []
+        if zona:
+            filters.append(self._by_zone.get(_normalize(zona), set()))
+        if owner:
+            filters.append(self._by_owner.get(_normalize(owner), set()))
+        if activo is not None:
+            filters.append(self._active if activo else set(range(len(self.rows))) - self._active)
+        if pagado is not None:
+            filters.append(self._paid if pagado else set(range(len(self.rows))) - self._paid)
+        for positions in sorted(filters, key=len):
+            candidates = set(positions) if candidates is None else candidates & positions
+            if not candidates:
+                break
+
+        if q:
+            ranked = self.match(q)
+            ordered = ranked if candidates is None else [i for i in ranked if i in candidates]
+        elif candidates is None:
+            ordered = range(len(self.rows))
+        else:
+            ordered = sorted(candidates)
+
+        if sort_field:
+            if len(ordered) * 8 < len(self.rows):
+                # Pocos resultados: más barato ordenarlos que recorrer el orden global
+                ordered = sorted(ordered, key=self._sort_key(sort_field))
+            else:
+                wanted = set(ordered)
+                ordered = [i for i in self._sort_order(sort_field) if i in wanted]
+            if descending:
+                ordered = ordered[::-1]
+
+        total = len(ordered)
+        offset = max(offset, 0)
+        end = total if limit is None else offset + limit
+        page = [self.rows[i] for i in islice(ordered, offset, end)]
+        return {
+            'rows': page,
+            'total': total,
+            'offset': offset,
+            'next_offset': end if end < total else None
+        }
@@ -9,10 +9,7 @@ Sistema robusto con:
 - Métricas de rendimiento
 """
 
-import gspread
 from pathlib import Path
-from google.oauth2.service_account import Credentials
-from google.api_core.exceptions import GoogleAPIError, ServiceUnavailable, GatewayTimeout
 import time
 import logging
 import json
@@ -23,6 +20,11 @@ from datetime import datetime, timedelta
 from dataclasses import dataclass
 from functools import wraps
 import statistics
+import sys
+import threading
+from backend.app.services.sheets.client_index import ClientIndex, parse_flag
+from backend.app.utils.pagination import decode_cursor, encode_cursor
+from backend.app.utils.lazy_import import lazy_import
 from tenacity import (
     retry,
     stop_after_attempt,
@@ -32,6 +34,15 @@ from tenacity import (
     RetryCallState
 )
 
+# gspread y google-auth se cargan al conectar, no al importar el módulo
+gspread = lazy_import("gspread")
+service_account = lazy_import("google.oauth2.service_account")
+
+def _is_google_api_error(error: Exception) -> bool:
+    """GoogleAPIError sin importar google.api_core (si no está cargado, no puede serlo)"""
+    exceptions = sys.modules.get("google.api_core.exceptions")
+    return exceptions is not None and isinstance(error, exceptions.GoogleAPIError)
+
 # Tipos personalizados
 T = TypeVar('T')
 CacheKey = str
@@ -106,6 +117,12 @@ class SheetsServiceV2:
     # Configuración de caché
     DEFAULT_CACHE_TTL = 60  # segundos
     
+    # Vigencia del índice de clientes (la hoja también se edita a mano)
+    CLIENT_INDEX_TTL = 300  # segundos
+    
+    # Paginación de clientes
+    MAX_PAGE_SIZE = 500
+    
     def __init__(self, logger: Optional[logging.Logger] = None):
         """
         Inicializa el servicio con configuración por defecto.
@@ -158,6 +175,11 @@ class SheetsServiceV2:
         self._cache_timestamp = 0
         self._cache_duration = 60  # 60 segundos
         
+        # Versión de datos (cambia con cada invalidación) e índice de clientes por versión
+        self._data_version = 0
+        self._client_index: Optional[ClientIndex] = None
+        self._client_index_lock = threading.Lock()
+        
         # Métricas de rendimiento
         self._performance_metrics = {
             'calls': [],
@@ -245,20 +267,112 @@ class SheetsServiceV2:
     
     def clear_cache(self, pattern: Optional[str] = None) -> int:
         """Limpia el caché, opcionalmente filtrando por patrón de clave"""
+        self._data_version += 1
         if pattern is None:
             count = len(self._cache)
             self._cache.clear()
             self._cache_metrics['size'] = 0
             return count
             
-        # Filtrar por patrón
-        to_delete = [k for k in self._cache if pattern in k]
+        # Filtrar por patrón; la lista de clientes también se descarta porque
+        # la nueva versión reconstruye el índice de clientes desde ella
+        return self._drop_cache_keys(pattern)
+    
+    def _drop_cache_keys(self, pattern: str) -> int:
+        """Descarta entradas del caché sin cambiar la versión de datos"""
+        to_delete = [k for k in self._cache if pattern in k or k.startswith('all_clients')]
         for k in to_delete:
             del self._cache[k]
             
         self._cache_metrics['size'] = len(self._cache)
         return len(to_delete)
     
+    @property
+    def data_version(self) -> int:
+        """Versión de los datos: cambia con cada escritura o invalidación del caché"""
+        return self._data_version
+    
+    def get_client_index(self) -> ClientIndex:
+        """
+        KPIs e índice de búsqueda de clientes de la versión de datos actual.
+        Se reconstruye tras una escritura o al vencer CLIENT_INDEX_TTL;
+        mientras tanto las consultas no llaman a la API de Sheets. Al vencer
+        el TTL la versión solo cambia si la hoja trae filas distintas.
+        """
+        index = self._client_index
+        if index and index.version == self._data_version and time.time() - index.built_at < self.CLIENT_INDEX_TTL:
+            return index
+        
+        with self._client_index_lock:
+            index = self._client_index
+            if index and index.version == self._data_version:
+                if time.time() - index.built_at < self.CLIENT_INDEX_TTL:
+                    return index
+                # Vencido: releer la hoja para incluir ediciones manuales
+                self._drop_cache_keys('all_clients')
+                rows = self.get_all_clients(include_inactive=True)
+                if rows == index.rows:
+                    index.built_at = time.time()
+                    return index
+                # La hoja cambió fuera de la API: nueva versión, conservando la lectura
+                self.clear_cache('all_clients')
+                self._set_cache('all_clients_True', rows)
+            else:
+                rows = self.get_all_clients(include_inactive=True)
+            
+            version = self._data_version
+            self._client_index = ClientIndex(rows, version)
+            self.logger.info(f"🗂️ Índice de clientes v{version}: {len(rows)} registros")
+            return self._client_index
+    
+    def query_clients(
+        self,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        zona: Optional[str] = None,
+        activo: Any = None,
+        pagado: Any = None,
+        owner: Optional[str] = None,
+        sort: Optional[str] = None,
+        q: Optional[str] = None,
+        index: Optional[ClientIndex] = None
+    ) -> Dict[str, Any]:
+        """
+        Página de clientes filtrada y ordenada sobre el índice en memoria
+        (`index` si se pasa, o el de la versión de datos actual).
+        
+        `cursor` es el `next_cursor` de la página anterior; si los datos
+        cambiaron desde entonces, se continúa desde la misma posición y la
+        respuesta lo indica con `stale_cursor`. Lanza ValueError ante
+        parámetros inválidos.
+        """
+        if limit is not None and not 1 <= limit <= self.MAX_PAGE_SIZE:
+            raise ValueError(f"limit debe estar entre 1 y {self.MAX_PAGE_SIZE}")
+        
+        if index is None:
+            index = self.get_client_index()
+        offset, stale = decode_cursor(cursor, index.version) if cursor else (0, False)
+        
+        result = index.query(
+            q=q,
+            zona=zona,
+            owner=owner,
+            activo=parse_flag(activo),
+            pagado=parse_flag(pagado),
+            sort=sort,
+            offset=offset,
+            limit=limit
+        )
+        next_offset = result['next_offset']
+        return {
+            'data': result['rows'],
+            'count': len(result['rows']),
+            'total': result['total'],
+            'next_cursor': encode_cursor(index.version, next_offset) if next_offset is not None else None,
+            'stale_cursor': stale,
+            'version': index.version
+        }
+    
     def get_cache_stats(self) -> Dict[str, Any]:
         """Obtiene estadísticas del caché"""
         return {
@@ -448,7 +562,7 @@ class SheetsServiceV2:
             # Primero intentar usar el archivo encontrado
             if credentials_path:
                 self.logger.info(f"🔑 Cargando credenciales desde: {credentials_path}")
-                creds = Credentials.from_service_account_file(
+                creds = service_account.Credentials.from_service_account_file(
                     credentials_path,
                     scopes=scope
                 )
@@ -456,13 +570,13 @@ class SheetsServiceV2:
             elif Path.home().joinpath('.config/gspread/service_account.json').exists():
                 creds_file = Path.home() / '.config/gspread/service_account.json'
                 self.logger.info(f"🔑 Cargando credenciales desde: {creds_file}")
-                creds = Credentials.from_service_account_file(
+                creds = service_account.Credentials.from_service_account_file(
                     str(creds_file),
                     scopes=scope
                 )
             elif 'GOOGLE_CREDENTIALS_JSON' in os.environ:
                 self.logger.info("🔑 Cargando credenciales desde variable de entorno")
-                creds = Credentials.from_service_account_info(
+                creds = service_account.Credentials.from_service_account_info(
                     json.loads(os.environ['GOOGLE_CREDENTIALS_JSON']),
                     scopes=scope
                 )
@@ -500,13 +614,12 @@ class SheetsServiceV2:
             self.initialized = True
             self.logger.info("✅ Conexión con Google Sheets establecida correctamente")
             
-        except GoogleAPIError as e:
-            self._record_failure()
-            self.logger.error(f"❌ Error de API de Google: {str(e)}")
-            raise
         except Exception as e:
             self._record_failure()
-            self.logger.error(f"❌ Error inesperado al inicializar conexión: {str(e)}")
+            if _is_google_api_error(e):
+                self.logger.error(f"❌ Error de API de Google: {str(e)}")
+            else:
+                self.logger.error(f"❌ Error inesperado al inicializar conexión: {str(e)}")
             self.logger.error(f"❌ Error crítico al inicializar conexión: {e}", exc_info=True)
             raise
     
@@ -712,18 +825,17 @@ class SheetsServiceV2:
         return self._execute_with_retry(_search)
     
     def _get_cached_data(self, key: str):
-        """Obtiene datos del cache si están vigentes"""
-        current_time = time.time()
-        if (current_time - self._cache_timestamp < self._cache_duration and 
-            key in self._cache):
-            return self._cache[key]
-        
-        # También verificar el caché avanzado
-        if key in self._cache:
-            entry = self._cache[key]
-            if hasattr(entry, 'value'):
-                return entry.value
-            
+        """Obtiene datos del cache si están vigentes (entradas simples o CacheEntry)"""
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        
+        # Caché avanzado: la entrada tiene su propia expiración
+        if isinstance(entry, CacheEntry):
+            return entry.value if time.time() <= entry.expires_at else None
+        
+        if time.time() - self._cache_timestamp < self._cache_duration:
+            return entry
         return None
     
     def _set_cache_data(self, key: str, data):
@@ -896,25 +1008,14 @@ class SheetsServiceV2:
             
             # Preparar fila para insertar
             current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            row_data = [
-                data.get('Nombre', ''),
-                data.get('Email', ''),
-                data.get('Zona', ''),
-                data.get('Teléfono', ''),
-                data.get('Pago', ''),
-                'SI',  # Activo por defecto
-                current_time,  # Fecha de alta
-                data.get('Notas', f'Agregado via sistema el {current_time}')
-            ]
-            
-            self.sheet.append_row(row_data)
+            self.sheet.append_row(self._build_client_row(data, current_time))
             return True
         
         try:
             result = self._execute_with_retry(_add_row)
             if result:
                 # Limpiar cache
-                self._cache.clear()
+                self.clear_cache()
                 self.logger.info(f"✅ Cliente agregado: {data.get('Nombre')}")
                 return True
             return False
@@ -922,6 +1023,48 @@ class SheetsServiceV2:
             self.logger.error(f"❌ Error agregando cliente: {e}")
             return False
     
+    def _build_client_row(self, data: Dict[str, Any], current_time: str) -> List[Any]:
+        """Fila de '01_Clientes' en el orden de columnas de la hoja"""
+        return [
+            data.get('Nombre', ''),
+            data.get('Email', ''),
+            data.get('Zona', ''),
+            data.get('Teléfono', ''),
+            data.get('Pago', ''),
+            'SI',  # Activo por defecto
+            current_time,  # Fecha de alta
+            data.get('Notas', f'Agregado via sistema el {current_time}')
+        ]
+    
+    def add_clients(self, records: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Alta masiva: valida todos los registros y los agrega con una sola
+        llamada append_rows (una petición a la API en lugar de una por cliente)
+        """
+        if not records:
+            return {'success': True, 'added': 0}
+        
+        for index, data in enumerate(records):
+            if not str(data.get('Nombre', '')).strip():
+                return {'success': False, 'added': 0, 'error': f"Registro {index + 1}: campo requerido faltante: Nombre"}
+        
+        def _add_rows():
+            if self.sheet is None:
+                return False
+            current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            self.sheet.append_rows([self._build_client_row(data, current_time) for data in records])
+            return True
+        
+        try:
+            if not self._execute_with_retry(_add_rows):
+                return {'success': False, 'added': 0, 'error': 'Hoja de clientes no disponible'}
+            self.clear_cache()
+            self.logger.info(f"✅ {len(records)} clientes agregados en lote")
+            return {'success': True, 'added': len(records)}
+        except Exception as e:
+            self.logger.error(f"❌ Error en alta masiva de clientes: {e}")
+            return {'success': False, 'added': 0, 'error': str(e)}
+    
     def add_prospect(self, data: Dict[str, str]) -> bool:
         """Agrega prospecto a una hoja separada"""
         def _add_prospect_row():
@@ -929,41 +1072,11 @@ class SheetsServiceV2:
                 return False
             
             try:
-                # Intentar acceder a hoja de prospectos, crearla si no existe
-                try:
-                    spreadsheet = self.gc.open_by_key(self.sheet_id)
-                    prospects_sheet = spreadsheet.worksheet("Prospectos")
-                except gspread.WorksheetNotFound:
-                    # Crear hoja de prospectos
-                    spreadsheet = self.gc.open_by_key(self.sheet_id)
-                    prospects_sheet = spreadsheet.add_worksheet(
-                        title="Prospectos", 
-                        rows=1000, 
-                        cols=10
-                    )
-                    # Agregar encabezados
-                    headers = [
-                        "Nombre", "Teléfono", "Zona", "Email", "Estado", 
-                        "Fecha Contacto", "Notas", "Prioridad", "Origen", "Siguiente Acción"
-                    ]
-                    prospects_sheet.append_row(headers)
+                prospects_sheet = self._get_prospects_sheet()
                 
                 # Agregar prospecto
                 current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                row_data = [
-                    data.get('Nombre', ''),
-                    data.get('Teléfono', ''),
-                    data.get('Zona', ''),
-                    data.get('Email', ''),
-                    'Nuevo',  # Estado inicial
-                    current_time,
-                    data.get('Notas', 'Prospecto agregado via chat'),
-                    data.get('Prioridad', 'Media'),
-                    'Sistema',
-                    'Llamar para ofrecer servicios'
-                ]
-                
-                prospects_sheet.append_row(row_data)
+                prospects_sheet.append_row(self._build_prospect_row(data, current_time))
                 return True
                 
             except Exception as e:
@@ -973,6 +1086,7 @@ class SheetsServiceV2:
         try:
             result = self._execute_with_retry(_add_prospect_row)
             if result:
+                self.clear_cache('prospect')
                 self.logger.info(f"✅ Prospecto agregado: {data.get('Nombre')}")
                 return True
             return False
@@ -980,6 +1094,64 @@ class SheetsServiceV2:
             self.logger.error(f"❌ Error agregando prospecto: {e}")
             return False
     
+    def _get_prospects_sheet(self):
+        """Hoja de prospectos, creándola con encabezados si no existe"""
+        spreadsheet = self.gc.open_by_key(self.sheet_id)
+        try:
+            return spreadsheet.worksheet("Prospectos")
+        except gspread.WorksheetNotFound:
+            prospects_sheet = spreadsheet.add_worksheet(
+                title="Prospectos", 
+                rows=1000, 
+                cols=10
+            )
+            # Agregar encabezados
+            headers = [
+                "Nombre", "Teléfono", "Zona", "Email", "Estado", 
+                "Fecha Contacto", "Notas", "Prioridad", "Origen", "Siguiente Acción"
+            ]
+            prospects_sheet.append_row(headers)
+            return prospects_sheet
+    
+    def _build_prospect_row(self, data: Dict[str, Any], current_time: str) -> List[Any]:
+        """Fila de la hoja 'Prospectos'"""
+        return [
+            data.get('Nombre', ''),
+            data.get('Teléfono', ''),
+            data.get('Zona', ''),
+            data.get('Email', ''),
+            'Nuevo',  # Estado inicial
+            current_time,
+            data.get('Notas', 'Prospecto agregado via chat'),
+            data.get('Prioridad', 'Media'),
+            'Sistema',
+            'Llamar para ofrecer servicios'
+        ]
+    
+    def add_prospects(self, records: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Alta masiva de prospectos con una sola llamada append_rows"""
+        if not records:
+            return {'success': True, 'added': 0}
+        
+        def _add_rows():
+            if self.gc is None:
+                return False
+            current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            self._get_prospects_sheet().append_rows(
+                [self._build_prospect_row(data, current_time) for data in records]
+            )
+            return True
+        
+        try:
+            if not self._execute_with_retry(_add_rows):
+                return {'success': False, 'added': 0, 'error': 'Hoja de prospectos no disponible'}
+            self.clear_cache('prospect')
+            self.logger.info(f"✅ {len(records)} prospectos agregados en lote")
+            return {'success': True, 'added': len(records)}
+        except Exception as e:
+            self.logger.error(f"❌ Error en alta masiva de prospectos: {e}")
+            return {'success': False, 'added': 0, 'error': str(e)}
+    
     def get_prospects(self) -> List[Dict[str, Any]]:
         """Obtiene lista de prospectos"""
         def _get_prospects():
@@ -1061,6 +1233,7 @@ class SheetsServiceV2:
         try:
             result = self._execute_with_retry(_add_incident_row)
             if result:
+                self.clear_cache('incident')
                 self.logger.info(f"✅ Incidente agregado para: {data.get('Cliente')}")
                 return True
             return False
@@ -1123,7 +1296,7 @@ class SheetsServiceV2:
         try:
             result = self._execute_with_retry(_deactivate_client)
             if result:
-                self._cache.clear()  # Limpiar cache
+                self.clear_cache()  # Limpiar cache
                 self.logger.info(f"✅ Cliente desactivado: {name}")
                 return True
             return False
@@ -1250,7 +1423,7 @@ class SheetsServiceV2:
         try:
             result = self._execute_with_retry(_delete_client_row)
             if result:
-                self._cache.clear()
+                self.clear_cache()
                 self.logger.info(f"✅ Cliente eliminado: {client_name}")
                 return True
             return False
@@ -1280,7 +1453,7 @@ class SheetsServiceV2:
         try:
             result = self._execute_with_retry(_update_client_row)
             if result:
-                self._cache.clear()
+                self.clear_cache()
                 self.logger.info(f"✅ Cliente actualizado: {client_name}")
                 return True
             return False
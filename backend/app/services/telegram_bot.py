@@ -0,0 +1,396 @@
+"""
+📱 BOT DE TELEGRAM - Red Soluciones ISP
+======================================
+
+Procesamiento de updates de Telegram fuera del request del webhook:
+el webhook solo encola el update y responde a Telegram de inmediato;
+un pool de workers consulta a Carlos (agente consolidado), aplica el
+handler de comandos y envía la respuesta con un cliente HTTP asíncrono
+con conexiones reutilizadas.
+
+Telegram reintenta el webhook si la respuesta tarda: los update_id ya
+vistos se descartan (ventana acotada) y los mensajes de un mismo chat se
+procesan en orden, uno a la vez, mientras chats distintos avanzan en
+paralelo.
+
+Sin URL pública, TelegramPoller reemplaza al webhook con long polling
+(getUpdates) sobre el mismo pool y guarda el último offset en disco.
+"""
+
+import asyncio
+import json
+import logging
+import os
+from collections import OrderedDict, deque
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+from backend.app.utils.lazy_import import lazy_import
+
+# httpx se carga con el primer request a la Bot API
+httpx = lazy_import("httpx")
+
+class TelegramClient:
+    """Cliente asíncrono de la Bot API con pool de conexiones"""
+
+    API_URL = "https://api.telegram.org"
+
+    def __init__(self, token: str, base_url: Optional[str] = None, timeout: float = 10.0, max_connections: int = 20):
+        self.token = token
+        self.base_url = (base_url or self.API_URL).rstrip('/')
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self._client: Optional["httpx.AsyncClient"] = None
+
+    def _http(self) -> "httpx.AsyncClient":
+        # Se crea en el primer uso para quedar ligado al event loop del servidor
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections
+                )
+            )
+        return self._client
+
+    async def call(self, method: str, payload: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Invoca un método de la Bot API y devuelve el JSON de respuesta"""
+        response = await self._http().post(
+            f"{self.base_url}/bot{self.token}/{method}",
+            json=payload or {},
+            timeout=timeout if timeout is not None else self.timeout
+        )
+        return response.json()
+
+    async def send_message(self, chat_id: Any, text: str, parse_mode: Optional[str] = "Markdown") -> Dict[str, Any]:
+        payload = {"chat_id": chat_id, "text": text}
+        if parse_mode:
+            payload["parse_mode"] = parse_mode
+        return await self.call("sendMessage", payload)
+
+    async def get_updates(self, offset: Optional[int] = None, timeout: int = 25, limit: int = 100) -> List[Dict[str, Any]]:
+        """Long polling: espera hasta `timeout` segundos por updates nuevos"""
+        payload: Dict[str, Any] = {"timeout": timeout, "limit": limit}
+        if offset is not None:
+            payload["offset"] = offset
+        result = await self.call("getUpdates", payload, timeout=timeout + self.timeout)
+        if not result.get("ok", False):
+            raise RuntimeError(f"getUpdates falló: {result.get('description')}")
+        return result.get("result", [])
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+def _update_chat_id(update: Dict[str, Any]) -> Optional[Any]:
+    """chat_id del update (mensaje, mensaje editado o callback)"""
+    message = (
+        update.get('message')
+        or update.get('edited_message')
+        or (update.get('callback_query') or {}).get('message')
+        or {}
+    )
+    return message.get('chat', {}).get('id')
+
+class TelegramBot:
+    """
+    Colas por chat atendidas por un pool de workers.
+    
+    Cada chat tiene su propia cola FIFO y como máximo un worker a la vez;
+    la cola de listos contiene los chats con trabajo pendiente (turno
+    rotativo entre chats).
+    """
+    
+    # update_id recordados para descartar reintentos de Telegram
+    DEDUP_WINDOW = 2000
+
+    def __init__(
+        self,
+        client: TelegramClient,
+        command_handler: Callable[[Dict[str, Any]], Dict[str, Any]],
+        agent=None,
+        workers: int = 4,
+        queue_size: int = 1000,
+        prepare: Optional[Callable[[], Awaitable[Any]]] = None,
+        logger: Optional[logging.Logger] = None
+    ):
+        self.client = client
+        self.command_handler = command_handler
+        self.agent = agent
+        # Espera a que los servicios estén listos antes de procesar (el webhook no la espera)
+        self.prepare = prepare
+        self.workers = max(1, workers)
+        self.queue_size = queue_size
+        self.logger = logger or logging.getLogger(__name__)
+        self._chat_queues: Dict[Any, Deque[Dict[str, Any]]] = {}
+        self._ready: asyncio.Queue = asyncio.Queue()
+        self._pending = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._seen_updates: "OrderedDict[int, None]" = OrderedDict()
+        self._tasks: List[asyncio.Task] = []
+        self.stats_counters = {
+            'received': 0,
+            'processed': 0,
+            'failed': 0,
+            'rejected': 0,
+            'duplicates': 0,
+            'sent': 0,
+            'send_errors': 0
+        }
+
+    # === COLA Y WORKERS ===
+
+    def _ensure_workers(self):
+        """Arranca el pool en el primer update (requiere event loop en ejecución)"""
+        self._tasks = [task for task in self._tasks if not task.done()]
+        for _ in range(self.workers - len(self._tasks)):
+            self._tasks.append(asyncio.create_task(self._worker()))
+
+    def _is_duplicate(self, update_id: Optional[int]) -> bool:
+        """Registra el update_id; True si ya se recibió dentro de la ventana"""
+        if update_id is None:
+            return False
+        if update_id in self._seen_updates:
+            self._seen_updates.move_to_end(update_id)
+            return True
+        self._seen_updates[update_id] = None
+        if len(self._seen_updates) > self.DEDUP_WINDOW:
+            self._seen_updates.popitem(last=False)
+        return False
+
+    def submit(self, update: Dict[str, Any]) -> bool:
+        """
+        Encola un update en la cola de su chat.
+        
+        Returns:
+            False si no hay capacidad; un reintento ya recibido devuelve True sin encolar
+        """
+        self._ensure_workers()
+        if self._pending >= self.queue_size:
+            self.stats_counters['rejected'] += 1
+            return False
+        
+        update_id = update.get('update_id')
+        if self._is_duplicate(update_id):
+            self.stats_counters['duplicates'] += 1
+            self.logger.info(f"🔁 Update de Telegram {update_id} repetido, ignorado")
+            return True
+        
+        chat_id = _update_chat_id(update)
+        key = chat_id if chat_id is not None else f"update:{update_id}"
+        chat_queue = self._chat_queues.get(key)
+        if chat_queue is None:
+            # Chat sin trabajo pendiente: pasa a la cola de listos
+            chat_queue = self._chat_queues[key] = deque()
+            self._ready.put_nowait(key)
+        chat_queue.append(update)
+        
+        self._pending += 1
+        self._idle.clear()
+        self.stats_counters['received'] += 1
+        return True
+
+    async def process_now(self, update: Dict[str, Any]) -> bool:
+        """
+        Procesa un update dentro de la petición, sin pasar por la cola
+        (serverless: lo que corre después de responder puede no ejecutarse).
+        
+        Returns:
+            False si era un reintento ya recibido
+        """
+        if self._is_duplicate(update.get('update_id')):
+            self.stats_counters['duplicates'] += 1
+            return False
+        
+        self.stats_counters['received'] += 1
+        try:
+            await self.process_update(update)
+            self.stats_counters['processed'] += 1
+        except Exception as e:
+            self.stats_counters['failed'] += 1
+            self.logger.error(f"❌ Error procesando update de Telegram {update.get('update_id')}: {e}")
+        return True
+
+    async def _worker(self):
+        while True:
+            key = await self._ready.get()
+            chat_queue = self._chat_queues[key]
+            update = chat_queue.popleft()
+            try:
+                await self.process_update(update)
+                self.stats_counters['processed'] += 1
+            except Exception as e:
+                self.stats_counters['failed'] += 1
+                self.logger.error(f"❌ Error procesando update de Telegram {update.get('update_id')}: {e}")
+            finally:
+                if chat_queue:
+                    # Siguiente mensaje del chat al final de la fila (turno rotativo)
+                    self._ready.put_nowait(key)
+                else:
+                    del self._chat_queues[key]
+                self._pending -= 1
+                if self._pending == 0:
+                    self._idle.set()
+
+    async def drain(self):
+        """Espera a que se procesen los updates encolados"""
+        await self._idle.wait()
+
+    async def stop(self):
+        """Detiene los workers y cierra el cliente HTTP"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await self.client.close()
+
+    # === PROCESAMIENTO ===
+
+    async def build_reply(self, update: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Respuesta del handler de comandos, reemplazada por la de Carlos si la hay.
+        Los comandos de datos servidos desde el índice ("source": "index") no pasan por el agente.
+        """
+        message = update.get('message') or update.get('edited_message') or {}
+        text = (message.get('text') or '').strip()
+        chat_id = message.get('chat', {}).get('id')
+        
+        if self.prepare is not None:
+            await self.prepare()
+        
+        # El handler puede reconstruir el índice de clientes (lectura de Sheets): fuera del event loop
+        response = await asyncio.to_thread(self.command_handler, update)
+        if response.get("source") == "index":
+            return response
+
+        # Si hay texto, procesarlo con Carlos (IA real)
+        carlos_response = None
+        if self.agent and text and text.lower() not in ['/start', '/help']:
+            try:
+                result = await self.agent.process_query(
+                    text, {"session_id": f"telegram:{chat_id}"} if chat_id else None
+                )
+                if result and result.message:
+                    carlos_response = result.message
+            except Exception as e:
+                self.logger.warning(f"Carlos no disponible para Telegram: {e}")
+
+        if carlos_response and response.get("method") == "sendMessage":
+            response["text"] = f"🤖 **Carlos - Red Soluciones ISP**\n\n{carlos_response}"
+        return response
+
+    async def process_update(self, update: Dict[str, Any]):
+        response = await self.build_reply(update)
+        if response.get("method") != "sendMessage" or response.get("chat_id") is None:
+            return
+
+        try:
+            result = await self.client.send_message(
+                response["chat_id"], response["text"], response.get("parse_mode", "Markdown")
+            )
+        except httpx.HTTPError as e:
+            self.stats_counters['send_errors'] += 1
+            raise RuntimeError(f"sendMessage falló: {e}") from e
+
+        if not result.get("ok", False):
+            self.stats_counters['send_errors'] += 1
+            self.logger.warning(f"⚠️ Telegram rechazó sendMessage: {result.get('description')}")
+            return
+        self.stats_counters['sent'] += 1
+        self.logger.info(f"📱 Respuesta enviada a Telegram chat {response['chat_id']}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats_counters,
+            'queue_depth': self._pending,
+            'active_chats': len(self._chat_queues),
+            'dedup_window': len(self._seen_updates),
+            'workers': len([task for task in self._tasks if not task.done()])
+        }
+
+class TelegramPoller:
+    """
+    Ingesta por long polling (getUpdates) para despliegues sin URL pública.
+    
+    Cada lote se reparte en el pool de TelegramBot (chats en paralelo) y el
+    offset se confirma solo cuando el lote terminó de procesarse: tras un
+    reinicio, Telegram reenvía lo que quedó pendiente.
+    """
+    
+    RETRY_DELAY = 5  # segundos tras un error de red
+
+    def __init__(
+        self,
+        bot: TelegramBot,
+        offset_path: Optional[Path] = None,
+        poll_timeout: int = 25,
+        batch_limit: int = 100,
+        logger: Optional[logging.Logger] = None
+    ):
+        self.bot = bot
+        self.client = bot.client
+        self.offset_path = Path(offset_path) if offset_path else None
+        self.poll_timeout = poll_timeout
+        self.batch_limit = batch_limit
+        self.logger = logger or bot.logger
+        self.offset: Optional[int] = self._load_offset()
+        self.batches = 0
+        self._stopping = False
+
+    def _load_offset(self) -> Optional[int]:
+        if not self.offset_path or not self.offset_path.exists():
+            return None
+        try:
+            return int(json.loads(self.offset_path.read_text()).get("offset"))
+        except (ValueError, TypeError, OSError) as e:
+            self.logger.warning(f"⚠️ Offset de Telegram ilegible, se inicia sin offset: {e}")
+            return None
+
+    def _save_offset(self):
+        if not self.offset_path or self.offset is None:
+            return
+        self.offset_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.offset_path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps({"offset": self.offset}))
+        os.replace(tmp_path, self.offset_path)
+
+    async def poll_once(self) -> int:
+        """Obtiene y procesa un lote; devuelve el número de updates"""
+        updates = await self.client.get_updates(self.offset, self.poll_timeout, self.batch_limit)
+        if not updates:
+            return 0
+        
+        for update in updates:
+            while not self.bot.submit(update):
+                # Pool saturado: esperar a que se libere antes de seguir
+                await self.bot.drain()
+        await self.bot.drain()
+        
+        self.offset = max(update['update_id'] for update in updates) + 1
+        self._save_offset()
+        self.batches += 1
+        return len(updates)
+
+    async def run(self):
+        """Bucle de polling hasta stop()"""
+        # getUpdates no funciona con un webhook activo
+        await self.client.call("deleteWebhook", {"drop_pending_updates": False})
+        self.logger.info(f"📡 Telegram en modo polling (offset {self.offset})")
+        
+        while not self._stopping:
+            try:
+                await self.poll_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.error(f"❌ Error en polling de Telegram: {e}")
+                await asyncio.sleep(self.RETRY_DELAY)
+
+    def stop(self):
+        self._stopping = True
+
+    def stats(self) -> Dict[str, Any]:
+        return {'mode': 'polling', 'offset': self.offset, 'batches': self.batches}
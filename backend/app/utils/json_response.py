@@ -0,0 +1,114 @@
+"""
+Serialización JSON rápida - Red Soluciones ISP
+
+- dumps(): orjson cuando está instalado (json estándar como respaldo)
+- FastJSONResponse: clase de respuesta por defecto de la aplicación
+- EncodedPayloadCache: bytes ya serializados por (endpoint, clave, versión
+  de datos), para servir payloads sin cambios sin volver a codificarlos
+- merge_encoded(): agrega campos calculados por petición (salud, timestamp)
+  a un objeto JSON guardado, sin decodificarlo
+"""
+
+import json
+import logging
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from fastapi.responses import JSONResponse, Response
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+    logging.warning("⚠️ orjson no disponible - usando json estándar")
+
+def _default(value: Any) -> Any:
+    # Mismo criterio que json.dumps(default=str): fechas, Path, Decimal, enums...
+    return str(value)
+
+def dumps(payload: Any) -> bytes:
+    """Serializa a JSON UTF-8 compacto"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(payload, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(payload, ensure_ascii=False, default=str, separators=(',', ':')).encode('utf-8')
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse serializada con orjson"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+def encoded_response(body: bytes, status_code: int = 200) -> Response:
+    """Respuesta para un cuerpo JSON ya serializado"""
+    return Response(content=body, status_code=status_code, media_type="application/json")
+
+def merge_encoded(body: bytes, fields: Dict[str, Any]) -> bytes:
+    """Objeto JSON `body` con las claves de `fields` agregadas al final"""
+    body = body.strip()
+    if not (body.startswith(b'{') and body.endswith(b'}')):
+        raise ValueError("merge_encoded requiere un objeto JSON")
+    if not fields:
+        return body
+    extra = dumps(fields)
+    if body == b'{}':
+        return extra
+    return body[:-1] + b',' + extra[1:]
+
+class EncodedPayloadCache:
+    """LRU de cuerpos JSON serializados, válidos mientras no cambie la versión de datos"""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, Hashable], Tuple[Any, bytes]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, endpoint: str, key: Hashable, version: Any) -> Optional[bytes]:
+        """Bytes guardados de (endpoint, key) si corresponden a `version`"""
+        cache_key = (endpoint, key)
+        cached = self._entries.get(cache_key)
+        if cached is not None and cached[0] == version:
+            self._entries.move_to_end(cache_key)
+            self.hits += 1
+            return cached[1]
+        self.misses += 1
+        return None
+
+    def put(self, endpoint: str, key: Hashable, version: Any, payload: Any) -> bytes:
+        """Serializa `payload` y lo guarda para `version`"""
+        cache_key = (endpoint, key)
+        body = dumps(payload)
+        self._entries[cache_key] = (version, body)
+        self._entries.move_to_end(cache_key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return body
+
+    def get_or_encode(self, endpoint: str, key: Hashable, version: Any, build: Callable[[], Any]) -> bytes:
+        """Bytes de (endpoint, key) para `version`; si no están, build() se serializa y se guarda"""
+        body = self.get(endpoint, key, version)
+        if body is None:
+            body = self.put(endpoint, key, version, build())
+        return body
+
+    def invalidate(self, endpoint: Optional[str] = None) -> int:
+        if endpoint is None:
+            count = len(self._entries)
+            self._entries.clear()
+            return count
+        stale = [key for key in self._entries if key[0] == endpoint]
+        for key in stale:
+            del self._entries[key]
+        return len(stale)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'bytes': sum(len(body) for _, body in self._entries.values()),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0
+        }
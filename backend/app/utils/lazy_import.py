@@ -0,0 +1,28 @@
+"""
+Importación diferida de módulos pesados - Red Soluciones ISP
+
+lazy_import("gspread") devuelve el módulo sin ejecutarlo: el código real se
+carga en el primer acceso a un atributo. Así importar la aplicación (arranque
+en frío en Vercel) no paga gspread/google-auth hasta que se conecta a Sheets.
+"""
+
+import importlib.util
+import sys
+from types import ModuleType
+
+def lazy_import(name: str) -> ModuleType:
+    """Módulo `name` cargado en el primer uso; ImportError inmediato si no está instalado"""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named '{name}'", name=name)
+
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
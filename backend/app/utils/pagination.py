@@ -0,0 +1,36 @@
+"""
+Cursores de paginación - Red Soluciones ISP
+
+Un único formato para /api/clients, el contexto por propietario y la
+búsqueda de entidades: base64 url-safe de {"v": versión de datos, "o": offset}.
+
+Política ante datos cambiados: el cursor sigue siendo válido, se continúa
+desde la misma posición y quien pagina recibe `stale=True` para avisar al
+cliente (puede repetir u omitir registros si hubo altas o bajas).
+"""
+
+import base64
+import json
+from typing import Any, Tuple
+
+def encode_cursor(version: Any, offset: int) -> str:
+    """Cursor opaco para continuar en `offset` sobre la versión de datos `version`"""
+    raw = json.dumps({'v': version, 'o': offset}, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor: str, version: Any) -> Tuple[int, bool]:
+    """
+    (offset, stale) de un cursor; `stale` indica que los datos cambiaron
+    desde que se emitió. Lanza ValueError si el cursor no es válido.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        data = json.loads(raw)
+        offset = int(data['o'])
+        cursor_version = data['v']
+    except Exception:
+        raise ValueError("Cursor no válido")
+
+    if offset < 0:
+        raise ValueError("Cursor no válido")
+    return offset, cursor_version != version
@@ -345,7 +345,7 @@ Puedo ayudarte con:
 const Dashboard = {
   initialized: false,
   widgets: new Map(),
-  refreshInterval: null,
+  refreshTimer: null,
   
   async initialize() {
     console.log('📊 Inicializando dashboard homologado...');
@@ -539,10 +539,25 @@ const Dashboard = {
   },
   
   startAutoRefresh() {
-    // Refrescar dashboard cada 5 minutos
-    this.refreshInterval = setInterval(async () => {
-      await this.refreshAll();
-    }, 5 * 60 * 1000);
+    // Recargar widgets cuando el servidor avisa cambios por /api/stream (o en el polling de respaldo).
+    // Los eventos de un mismo cambio llegan juntos: se agrupan en una sola recarga.
+    SystemState.addListener((event) => {
+      if (!event.startsWith('live_')) return;
+      
+      clearTimeout(this.refreshTimer);
+      this.refreshTimer = setTimeout(() => this.reloadWidgets(), 1000);
+    });
+  },
+  
+  async reloadWidgets() {
+    if (!SystemState.currentUser) return;
+    
+    try {
+      await SystemState.loadUserContext(SystemState.currentUser);
+      await this.loadAllWidgets();
+    } catch (error) {
+      console.error('❌ Error actualizando widgets:', error);
+    }
   },
   
   async refreshAll() {
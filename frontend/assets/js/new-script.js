@@ -88,11 +88,11 @@ const SystemState = {
         this.systemContext = data.context;
         this.lastSync = new Date().toISOString();
         
-        // Actualizar cache del dashboard
-        await this.loadDashboardData(propietario);
-        
-        // Cargar insights automáticos
-        await this.loadBusinessInsights(propietario);
+        // Dashboard, KPIs y estado de servicios en una sola petición
+        if (!await this.loadBootstrap(propietario)) {
+          await this.loadDashboardData(propietario);
+          await this.loadBusinessInsights(propietario);
+        }
         
         this.notifyListeners('context_loaded', this.systemContext);
         console.log('✅ Contexto cargado exitosamente');
@@ -108,6 +108,31 @@ const SystemState = {
     }
   },
   
+  // Carga agregada: dashboard, KPIs y salud desde la misma versión de datos
+  async loadBootstrap(propietario) {
+    try {
+      const response = await fetch(`${API_BASE}/bootstrap?owner=${encodeURIComponent(propietario || '')}`);
+      const data = await response.json();
+      
+      if (data.success) {
+        this.status = {
+          ...this.status,
+          context_engine: data.health?.status === 'healthy',
+          enhanced_agent: data.health?.services?.super_agent || false,
+          sheets_service: data.sheets_status?.sheets_connected || false
+        };
+        this.cache.dashboard = data.dashboard;
+        this.cache.insights = data.kpis;
+        this.notifyListeners('dashboard_updated', data.dashboard);
+        this.notifyListeners('insights_updated', data.kpis);
+        return true;
+      }
+    } catch (error) {
+      console.error('Error cargando bootstrap:', error);
+    }
+    return false;
+  },
+  
   // Cargar datos del dashboard mejorado
   async loadDashboardData(propietario) {
     try {
@@ -1124,9 +1149,10 @@ function searchClients() {
   
   clientsList.innerHTML = 'Buscando...';
   
-  fetch(`${API_BASE}/clients?search=${encodeURIComponent(searchTerm)}`)
+  fetch(`${API_BASE}/clients?q=${encodeURIComponent(searchTerm)}&limit=50`)
     .then(res => res.json())
-    .then(clients => {
+    .then(result => {
+      const clients = result.data || [];
       if (clients.length === 0) {
         clientsList.innerHTML = '<p>No se encontraron clientes con ese criterio.</p>';
         return;
@@ -1179,8 +1205,10 @@ async function searchClients() {
   clientsList.innerHTML = 'Buscando...';
   
   try {
-    const response = await fetch(`${API_BASE}/clients?search=${encodeURIComponent(searchTerm)}`);
-    const clients = await response.json();
+    // Búsqueda resuelta en el servidor con el índice de clientes
+    const response = await fetch(`${API_BASE}/clients?q=${encodeURIComponent(searchTerm)}&limit=50`);
+    const result = await response.json();
+    const clients = result.data || [];
     
     if (clients.length === 0) {
       clientsList.innerHTML = '<p>No se encontraron clientes con ese criterio.</p>';
@@ -1208,9 +1236,65 @@ async function searchClients() {
   }
 }
 
-// Auto-actualizar el dashboard cada 30 segundos
-setInterval(() => {
-  if (typeof loadDashboard === 'function' && !AppState.isLoading) {
+// === ACTUALIZACIONES EN VIVO (SSE) ===
+// El servidor empuja los cambios por /api/stream; el polling solo queda como respaldo
+const LiveUpdates = {
+  source: null,
+  fallbackTimer: null,
+  FALLBACK_INTERVAL: 30000,
+  EVENTS: ['kpis', 'clients_changed', 'data_changed'],
+  
+  start() {
+    if (this.source) return;
+    
+    if (typeof EventSource === 'undefined') {
+      this.startFallback();
+      return;
+    }
+    
+    this.source = new EventSource(`${API_BASE}/stream`);
+    this.source.onopen = () => this.stopFallback();
+    
+    this.EVENTS.forEach(name => {
+      this.source.addEventListener(name, (event) => {
+        try {
+          SystemState.notifyListeners(`live_${name}`, JSON.parse(event.data));
+        } catch (error) {
+          console.error(`Error procesando evento ${name}:`, error);
+        }
+      });
+    });
+    
+    this.source.onerror = () => {
+      // EventSource reconecta solo; si la conexión quedó cerrada, volver al polling
+      if (this.source && this.source.readyState === EventSource.CLOSED) {
+        this.source = null;
+        this.startFallback();
+      }
+    };
+  },
+  
+  startFallback() {
+    if (this.fallbackTimer) return;
+    console.warn('⚠️ /api/stream no disponible, actualizando por polling');
+    this.fallbackTimer = setInterval(() => {
+      SystemState.notifyListeners('live_poll', null);
+    }, this.FALLBACK_INTERVAL);
+  },
+  
+  stopFallback() {
+    if (this.fallbackTimer) {
+      clearInterval(this.fallbackTimer);
+      this.fallbackTimer = null;
+    }
+  }
+};
+
+// Recargar las tarjetas del dashboard solo cuando cambian los KPIs o los clientes
+SystemState.addListener((event) => {
+  if (['live_kpis', 'live_clients_changed', 'live_poll'].includes(event) && !AppState.isLoading) {
     loadDashboard();
   }
-}, 30000);
+});
+
+document.addEventListener('DOMContentLoaded', () => LiveUpdates.start());
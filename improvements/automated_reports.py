@@ -51,9 +51,10 @@ class ReportConfig:
 class ReportGenerator:
     """Generador principal de reportes"""
     
-    def __init__(self, sheets_service, business_monitor=None):
+    def __init__(self, sheets_service, business_monitor=None, metrics_history=None):
         self.sheets_service = sheets_service
         self.business_monitor = business_monitor
+        self.metrics_history = metrics_history  # MetricsHistoryStore del motor de contexto
         self.config = ReportConfig()
         self.setup_logging()
     
@@ -251,24 +252,19 @@ class ReportGenerator:
             return {}
     
     async def _get_weekly_data(self, propietario: str = None) -> Dict[str, Any]:
-        """Obtener datos de la semana"""
-        # Datos actuales (simulado con datos del día)
+        """Obtener datos de la semana desde el histórico de métricas"""
         daily_data = await self._get_daily_data(propietario)
         
-        # Simular evolución semanal
-        week_evolution = []
-        for i in range(7):
-            day_date = datetime.now().date() - timedelta(days=i)
-            # Simular pequeñas variaciones
-            variation = 1 + (i * 0.02)  # 2% de variación por día
-            
-            week_evolution.append({
-                'fecha': day_date.isoformat(),
-                'clientes_activos': int(daily_data['clientes_activos'] * variation),
-                'ingresos': daily_data['ingresos_esperados'] * variation,
-                'nuevos_clientes': max(0, 2 - i),  # Simulado
-                'bajas': max(0, i - 1)  # Simulado
-            })
+        week_evolution = self._get_history_days(propietario, days=7)
+        if not week_evolution:
+            # Sin histórico: solo el día actual
+            week_evolution = [{
+                'fecha': daily_data.get('fecha', datetime.now().date().isoformat()),
+                'clientes_activos': daily_data.get('clientes_activos', 0),
+                'ingresos': daily_data.get('ingresos_esperados', 0),
+                'nuevos_clientes': 0,
+                'bajas': 0
+            }]
         
         return {
             'semana_actual': week_evolution,
@@ -276,6 +272,47 @@ class ReportGenerator:
             'tendencia_semanal': 'positiva' if week_evolution[0]['clientes_activos'] > week_evolution[-1]['clientes_activos'] else 'negativa'
         }
     
+    def _get_history_days(self, propietario: str = None, days: int = 7, offset_days: int = 0) -> List[Dict[str, Any]]:
+        """Evolución diaria (más reciente primero) a partir del histórico de KPIs"""
+        if not self.metrics_history:
+            return []
+        
+        scope, key = ('propietario', propietario) if propietario else ('global', 'all')
+        end = datetime.now() - timedelta(days=offset_days)
+        # Un día extra para calcular altas/bajas del primer día de la ventana
+        start = (end - timedelta(days=days)).replace(hour=0, minute=0, second=0, microsecond=0)
+        
+        try:
+            series = {
+                metric: {p['period']: p['value'] for p in self.metrics_history.rollup(
+                    metric, scope=scope, key=key, bucket='day', agg='last',
+                    start=start.timestamp(), end=end.timestamp()
+                )}
+                for metric in ('total_clientes', 'clientes_activos', 'ingresos_mensuales')
+            }
+        except Exception as e:
+            self.logger.error(f"Error consultando histórico de métricas: {e}")
+            return []
+        
+        evolution = []
+        previous = None
+        for fecha in sorted(series['clientes_activos']):
+            total = series['total_clientes'].get(fecha, 0)
+            activos = series['clientes_activos'][fecha]
+            nuevos = max(0, total - previous['total']) if previous else 0
+            bajas = max(0, previous['activos'] + nuevos - activos) if previous else 0
+            evolution.append({
+                'fecha': fecha,
+                'clientes_activos': int(activos),
+                'ingresos': series['ingresos_mensuales'].get(fecha, 0.0),
+                'nuevos_clientes': int(nuevos),
+                'bajas': int(bajas)
+            })
+            previous = {'total': total, 'activos': activos}
+        
+        evolution.reverse()
+        return evolution[:days]
+    
     async def _get_monthly_data(self, propietario: str = None) -> Dict[str, Any]:
         """Obtener datos del mes"""
         weekly_data = await self._get_weekly_data(propietario)
@@ -327,7 +364,7 @@ class ReportGenerator:
             'tendencia_ingresos': ingresos_trend,
             'tendencia_clientes': clientes_trend,
             'dia_mejor_rendimiento': max(week_data, key=lambda x: x['ingresos'])['fecha'],
-            'crecimiento_semanal': ((week_data[0]['ingresos'] - week_data[-1]['ingresos']) / week_data[-1]['ingresos']) * 100,
+            'crecimiento_semanal': ((week_data[0]['ingresos'] - week_data[-1]['ingresos']) / max(week_data[-1]['ingresos'], 1)) * 100,
             'estabilidad': 'alta' if abs(ingresos_trend) < 5 else 'media' if abs(ingresos_trend) < 15 else 'baja'
         }
     
@@ -471,14 +508,21 @@ class ReportGenerator:
         return []
     
     async def _compare_with_previous_week(self, data: Dict[str, Any], propietario: str = None) -> Dict[str, Any]:
-        """Comparar con semana anterior (simulado)"""
-        # En implementación real, obtendría datos históricos
+        """Comparar con semana anterior usando el histórico de métricas"""
         current_revenue = sum(d['ingresos'] for d in data.get('semana_actual', []))
-        previous_revenue = current_revenue * 0.95  # Simulado: 5% menos la semana anterior
+        previous_week = self._get_history_days(propietario, days=7, offset_days=7)
+        
+        if not previous_week:
+            return {
+                'ingresos_semana_anterior': None,
+                'variacion_porcentual': 0.0,
+                'direccion': 'sin_historico'
+            }
         
+        previous_revenue = sum(d['ingresos'] for d in previous_week)
         return {
             'ingresos_semana_anterior': previous_revenue,
-            'variacion_porcentual': ((current_revenue - previous_revenue) / previous_revenue) * 100,
+            'variacion_porcentual': ((current_revenue - previous_revenue) / max(previous_revenue, 1)) * 100,
             'direccion': 'positiva' if current_revenue > previous_revenue else 'negativa'
         }
     
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+BENCHMARK DE ARRANQUE EN FRÍO - Red Soluciones ISP
+Costo de importar el punto de entrada de Vercel (api/index.py) en procesos
+nuevos, los módulos más caros (-X importtime) y si los módulos pesados
+(gspread, google-auth, google-generativeai, httpx) siguen diferidos.
+
+Uso:
+    python scripts/benchmark_import_time.py                 # 5 procesos
+    python scripts/benchmark_import_time.py 10 --guardar data/import_time.jsonl
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Deben cargarse recién al conectar con Sheets / Gemini / Telegram
+MODULOS_DIFERIDOS = [
+    "gspread",
+    "google.oauth2.service_account",
+    "google.auth",
+    "google.generativeai",
+    "httpx",
+]
+
+# Imprime los módulos pesados realmente ejecutados (los diferidos son _LazyModule)
+SONDA = """
+import json, sys
+import api.index
+cargados = [
+    m for m in {modulos!r}
+    if m in sys.modules and type(sys.modules[m]).__name__ != '_LazyModule'
+]
+print(json.dumps(cargados))
+"""
+
+def ejecutar(codigo: str, importtime: bool = False) -> subprocess.CompletedProcess:
+    comando = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", codigo]
+    return subprocess.run(comando, cwd=ROOT, capture_output=True, text=True, env=dict(os.environ, PYTHONDONTWRITEBYTECODE="1"))
+
+def parsear_importtime(stderr: str):
+    """[(módulo, acumulado_us)] de la salida de -X importtime"""
+    modulos = []
+    for linea in stderr.splitlines():
+        if not linea.startswith("import time:") or "cumulative" in linea:
+            continue
+        _propio, acumulado, nombre = linea[len("import time:"):].split("|")
+        modulos.append((nombre.strip(), int(acumulado)))
+    return modulos
+
+def main():
+    parser = argparse.ArgumentParser(description="Costo de arranque en frío de la API")
+    parser.add_argument("procesos", nargs="?", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="módulos más caros a mostrar")
+    parser.add_argument("--guardar", help="archivo JSONL donde acumular el historial")
+    args = parser.parse_args()
+
+    tiempos = []
+    modulos = []
+    for _ in range(args.procesos):
+        inicio = time.perf_counter()
+        resultado = ejecutar("import api.index", importtime=True)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+        if resultado.returncode != 0:
+            print(resultado.stderr[-2000:])
+            sys.exit("❌ Falló la importación de api/index.py")
+        modulos = parsear_importtime(resultado.stderr)
+
+    importacion = dict(modulos).get("api.index", 0) / 1000
+    cargados = json.loads(ejecutar(SONDA.format(modulos=MODULOS_DIFERIDOS)).stdout.strip().splitlines()[-1])
+
+    print(f"\n🧊 Arranque en frío de api/index.py ({args.procesos} procesos)")
+    print(f"  Proceso completo (mediana):   {statistics.median(tiempos):8.1f} ms")
+    print(f"  Proceso completo (mínimo):    {min(tiempos):8.1f} ms")
+    print(f"  import api.index (-X importtime): {importacion:8.1f} ms")
+
+    print("\n🐢 Módulos más caros (acumulado):")
+    for nombre, acumulado in sorted(modulos, key=lambda m: m[1], reverse=True)[:args.top]:
+        print(f"  {acumulado / 1000:8.1f} ms  {nombre}")
+
+    print("\n💤 Módulos pesados diferidos:")
+    for modulo in MODULOS_DIFERIDOS:
+        print(f"  {'❌ cargado al importar' if modulo in cargados else '✅ diferido':<24} {modulo}")
+
+    if args.guardar:
+        registro = {
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "procesos": args.procesos,
+            "mediana_ms": round(statistics.median(tiempos), 1),
+            "minimo_ms": round(min(tiempos), 1),
+            "import_ms": round(importacion, 1),
+            "cargados": cargados,
+        }
+        ruta = Path(args.guardar)
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        with open(ruta, "a", encoding="utf-8") as f:
+            f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+        print(f"\n💾 Resultado agregado a {ruta}")
+
+    # Código de salida != 0 si un módulo pesado volvió a importarse al arrancar
+    sys.exit(1 if cargados else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+BENCHMARK ROUTER DE INTENCIONES - Red Soluciones ISP
+Costo por mensaje del router compilado frente al recorrido patrón por patrón
+"""
+
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backend.app.services.consolidated_agent import INTENT_SPECS, IntentRouter, fold_accents
+
+MENSAJES = [
+    "Cliente: Juan Pérez, juan@correo.com, Norte, 555-123-4567, 350",
+    "información del cliente María López",
+    "buscar cliente Pedro",
+    "cliente Juan Pérez",
+    "estadísticas de clientes",
+    "Prospecto: Ana Ruiz, 555 987 6543, sur",
+    "incidente: sin internet en zona centro desde la mañana",
+    "estadísticas",
+    "dame el resumen del mes",
+    "análisis de ingresos por zona",
+    "hola, buenos días",
+    "¿cuántos clientes morosos hay en la zona oeste esta semana?",
+]
+
+def clasificar_secuencial(texto: str):
+    """Recorrido original: cada patrón se evalúa uno por uno (gana el primero en el orden de la lista)"""
+    texto = fold_accents(texto)
+    for intent, _action, _extractor, patterns in INTENT_SPECS:
+        for pattern in patterns:
+            match = re.search(pattern, texto, re.IGNORECASE)
+            if match:
+                return intent, match
+    return None
+
+def medir(nombre: str, funcion, iteraciones: int) -> float:
+    inicio = time.perf_counter()
+    for _ in range(iteraciones):
+        for mensaje in MENSAJES:
+            funcion(mensaje)
+    total = time.perf_counter() - inicio
+    por_mensaje = total / (iteraciones * len(MENSAJES)) * 1e6
+    print(f"  {nombre:<28} {por_mensaje:8.2f} µs/mensaje")
+    return por_mensaje
+
+def main():
+    iteraciones = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    
+    inicio = time.perf_counter()
+    router = IntentRouter(INTENT_SPECS)
+    compilacion = (time.perf_counter() - inicio) * 1000
+    
+    print(f"\n📊 Clasificación de intenciones ({iteraciones} x {len(MENSAJES)} mensajes)")
+    print(f"  Compilación del router:      {compilacion:8.2f} ms (una vez por proceso)")
+    secuencial = medir("Secuencial (re.search)", clasificar_secuencial, iteraciones)
+    compilado = medir("Router compilado", router.route, iteraciones)
+    print(f"  Mejora: {secuencial / compilado:.1f}x")
+    
+    print("\n🔎 Clasificación por mensaje:")
+    for mensaje in MENSAJES:
+        routed = router.route(mensaje)
+        print(f"  {routed[0] if routed else '(IA / fallback)':<16} ← {mensaje}")
+
+if __name__ == "__main__":
+    main()
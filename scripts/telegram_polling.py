@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+BOT DE TELEGRAM EN MODO POLLING - Red Soluciones ISP
+Atiende el bot con getUpdates (sin webhook ni URL pública), usando los
+mismos servicios, agente y pool de workers que el servidor web.
+
+Uso:
+    python scripts/telegram_polling.py
+    TELEGRAM_API_URL=http://127.0.0.1:8081 python scripts/telegram_polling.py   # API falsa local
+"""
+
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Debe fijarse antes de importar la configuración
+os.environ["TELEGRAM_MODE"] = "polling"
+
+from backend.app import main
+
+async def run():
+    await main.startup_event()
+    # Los servicios se construyen en segundo plano; el polling arranca cuando están listos
+    await main.ensure_services()
+    main.start_telegram_polling()
+    if main.telegram_poller is None:
+        print("❌ Polling no iniciado: configure TELEGRAM_BOT_TOKEN")
+        return 1
+
+    print(f"📡 Polling de Telegram activo (offset guardado en {main.telegram_poller.offset_path})")
+    try:
+        while main.background_tasks:
+            await asyncio.gather(*main.background_tasks)
+    finally:
+        await main.shutdown_event()
+    return 0
+
+if __name__ == "__main__":
+    try:
+        sys.exit(asyncio.run(run()))
+    except KeyboardInterrupt:
+        print("\n🛑 Polling detenido")
@@ -0,0 +1,11 @@
+"""
+Configuración común de pytest - Red Soluciones ISP
+Los módulos se importan como `backend.app...` desde la raíz del repositorio.
+"""
+
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
@@ -0,0 +1,169 @@
+"""
+Alta masiva y alta individual de prospectos en ConsolidatedISPAgent contra
+un servicio de Sheets falso: validación por línea, deduplicación y una sola
+escritura por lote.
+"""
+
+import asyncio
+
+import pytest
+
+from backend.app.services.consolidated_agent import ConsolidatedISPAgent, ProspectoData, ResponseType
+
+class FakeSheetsService:
+    """Hojas de clientes y prospectos en memoria; registra cada escritura"""
+
+    def __init__(self, clients=None, prospects=None, fail_writes=False):
+        self.clients = list(clients or [])
+        self.prospects = list(prospects or [])
+        self.fail_writes = fail_writes
+        self.calls = []
+
+    def get_all_clients(self, include_inactive=False):
+        self.calls.append(('get_all_clients', include_inactive))
+        return list(self.clients)
+
+    def get_prospects(self):
+        self.calls.append(('get_prospects',))
+        return list(self.prospects)
+
+    def add_clients(self, records):
+        self.calls.append(('add_clients', len(records)))
+        if self.fail_writes:
+            return {'success': False, 'error': 'Sheets no disponible'}
+        self.clients.extend(records)
+        return {'success': True, 'added': len(records)}
+
+    def add_prospects(self, records):
+        self.calls.append(('add_prospects', len(records)))
+        if self.fail_writes:
+            return {'success': False, 'error': 'Sheets no disponible'}
+        self.prospects.extend(records)
+        return {'success': True, 'added': len(records)}
+
+    def add_prospect(self, data):
+        self.calls.append(('add_prospect', data['Nombre']))
+        if self.fail_writes:
+            return False
+        self.prospects.append(data)
+        return True
+
+    def writes(self):
+        return [call for call in self.calls if call[0].startswith('add_')]
+
+EXISTING_CLIENT = {
+    'Nombre': 'Ana Torres', 'Email': 'ana@correo.com', 'Zona': 'Norte',
+    'Teléfono': '555-111-2222', 'Pago Mensual': 350
+}
+
+CLIENT_BATCH = "\n".join([
+    "Clientes:",
+    "Luis Pérez, luis@correo.com, Sur, 555-333-4444, 400",
+    "Ana T., ana@correo.com, Centro, 555-999-0000, 300",
+    "Marta Ruiz, marta@correo.com, Este, 555-444-5555",
+    "Carlos Gómez, carlos@correo.com, Oeste, 555-333-4444, 500",
+    "Sofía León, sofia@correo.com, Norte, 555-666-7777, 450",
+])
+
+@pytest.fixture
+def make_agent():
+    def make(**kwargs):
+        return ConsolidatedISPAgent(sheets_service=FakeSheetsService(**kwargs))
+    return make
+
+def test_parse_bulk_input_header_and_prefixed_lines():
+    agent = ConsolidatedISPAgent()
+
+    kind, header, rows = agent._parse_bulk_input(
+        "alta masiva de prospectos\nNombre, Teléfono, Zona\nPedro, 555-123-4567, Sur\nJuana, 555-765-4321, Norte"
+    )
+    assert kind == 'prospecto'
+    assert header == ['nombre', 'telefono', 'zona']
+    assert rows == [(3, "Pedro, 555-123-4567, Sur", None), (4, "Juana, 555-765-4321, Norte", None)]
+
+    kind, header, rows = agent._parse_bulk_input("Cliente: A, a@x.com\n\nProspecto: B, 555-000-1111")
+    assert (kind, header) == ('cliente', None)
+    assert [(number, line_kind) for number, _, line_kind in rows] == [(1, 'cliente'), (3, 'prospecto')]
+
+@pytest.mark.parametrize("text", [
+    "Cliente: Juan, juan@correo.com, Norte, 555-123-4567, 300",
+    "hola\nqué tal",
+    "Clientes:\nLuis Pérez, luis@correo.com, Sur, 555-333-4444, 400",
+])
+def test_parse_bulk_input_rejects_non_batches(text):
+    assert ConsolidatedISPAgent()._parse_bulk_input(text) is None
+
+def test_extract_bulk_data_validates_every_line():
+    bulk = ConsolidatedISPAgent()._extract_bulk_data(CLIENT_BATCH + "\nProspecto: Pedro, 555-123-4567, Sur")
+
+    assert bulk['kind'] == 'cliente'
+    errors = {row['line']: row['error'] for row in bulk['rows']}
+    assert [row['line'] for row in bulk['rows']] == [2, 3, 4, 5, 6, 7]
+    assert errors[4].startswith("Faltan datos: pago")
+    assert errors[7] == "Registro de prospecto en un lote de clientes"
+    assert all(errors[line] is None for line in (2, 3, 5, 6))
+
+def test_load_dedup_index_includes_prospects_only_for_prospect_batches(make_agent):
+    agent = make_agent(clients=[EXISTING_CLIENT], prospects=[{'Nombre': 'Pedro', 'Teléfono': '555-123-4567', 'Zona': 'Sur'}])
+
+    clients_index = agent._load_dedup_index('cliente')
+    assert clients_index == {
+        'email:ana@correo.com': 'Ana Torres',
+        'tel:5551112222': 'Ana Torres',
+        'nombre:ana torres|norte': 'Ana Torres'
+    }
+    assert ('get_prospects',) not in agent.sheets_service.calls
+
+    prospects_index = agent._load_dedup_index('prospecto')
+    assert prospects_index['tel:5551234567'] == 'Pedro'
+    assert agent.sheets_service.calls[-1] == ('get_prospects',)
+
+def test_alta_masiva_mixed_lines_single_append(make_agent):
+    agent = make_agent(clients=[EXISTING_CLIENT])
+    response = asyncio.run(agent.process_query(CLIENT_BATCH))
+
+    sheets = agent.sheets_service
+    assert sheets.writes() == [('add_clients', 2)]
+    assert [row['Nombre'] for row in sheets.clients[1:]] == ["Luis Pérez", "Sofía León"]
+
+    estados = {row['linea']: (row['estado'], row['motivo']) for row in response.data['rows']}
+    assert estados[2] == ("registrado", None)
+    assert estados[3] == ("duplicado", "Ya registrado como Ana Torres")
+    assert estados[4][0] == "invalido"
+    assert estados[5] == ("duplicado", "Repite la línea 2")
+    assert estados[6] == ("registrado", None)
+
+    assert response.response_type == ResponseType.SUCCESS
+    assert (response.data['registrados'], response.data['duplicados'], response.data['invalidos']) == (2, 2, 1)
+
+def test_alta_masiva_write_failure_marks_pending_rows(make_agent):
+    agent = make_agent(fail_writes=True)
+    response = asyncio.run(agent.process_query(CLIENT_BATCH))
+
+    assert agent.sheets_service.writes() == [('add_clients', 3)]
+    assert response.response_type == ResponseType.ERROR
+    assert response.data['errores'] == 3
+    assert agent._local_data_generation == 0
+
+def test_alta_masiva_prospects_use_prospect_sheet(make_agent):
+    agent = make_agent()
+    response = asyncio.run(agent.process_query(
+        "Prospecto: Pedro, 555-123-4567, Sur\nProspecto: Juana, 555-765-4321, Norte"
+    ))
+
+    assert agent.sheets_service.writes() == [('add_prospects', 2)]
+    assert response.data['registrados'] == 2
+
+@pytest.mark.parametrize("fail_writes, expected", [
+    (False, ResponseType.SUCCESS),
+    (True, ResponseType.ERROR),
+])
+def test_single_prospect_written_to_prospect_sheet(make_agent, fail_writes, expected):
+    agent = make_agent(fail_writes=fail_writes)
+    response = asyncio.run(agent._handle_prospecto_alta(ProspectoData(nombre="Pedro", telefono="555-123-4567", zona="Sur")))
+
+    assert agent.sheets_service.writes() == [('add_prospect', "Pedro")]
+    assert response.response_type == expected
+    assert response.data['success'] is not fail_writes
+    # Solo una escritura real invalida lo derivado de los datos
+    assert agent._local_data_generation == (0 if fail_writes else 1)
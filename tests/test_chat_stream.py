@@ -0,0 +1,135 @@
+"""
+Chat en streaming: ConsolidatedISPAgent.stream_query y /api/chat/stream
+con un modelo falso (generate_content_async con stream=True).
+"""
+
+import asyncio
+import json
+import logging
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.app.services import consolidated_agent as agent_module
+from backend.app.services.consolidated_agent import ActionType, ConsolidatedISPAgent
+
+QUERY = "que opinas del clima de hoy"
+
+class FakeChunk:
+    def __init__(self, text):
+        self._text = text
+
+    @property
+    def text(self):
+        # Como google.generativeai: un fragmento bloqueado no tiene partes de texto
+        if self._text is None:
+            raise ValueError("The `response.text` quick accessor only works when the response contains a valid `Part`")
+        return self._text
+
+class FakeStream:
+    def __init__(self, texts):
+        self._chunks = [FakeChunk(t) for t in texts]
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for chunk in self._chunks:
+            await asyncio.sleep(0)
+            yield chunk
+
+class FakeModel:
+    def __init__(self, texts):
+        self.texts = texts
+        self.prompts = []
+
+    async def generate_content_async(self, prompt, stream=False):
+        assert stream
+        self.prompts.append(prompt)
+        return FakeStream(self.texts)
+
+@pytest.fixture
+def make_agent(monkeypatch):
+    monkeypatch.setattr(agent_module, 'GEMINI_AVAILABLE', True)
+
+    def make(texts):
+        agent = ConsolidatedISPAgent()
+        agent.ai_model = FakeModel(texts)
+        return agent
+    return make
+
+async def _collect(agent, query=QUERY):
+    return [event async for event in agent.stream_query(query)]
+
+def test_stream_query_emits_chunks_then_done(make_agent):
+    agent = make_agent(["Hola, ", "", "todo en orden."])
+    events = asyncio.run(_collect(agent))
+
+    deltas = [e['text'] for e in events if e['event'] == 'delta']
+    assert deltas == ["Hola, ", "todo en orden."]
+    assert events[-1]['event'] == 'done'
+    response = events[-1]['response']
+    assert response.message == "Hola, todo en orden."
+    assert response.action_type == ActionType.CHAT
+    assert len(agent.ai_model.prompts) == 1
+
+def test_stream_query_blocked_chunk_falls_back(make_agent, caplog):
+    agent = make_agent([None])
+    with caplog.at_level(logging.WARNING):
+        events = asyncio.run(_collect(agent))
+
+    # Bloqueo de seguridad esperado: aviso, no error de la IA
+    assert any("bloqueada" in r.getMessage() for r in caplog.records if r.levelno == logging.WARNING)
+    assert not [r for r in caplog.records if r.levelno >= logging.ERROR]
+
+    fallback = agent._fallback_response(QUERY)
+    assert [e['text'] for e in events if e['event'] == 'delta'] == [fallback.message]
+    response = events[-1]['response']
+    assert response.message == fallback.message
+    assert response.action_type == fallback.action_type
+
+def test_stream_query_blocked_after_text_keeps_structured_done(make_agent):
+    agent = make_agent(["Parte inicial", None])
+    events = asyncio.run(_collect(agent))
+
+    assert [e['text'] for e in events if e['event'] == 'delta'] == ["Parte inicial"]
+    assert events[-1]['response'].message == agent._fallback_response(QUERY).message
+
+def _sse_events(body: str):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines() if not line.startswith(":"))
+        events.append((lines['event'], json.loads(lines['data'])))
+    return events
+
+@pytest.fixture
+def client(monkeypatch):
+    from backend.app import main
+
+    # Construir (o fallar sin credenciales) antes de inyectar el agente falso
+    main.services.get()
+    monkeypatch.setattr(main.app.router, 'on_startup', [])
+    with TestClient(main.app) as test_client:
+        yield main, test_client
+
+@pytest.mark.parametrize("texts, expected", [
+    (["Hola, ", "todo en orden."], "Hola, todo en orden."),
+    ([None], None),
+])
+def test_chat_stream_endpoint(client, make_agent, monkeypatch, texts, expected):
+    main, test_client = client
+    agent = make_agent(texts)
+    monkeypatch.setattr(main, 'consolidated_agent', agent)
+    if expected is None:
+        expected = agent._fallback_response(QUERY).message
+
+    response = test_client.post("/api/chat/stream", json={"message": QUERY})
+
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith("text/event-stream")
+    events = _sse_events(response.text)
+    assert [name for name, _ in events[:-1]] == ['delta'] * (len(events) - 1)
+    assert ''.join(payload['text'] for _, payload in events[:-1]) == expected
+    name, done = events[-1]
+    assert name == 'done'
+    assert done['response'] == expected
@@ -0,0 +1,125 @@
+"""
+Índice de clientes en memoria (filtros, orden, KPIs) y cursores de
+paginación sobre un conjunto pequeño de filas.
+"""
+
+import pytest
+
+from backend.app.services.sheets.client_index import ClientIndex, parse_flag
+from backend.app.services.sheets.service import SheetsServiceV2
+from backend.app.utils.pagination import decode_cursor, encode_cursor
+
+ROWS = [
+    {'ID Cliente': 'C1', 'Nombre': 'Ana Torres', 'Zona': 'Norte', 'Pago': '350', 'Activo (SI/NO)': 'SI', 'Pagado': 'SI', 'Propietario': 'Eduardo', 'Teléfono': '555-111-2222'},
+    {'ID Cliente': 'C2', 'Nombre': 'Luis Pérez', 'Zona': 'Sur', 'Pago': '$1,200', 'Activo (SI/NO)': 'SI', 'Pagado': 'NO', 'Propietario': 'Omar', 'Teléfono': '555-333-4444'},
+    {'ID Cliente': 'C3', 'Nombre': 'Beatriz Núñez', 'Zona': 'norte', 'Pago': '500', 'Activo (SI/NO)': 'NO', 'Pagado': 'NO', 'Propietario': 'Eduardo', 'Teléfono': '555-555-6666'},
+    {'ID Cliente': 'C4', 'Nombre': 'Carlos Gómez', 'Zona': 'Centro', 'Pago': '200', 'Activo (SI/NO)': 'sí', 'Pagado': 'si', 'Propietario': 'Omar', 'Teléfono': '555-777-8888'},
+    {'ID Cliente': 'C5', 'Nombre': 'Andrea Ruiz', 'Zona': 'Norte', 'Pago': '450', 'Activo (SI/NO)': 'SI', 'Pagado': '', 'Propietario': 'Eduardo', 'Teléfono': '555-999-0000'},
+]
+
+def _ids(result):
+    return [row['ID Cliente'] for row in result['rows']]
+
+@pytest.fixture
+def index():
+    return ClientIndex(ROWS, version=3)
+
+@pytest.mark.parametrize("value, expected", [
+    (None, None), ('', None), ('  ', None), (True, True), (False, False),
+    ('si', True), ('SÍ', True), ('1', True), ('activo', True),
+    ('no', False), ('0', False), ('Inactivo', False),
+])
+def test_parse_flag(value, expected):
+    assert parse_flag(value) is expected
+
+def test_parse_flag_rejects_unknown_values():
+    with pytest.raises(ValueError):
+        parse_flag('quizás')
+
+def test_kpis(index):
+    kpis = index.kpis
+    assert (kpis['total'], kpis['activos'], kpis['inactivos']) == (5, 4, 1)
+    assert (kpis['pagados'], kpis['pendientes']) == (2, 2)
+    assert kpis['ingresos_mensuales'] == 2200.0
+    assert kpis['zonas_top'][0] == ('NORTE', 2)
+
+@pytest.mark.parametrize("filters, expected", [
+    ({}, ['C1', 'C2', 'C3', 'C4', 'C5']),
+    ({'zona': 'NORTE'}, ['C1', 'C3', 'C5']),
+    ({'zona': 'norte', 'activo': True}, ['C1', 'C5']),
+    ({'activo': False}, ['C3']),
+    ({'pagado': True}, ['C1', 'C4']),
+    ({'pagado': False, 'activo': True}, ['C2', 'C5']),
+    ({'owner': 'omar', 'pagado': True}, ['C4']),
+    ({'zona': 'Oeste'}, []),
+])
+def test_query_filters_keep_sheet_order(index, filters, expected):
+    result = index.query(**filters)
+    assert _ids(result) == expected
+    assert result['total'] == len(expected)
+
+@pytest.mark.parametrize("sort, expected", [
+    ('nombre', ['C1', 'C5', 'C3', 'C4', 'C2']),
+    ('-nombre', ['C2', 'C4', 'C3', 'C5', 'C1']),
+    ('pago', ['C4', 'C1', 'C5', 'C3', 'C2']),
+    ('-pago', ['C2', 'C3', 'C5', 'C1', 'C4']),
+    ('ZONA', ['C4', 'C1', 'C3', 'C5', 'C2']),
+])
+def test_query_sort_order(index, sort, expected):
+    assert _ids(index.query(sort=sort)) == expected
+
+def test_query_sort_with_filter_and_search(index):
+    assert _ids(index.query(zona='norte', sort='-pago')) == ['C3', 'C5', 'C1']
+    # Con búsqueda, primero los nombres que empiezan por el término
+    assert _ids(index.query(q='and')) == ['C5']
+    assert _ids(index.query(q='an')) == ['C1', 'C5']
+    assert _ids(index.query(q='an', pagado=True)) == ['C1']
+
+def test_query_rejects_unknown_sort(index):
+    with pytest.raises(ValueError):
+        index.query(sort='email')
+
+def test_query_offset_pagination(index):
+    first = index.query(sort='nombre', limit=2)
+    assert _ids(first) == ['C1', 'C5'] and first['next_offset'] == 2
+    last = index.query(sort='nombre', offset=4, limit=2)
+    assert _ids(last) == ['C2'] and last['next_offset'] is None
+
+# === CURSORES ===
+
+@pytest.mark.parametrize("version, offset", [(0, 0), (3, 25), (12, 100), ('v1', 1)])
+def test_cursor_round_trip(version, offset):
+    cursor = encode_cursor(version, offset)
+    assert '=' not in cursor
+    assert decode_cursor(cursor, version) == (offset, False)
+
+def test_cursor_stale_after_version_bump():
+    cursor = encode_cursor(3, 10)
+    assert decode_cursor(cursor, 4) == (10, True)
+
+@pytest.mark.parametrize("cursor", ["", "no-es-base64!", encode_cursor(1, -5), "eyJ2IjoxfQ"])
+def test_invalid_cursor(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, 1)
+
+def test_query_clients_pages_with_cursor(index):
+    service = SheetsServiceV2.__new__(SheetsServiceV2)
+
+    page = service.query_clients(limit=2, sort='nombre', index=index)
+    seen = [row['ID Cliente'] for row in page['data']]
+    while page['next_cursor']:
+        page = service.query_clients(limit=2, sort='nombre', cursor=page['next_cursor'], index=index)
+        assert page['stale_cursor'] is False
+        seen += [row['ID Cliente'] for row in page['data']]
+    assert seen == ['C1', 'C5', 'C3', 'C4', 'C2']
+
+    # Tras una escritura el cursor sigue en la misma posición pero avisa
+    cursor = service.query_clients(limit=2, sort='nombre', index=index)['next_cursor']
+    newer = ClientIndex(ROWS + [{'ID Cliente': 'C6', 'Nombre': 'Zoe', 'Zona': 'Sur'}], version=4)
+    page = service.query_clients(limit=2, sort='nombre', cursor=cursor, index=newer)
+    assert page['stale_cursor'] is True
+    assert [row['ID Cliente'] for row in page['data']] == ['C3', 'C4']
+    assert page['version'] == 4
+
+    with pytest.raises(ValueError):
+        service.query_clients(limit=0, index=index)
@@ -0,0 +1,101 @@
+"""
+Snapshot persistente del ContextEngine: ida y vuelta por SQLite, esquema
+incompatible y carga de hojas fuera del event loop.
+"""
+
+import asyncio
+import logging
+import threading
+
+from backend.app.services import context_snapshot
+from backend.app.services.context_engine import BusinessContext, ContextEngine, DataEntity, SheetType
+from backend.app.services.context_snapshot import ContextSnapshotStore
+
+BUSINESS = BusinessContext(
+    total_clientes=2, clientes_activos=2, clientes_morosos=0, ingresos_mensuales=750.0,
+    incidentes_abiertos=0, prospectos_activos=1, zonas_cobertura=['Norte', 'Sur'],
+    growth_rate=0.0, churn_rate=0.0, arpu=375.0
+)
+
+def _entities():
+    return [
+        DataEntity(
+            id='clientes_1', type='clientes', propietario='Eduardo', last_updated=1000.0,
+            data={'Nombre': 'Ana Torres', 'Zona': 'Norte', 'Pago_Mensual': 350},
+            relationships={'zona': ['zona_norte']}
+        ),
+        DataEntity(
+            id='prospectos_1', type='prospectos', propietario='Sistema', last_updated=1001.0,
+            data={'Nombre': 'Pedro Ñúñez', 'Zona': 'Sur'}
+        )
+    ]
+
+def test_snapshot_store_round_trip(tmp_path):
+    store = ContextSnapshotStore(tmp_path / "snapshot.db")
+    assert store.load() is None
+
+    assert store.save(_entities(), BUSINESS, {'clientes': 1000.0}, data_version=7) == 2
+    assert not (tmp_path / "snapshot.db.tmp").exists()
+
+    snapshot = store.load()
+    meta = snapshot['meta']
+    assert meta['schema_version'] == context_snapshot.SNAPSHOT_SCHEMA_VERSION
+    assert meta['data_version'] == 7
+    assert meta['cache_timestamps'] == {'clientes': 1000.0}
+    assert BusinessContext(**meta['business_context']) == BUSINESS
+    assert snapshot['entities'] == [
+        ('clientes_1', 'clientes', 'Eduardo', {'Nombre': 'Ana Torres', 'Zona': 'Norte', 'Pago_Mensual': 350},
+         {'zona': ['zona_norte']}, 1000.0),
+        ('prospectos_1', 'prospectos', 'Sistema', {'Nombre': 'Pedro Ñúñez', 'Zona': 'Sur'}, None, 1001.0)
+    ]
+
+def test_snapshot_store_rejects_other_schema_version(tmp_path, monkeypatch, caplog):
+    store = ContextSnapshotStore(tmp_path / "snapshot.db")
+    monkeypatch.setattr(context_snapshot, 'SNAPSHOT_SCHEMA_VERSION', context_snapshot.SNAPSHOT_SCHEMA_VERSION + 1)
+    store.save(_entities(), BUSINESS, {}, data_version=1)
+    monkeypatch.undo()
+
+    with caplog.at_level(logging.WARNING):
+        assert store.load() is None
+    assert any("esquema incompatible" in r.getMessage() for r in caplog.records)
+
+def test_snapshot_store_unreadable_file(tmp_path):
+    path = tmp_path / "snapshot.db"
+    path.write_text("no es sqlite")
+    assert ContextSnapshotStore(path).load() is None
+
+def test_engine_restores_snapshot(tmp_path):
+    path = tmp_path / "snapshot.db"
+    engine = ContextEngine(None, snapshot_path=path)
+    engine.entity_graph = {entity.id: entity for entity in _entities()}
+    engine.global_context['business'] = BUSINESS
+    engine.cache_timestamps = {'clientes': 1000.0}
+    assert engine.save_snapshot()
+
+    restored = ContextEngine(None, snapshot_path=path)
+    assert asyncio.run(restored.load_snapshot())
+    assert restored.loaded_from_snapshot
+    assert restored.data_version == 1
+    assert restored.global_context['business'] == BUSINESS
+    assert {k: e.data for k, e in restored.entity_graph.items()} == {k: e.data for k, e in engine.entity_graph.items()}
+    assert [e.id for e in restored.cache['clientes']] == ['clientes_1']
+
+class ThreadRecordingSheets:
+    """get_all_rows falso que anota en qué hilo se llamó"""
+
+    def __init__(self):
+        self.threads = []
+
+    def get_all_rows(self):
+        self.threads.append(threading.current_thread())
+        return [{'Nombre': 'Ana Torres', 'Propietario': 'Eduardo'}]
+
+def test_sheet_reads_run_off_event_loop():
+    sheets = ThreadRecordingSheets()
+    engine = ContextEngine(sheets)
+
+    async def load():
+        return await engine._load_sheet_data(SheetType.CLIENTES, engine.sheet_config[SheetType.CLIENTES])
+
+    assert len(asyncio.run(load())) == 1
+    assert sheets.threads and threading.main_thread() not in sheets.threads
@@ -0,0 +1,65 @@
+"""
+Precedencia del router de intenciones: altas ancladas al inicio, consultas
+y frases ambiguas que no deben registrar nada.
+"""
+
+import pytest
+
+from backend.app.services.consolidated_agent import ConsolidatedISPAgent
+
+ROUTER = ConsolidatedISPAgent.INTENT_ROUTER
+
+WRITES = [
+    ("Cliente: Juan Pérez, juan@correo.com, Norte, 555-123-4567, 350", 'cliente_alta', "Juan Pérez, juan@correo.com, Norte, 555-123-4567, 350"),
+    ("Cliente : Juan", 'cliente_alta', "Juan"),
+    ("cliente   :Juan", 'cliente_alta', "Juan"),
+    ("CLIENTE: José Núñez", 'cliente_alta', "José Núñez"),
+    ("Alta de cliente: Juan", 'cliente_alta', "Juan"),
+    ("alta cliente Juan", 'cliente_alta', "Juan"),
+    ("Registrar cliente: Juan", 'cliente_alta', "Juan"),
+    ("Nuevo cliente: Juan", 'cliente_alta', "Juan"),
+    ("Añadir cliente: Juan", 'cliente_alta', "Juan"),
+    ("Prospecto: Pedro, 555-765-4321, Sur", 'prospecto_alta', "Pedro, 555-765-4321, Sur"),
+    ("Prospecto : Pedro", 'prospecto_alta', "Pedro"),
+    ("Lead: Pedro", 'prospecto_alta', "Pedro"),
+    ("Incidente: sin internet en la zona norte", 'incidente_crear', "sin internet en la zona norte"),
+    ("Problema: señal intermitente", 'incidente_crear', "señal intermitente"),
+]
+
+READS = [
+    ("información del cliente Juan", 'cliente_info', "Juan"),
+    ("Información del cliente: Juan", 'cliente_info', "Juan"),
+    ("datos cliente Juan", 'cliente_info', "Juan"),
+    ("buscar cliente : Juan", 'cliente_info', "Juan"),
+    ("ver cliente nuevo", 'cliente_info', "nuevo"),
+    ("cliente Juan", 'cliente_info', "Juan"),
+    ("estadísticas", 'estadisticas', None),
+    ("analizar cliente Juan", 'analisis', "cliente Juan"),
+]
+
+# Menciones a mitad de frase: nunca un alta
+AMBIGUOUS = [
+    ("dame el resumen del cliente Juan", 'estadisticas'),
+    ("el cliente Juan tiene un problema: sin señal", 'cliente_info'),
+    ("quiero ver el nuevo cliente Juan", 'cliente_info'),
+    ("mañana llamo al prospecto: Pedro", None),
+    ("quiero dar de alta un cliente: Juan", None),
+]
+
+@pytest.mark.parametrize("text, intent, captured", WRITES + READS)
+def test_route_intent_and_capture(text, intent, captured):
+    routed = ROUTER.route(text)
+    assert routed is not None
+    name, match = routed
+    assert name == intent
+    assert (match.groups()[0] if match.groups() else None) == captured
+
+@pytest.mark.parametrize("text, intent", AMBIGUOUS)
+def test_mid_sentence_mentions_do_not_write(text, intent):
+    routed = ROUTER.route(text)
+    assert (routed[0] if routed else None) == intent
+
+@pytest.mark.parametrize("text, intent, _captured", WRITES + READS)
+def test_detect_intent_matches_router(text, intent, _captured):
+    detected = ConsolidatedISPAgent()._detect_intent(text)
+    assert detected['name'] == intent
@@ -0,0 +1,84 @@
+"""
+Colas de TelegramBot con un cliente falso (sin HTTP): reintentos de
+Telegram descartados por update_id y orden por chat con chats en paralelo.
+"""
+
+import asyncio
+
+from backend.app.services.telegram_bot import TelegramBot
+
+class FakeClient:
+    """send_message en memoria; los textos con compuerta esperan a que se abra"""
+
+    def __init__(self):
+        self.sent = []
+        self.gates = {}
+
+    async def send_message(self, chat_id, text, parse_mode=None):
+        gate = self.gates.get(text)
+        if gate is not None:
+            await gate.wait()
+        self.sent.append((chat_id, text))
+        return {"ok": True, "result": {"message_id": len(self.sent)}}
+
+    async def close(self):
+        pass
+
+def echo_handler(update):
+    message = update["message"]
+    return {"method": "sendMessage", "chat_id": message["chat"]["id"], "text": message["text"]}
+
+def _update(update_id, chat_id, text):
+    return {"update_id": update_id, "message": {"message_id": update_id, "chat": {"id": chat_id}, "text": text}}
+
+async def _wait_until(condition, timeout=5.0):
+    async def poll():
+        while not condition():
+            await asyncio.sleep(0.005)
+    await asyncio.wait_for(poll(), timeout)
+
+def test_duplicate_update_processed_once():
+    async def run():
+        client = FakeClient()
+        bot = TelegramBot(client, echo_handler, workers=2)
+        try:
+            update = _update(500, 1, "hola")
+            # Telegram reintenta el webhook: el mismo update llega varias veces
+            assert bot.submit(update)
+            assert bot.submit(dict(update))
+            await bot.drain()
+            assert await bot.process_now(dict(update)) is False
+            return client.sent, bot.stats()
+        finally:
+            await bot.stop()
+
+    sent, stats = asyncio.run(run())
+    assert sent == [(1, "hola")]
+    assert stats["received"] == 1 and stats["processed"] == 1
+    assert stats["duplicates"] == 2
+    assert stats["queue_depth"] == 0
+
+def test_same_chat_in_order_while_other_chats_proceed():
+    async def run():
+        client = FakeClient()
+        bot = TelegramBot(client, echo_handler, workers=2)
+        gate = client.gates["1-a"] = asyncio.Event()
+        try:
+            for update_id, (chat_id, text) in enumerate([(1, "1-a"), (1, "1-b"), (2, "2-a"), (2, "2-b")], 100):
+                assert bot.submit(_update(update_id, chat_id, text))
+
+            # El chat 1 está detenido en su primer mensaje; el chat 2 termina igual
+            await _wait_until(lambda: [t for c, t in client.sent if c == 2] == ["2-a", "2-b"])
+            assert not [t for c, t in client.sent if c == 1]
+            assert bot.stats()["queue_depth"] == 2
+
+            gate.set()
+            await asyncio.wait_for(bot.drain(), 5)
+            return client.sent, bot.stats()
+        finally:
+            await bot.stop()
+
+    sent, stats = asyncio.run(run())
+    assert [text for chat, text in sent if chat == 1] == ["1-a", "1-b"]
+    assert sent[:2] == [(2, "2-a"), (2, "2-b")]
+    assert stats["processed"] == 4 and stats["active_chats"] == 0
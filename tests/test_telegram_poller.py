@@ -0,0 +1,152 @@
+"""
+TelegramPoller contra una Bot API falsa servida localmente (getUpdates,
+sendMessage, deleteWebhook): persistencia del offset y orden por chat.
+"""
+
+import asyncio
+import socket
+import threading
+import time
+
+import pytest
+import uvicorn
+from fastapi import FastAPI, Request
+
+from backend.app.services.telegram_bot import TelegramBot, TelegramClient, TelegramPoller
+
+TOKEN = "123:TEST"
+
+class FakeTelegramAPI:
+    """Bot API en memoria: updates pendientes, mensajes enviados y offsets pedidos"""
+
+    def __init__(self):
+        self.updates = []
+        self.sent = []
+        self.offsets = []
+        self.app = FastAPI()
+        self.app.post(f"/bot{TOKEN}/getUpdates")(self.get_updates)
+        self.app.post(f"/bot{TOKEN}/sendMessage")(self.send_message)
+        self.app.post(f"/bot{TOKEN}/deleteWebhook")(self.delete_webhook)
+
+    def add_message(self, chat_id, text):
+        update_id = 1000 + len(self.updates)
+        self.updates.append({
+            "update_id": update_id,
+            "message": {"message_id": update_id, "chat": {"id": chat_id}, "text": text}
+        })
+        return update_id
+
+    async def get_updates(self, request: Request):
+        payload = await request.json()
+        offset = payload.get("offset")
+        self.offsets.append(offset)
+        # Como Telegram: pedir un offset confirma (descarta) los updates anteriores
+        pending = [u for u in self.updates if offset is None or u["update_id"] >= offset]
+        return {"ok": True, "result": pending[:payload.get("limit", 100)]}
+
+    async def send_message(self, request: Request):
+        payload = await request.json()
+        self.sent.append((payload["chat_id"], payload["text"]))
+        return {"ok": True, "result": {"message_id": len(self.sent)}}
+
+    async def delete_webhook(self):
+        return {"ok": True, "result": True}
+
+@pytest.fixture
+def telegram_api():
+    api = FakeTelegramAPI()
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    server = uvicorn.Server(uvicorn.Config(api.app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.time() + 10
+    while not server.started:
+        assert time.time() < deadline, "La Bot API falsa no arrancó"
+        time.sleep(0.01)
+
+    api.base_url = f"http://127.0.0.1:{port}"
+    yield api
+    server.should_exit = True
+    thread.join(timeout=5)
+
+def echo_handler(update):
+    """Responde con el mismo texto; los mensajes 'lento' tardan más que el resto"""
+    message = update["message"]
+    time.sleep(0.05 if message["text"].startswith("lento") else 0.0)
+    return {"method": "sendMessage", "chat_id": message["chat"]["id"], "text": message["text"]}
+
+def _make_bot(api, workers=4):
+    return TelegramBot(TelegramClient(TOKEN, base_url=api.base_url), echo_handler, workers=workers)
+
+def test_offset_persisted_and_resumed_after_restart(telegram_api, tmp_path):
+    offset_path = tmp_path / "telegram_offset.json"
+    first = [telegram_api.add_message(1, f"m{i}") for i in range(3)]
+
+    async def first_run():
+        bot = _make_bot(telegram_api)
+        poller = TelegramPoller(bot, offset_path=offset_path, poll_timeout=0)
+        try:
+            assert poller.offset is None
+            assert await poller.poll_once() == 3
+            assert await poller.poll_once() == 0
+            return poller.offset
+        finally:
+            await bot.stop()
+
+    offset = asyncio.run(first_run())
+    assert offset == max(first) + 1
+    assert offset_path.exists()
+    assert len(telegram_api.sent) == 3
+
+    second = telegram_api.add_message(1, "después del reinicio")
+
+    async def second_run():
+        bot = _make_bot(telegram_api)
+        poller = TelegramPoller(bot, offset_path=offset_path, poll_timeout=0)
+        try:
+            # El proceso nuevo retoma el offset guardado: no reprocesa el primer lote
+            assert poller.offset == offset
+            assert await poller.poll_once() == 1
+            return poller.offset
+        finally:
+            await bot.stop()
+
+    assert asyncio.run(second_run()) == second + 1
+    assert telegram_api.offsets == [None, offset, offset]
+    assert [text for _, text in telegram_api.sent] == ["m0", "m1", "m2", "después del reinicio"]
+
+def test_unreadable_offset_file_starts_without_offset(telegram_api, tmp_path):
+    offset_path = tmp_path / "telegram_offset.json"
+    offset_path.write_text("no es json")
+    poller = TelegramPoller(_make_bot(telegram_api), offset_path=offset_path, poll_timeout=0)
+    assert poller.offset is None
+
+def test_messages_answered_in_order_per_chat(telegram_api, tmp_path):
+    expected = {}
+    for i in range(6):
+        for chat_id in (10, 20, 30):
+            # El primer mensaje de cada chat es lento: los siguientes no deben adelantarlo
+            text = f"lento {chat_id}-{i}" if i == 0 else f"{chat_id}-{i}"
+            telegram_api.add_message(chat_id, text)
+            expected.setdefault(chat_id, []).append(text)
+
+    async def run():
+        bot = _make_bot(telegram_api, workers=4)
+        poller = TelegramPoller(bot, offset_path=tmp_path / "offset.json", poll_timeout=0)
+        try:
+            assert await poller.poll_once() == 18
+            return bot.stats()
+        finally:
+            await bot.stop()
+
+    stats = asyncio.run(run())
+    assert stats["processed"] == 18 and stats["sent"] == 18 and stats["queue_depth"] == 0
+
+    for chat_id, texts in expected.items():
+        assert [text for chat, text in telegram_api.sent if chat == chat_id] == texts
+    # Los chats se atienden en paralelo: no se respondió un chat completo antes de empezar otro
+    first_chats = [chat for chat, _ in telegram_api.sent[:3]]
+    assert len(set(first_chats)) > 1